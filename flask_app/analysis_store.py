@@ -0,0 +1,217 @@
+"""
+Read-only store serving the PARROT analysis results to the API
+
+The results file written by scripts/analyze_parrot.py is memory-mapped once
+per process, so every worker shares the same pages through the OS page
+cache, and sections are decoded only when first requested. When the
+analyzer has also written its section index (``parrot_analysis.index.json``,
+see scripts/parrot_results_io.py) each section is a byte range of the map:
+whole-section responses are served straight from those bytes and the
+other sections are never parsed. Without an index the file is decoded
+once.
+
+The store checks the file's stat at most every ``check_interval`` seconds
+and swaps in a new snapshot when the analyzer replaces it; requests
+already holding the old snapshot finish against the old mapping. The
+analysis itself is never run from here.
+"""
+import json
+import mmap
+import time
+import hashlib
+import threading
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+
+def _signature(path):
+    """Cheap token that changes whenever path is replaced or rewritten"""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+class ResultsSnapshot:
+    """One version of the results file: its memory map, index and decoded sections.
+
+    Like ResultsReader in scripts/parrot_results_io.py, an index that no
+    longer matches the file is ignored and the file decoded whole: one of
+    another size, one whose sections are not framed where it says (checked
+    on load, as the analyzer writes the results just before their index),
+    or one with a section that fails to decode.
+    """
+
+    def __init__(self, path, index_path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._sections = {}
+        self._etags = {}
+        self._whole = None
+        self._digest = None
+        with open(path, 'rb') as f:
+            size = path.stat().st_size
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self.index = self._load_index(index_path, size)
+        self.format = self.index['format'] if self.index else self._sniff_format()
+        if self.index and not self._framed(self.index):
+            self.index = None
+            self.format = self._sniff_format()
+
+    @staticmethod
+    def _load_index(index_path, size):
+        try:
+            index = json.loads(index_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        return index if index.get('size') == size else None
+
+    def _sniff_format(self):
+        return 'json' if self._map[:1] in (b'{', b'') else 'msgpack'
+
+    def _framed(self, index):
+        """Whether each section sits right after its name and ends where the
+        next one (or the file) begins, as write_results lays them out"""
+        for name, (offset, length) in index['sections'].items():
+            end = offset + length
+            if end > len(self._map):
+                return False
+            if index['format'] == 'msgpack':
+                if msgpack is None:
+                    return True  # cannot tell; decoding reports the missing package
+                key = msgpack.packb(name)
+                if self._map[max(offset - len(key), 0):offset] != key:
+                    return False
+                continue
+            key = json.dumps(name, ensure_ascii=False).encode('utf-8') + b':'
+            before = self._map[max(offset - len(key) - 1, 0):offset].rstrip(b' ')
+            if not before.endswith(key) or self._map[end:end + 1] not in (b',', b'\n', b'}'):
+                return False
+        return True
+
+    def _decode(self, data):
+        if self.format == 'msgpack':
+            if msgpack is None:
+                raise RuntimeError("The analysis results are msgpack-encoded but msgpack is not installed")
+            return msgpack.unpackb(data, raw=False, strict_map_key=False)
+        return _json_loads(data)
+
+    def _load_whole(self):
+        if self._whole is None:
+            self._whole = self._decode(self._map[:]) if len(self._map) else {}
+        return self._whole
+
+    def _distrust_index(self):
+        """Stale index of a same-sized file: decode the file whole from now on"""
+        self.index = None
+        self.format = self._sniff_format()
+        self._sections.clear()
+        self._etags.clear()
+
+    def sections(self):
+        """Names of the top-level sections, in file order"""
+        if self.index:
+            return list(self.index['sections'])
+        with self._lock:
+            return list(self._load_whole())
+
+    def raw_section(self, name):
+        """The stored JSON bytes of a section, or None when they must be re-encoded"""
+        index = self.index
+        if index and index['format'] != 'msgpack' and name in index['sections']:
+            offset, length = index['sections'][name]
+            return self._map[offset:offset + length]
+        return None
+
+    def section(self, name):
+        """Decoded section (cached per snapshot); KeyError if absent"""
+        with self._lock:
+            if name not in self._sections:
+                if self.index:
+                    if name not in self.index['sections']:
+                        raise KeyError(name)
+                    offset, length = self.index['sections'][name]
+                    try:
+                        self._sections[name] = self._decode(self._map[offset:offset + length])
+                    except ValueError:
+                        self._distrust_index()
+                        self._sections[name] = self._load_whole()[name]
+                else:
+                    self._sections[name] = self._load_whole()[name]
+            return self._sections[name]
+
+    def etag(self, name):
+        """Strong ETag for a section: unchanged sections keep theirs across reloads"""
+        with self._lock:
+            if name not in self._etags:
+                if self.index:
+                    if name not in self.index['sections']:
+                        raise KeyError(name)
+                    offset, length = self.index['sections'][name]
+                    content = self._map[offset:offset + length]
+                else:
+                    if name not in self._load_whole():
+                        raise KeyError(name)
+                    if self._digest is None:
+                        # Identifies this version of the file; hashed from the map, not a copy of it
+                        self._digest = hashlib.sha256(self._map).hexdigest()[:16]
+                    content = f"{self._digest}:{name}".encode('utf-8')
+                self._etags[name] = hashlib.sha256(content).hexdigest()[:20]
+            return self._etags[name]
+
+
+class AnalysisStore:
+    """Hot-reloading access to the latest analysis results file"""
+
+    def __init__(self, results_path, check_interval=2.0):
+        self.path = Path(results_path)
+        self.index_path = self.path.with_name(f"{self.path.stem}.index.json")
+        self.check_interval = check_interval
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._signature = None
+        self._checked_at = float('-inf')
+
+    def snapshot(self):
+        """Return the current snapshot, or None if no results file exists yet"""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self._snapshot
+        with self._lock:
+            if now - self._checked_at >= self.check_interval:
+                # The index is part of the signature: it is written just after the results
+                signature = (_signature(self.path), _signature(self.index_path))
+                if signature != self._signature:
+                    try:
+                        self._snapshot = ResultsSnapshot(self.path, self.index_path) if signature[0] else None
+                    except OSError:
+                        pass  # replaced or removed mid-load; keep serving the previous snapshot
+                    else:
+                        self._signature = signature
+                        self.reloads += 1
+                self._checked_at = now
+        return self._snapshot
+
+    def stats(self):
+        """Describe the loaded snapshot for the API index"""
+        snapshot = self.snapshot()
+        return {
+            'results_file': str(self.path),
+            'loaded': snapshot is not None,
+            'format': snapshot.format if snapshot else None,
+            'indexed': bool(snapshot and snapshot.index),
+            'reloads': self.reloads
+        }
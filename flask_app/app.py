@@ -1,20 +1,44 @@
-from flask import Flask, render_template, request, send_file, jsonify
+from flask import Flask, Response, render_template, request, send_file, jsonify
 import markdown
 import os
 import io
 from pathlib import Path
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, KeepTogether
+from reportlab.platypus import BaseDocTemplate, PageTemplate, Frame, NextPageTemplate
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib import colors
-from reportlab.platypus.flowables import CondPageBreak
+from reportlab.platypus.flowables import CondPageBreak, PageBreakIfNotEmpty
 from reportlab.platypus import Flowable
 from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+import reportlab.platypus.paragraph as rl_paragraph
 from datetime import datetime
 import re
 import html
+import gzip
+import json
+import shutil
+import hashlib
+import tempfile
+import zipfile
+import threading
+import click
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from functools import lru_cache
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
 from dotenv import load_dotenv
+from render_cache import create_cache
+from request_profiler import RequestProfiler
+from analysis_store import AnalysisStore
+
+try:
+    import brotli  # Optional: enables .br variants in static-site freezes
+except ImportError:
+    brotli = None
 
 # Load environment variables from .env file
 load_dotenv()
@@ -25,6 +49,11 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 app.config['DEBUG'] = os.environ.get('DEBUG', 'False').lower() == 'true'
 
+# Per-request profiling via X-Profile header or ?_profile= (see request_profiler.py)
+app.config['REQUEST_PROFILING'] = os.environ.get('REQUEST_PROFILING', 'False').lower() == 'true'
+app.config['PROFILE_SAMPLE_INTERVAL'] = float(os.environ.get('PROFILE_SAMPLE_INTERVAL', 0.001))
+RequestProfiler(app)
+
 # Base directory configuration
 # Get the absolute path to the project root (parent of flask_app directory)
 if os.environ.get('BASE_DIR'):
@@ -36,6 +65,106 @@ else:
 DOCS_DIR = BASE_DIR / 'docs'
 ANALYSIS_DIR = BASE_DIR / 'analysis'
 
+# Compiled Jinja templates are cached on disk so new workers skip template compilation
+JINJA_CACHE_DIR = Path(os.environ.get('JINJA_CACHE_DIR', Path(tempfile.gettempdir()) / 'xtehr-jinja-cache'))
+
+# Rendered HTML and PDFs are shared across workers through a pluggable cache
+# (CACHE_BACKEND=filesystem|redis|null, see render_cache.py). Keys include a
+# digest of this file so a deploy with new rendering code starts fresh.
+render_cache = create_cache()
+CODE_VERSION = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()[:12]
+
+# Paragraph wrapping measures the same words in the same fonts over and over;
+# memoise those widths per (text, font, size) while PDFs are being built
+TEXT_WIDTH_CACHE_SIZE = int(os.environ.get('TEXT_WIDTH_CACHE_SIZE', 65536))
+
+@lru_cache(maxsize=TEXT_WIDTH_CACHE_SIZE)
+def _cached_string_width(text, font_name, font_size, encoding):
+    return pdfmetrics.stringWidth(text, font_name, font_size, encoding)
+
+def cached_string_width(text, fontName, fontSize, encoding='utf8'):
+    """Drop-in for pdfmetrics.stringWidth backed by a bounded LRU cache"""
+    return _cached_string_width(text, fontName, fontSize, encoding)
+
+_text_width_lock = threading.Lock()
+_text_width_users = 0
+
+@contextmanager
+def cached_text_widths():
+    """Route reportlab paragraph wrapping through cached_string_width for the
+    duration of the block, restoring pdfmetrics.stringWidth afterwards.
+
+    Builds run concurrently for ZIP exports, so the patch is reference
+    counted and only undone when the last build leaves.
+    """
+    global _text_width_users
+    with _text_width_lock:
+        if _text_width_users == 0:
+            rl_paragraph.stringWidth = cached_string_width
+        _text_width_users += 1
+    try:
+        yield
+    finally:
+        with _text_width_lock:
+            _text_width_users -= 1
+            if _text_width_users == 0:
+                rl_paragraph.stringWidth = pdfmetrics.stringWidth
+
+# Documents rendered in parallel for ZIP exports
+PDF_EXPORT_WORKERS = int(os.environ.get('PDF_EXPORT_WORKERS', 4))
+
+# Headings at or above this level start a new lazily loaded document section
+SECTION_LEVEL = 2
+HEADING_RE = re.compile(r'^(#{1,6})[ \t]+(.+?)[ \t]*#*[ \t]*$')
+FENCE_RE = re.compile(r'^[ \t]*(```|~~~)')
+
+# PARROT analysis results written by scripts/analyze_parrot.py, served read-only
+# by /api/analysis and reloaded when the analyzer replaces them (see analysis_store.py)
+ANALYSIS_RESULTS = Path(os.environ.get('ANALYSIS_RESULTS', BASE_DIR / 'output' / 'parrot_analysis.json'))
+analysis_store = AnalysisStore(ANALYSIS_RESULTS,
+                               check_interval=float(os.environ.get('ANALYSIS_RELOAD_INTERVAL', 2.0)))
+
+# Static-site freeze output (see the `flask freeze` command below)
+FREEZE_DIR = Path(os.environ.get('FREEZE_DIR', BASE_DIR / 'build' / 'static-site'))
+FREEZE_MANIFEST = '.freeze-manifest.json'
+
+class FragmentCacheExtension(Extension):
+    """Jinja extension adding a ``{% cache name, version %}`` block tag.
+
+    The rendered body is stored per fragment name and reused for as long as
+    the version arguments stay the same, so only one copy of each fragment
+    is ever kept.
+    """
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache={})
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(self.call_method('_cache_support', args),
+                               [], [], body).set_lineno(lineno)
+
+    def _cache_support(self, name, *version, caller):
+        """Return the cached fragment or render and store it"""
+        cached = self.environment.fragment_cache.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        rendered = caller()
+        self.environment.fragment_cache[name] = (version, rendered)
+        return rendered
+
+
+JINJA_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(str(JINJA_CACHE_DIR))
+app.jinja_env.add_extension(FragmentCacheExtension)
+
+
 class DocumentSeparator(Flowable):
     """Custom flowable to create visual document separators"""
     
@@ -140,13 +269,23 @@ class MarkdownRenderer:
     """Handles markdown rendering and PDF generation"""
     
     def __init__(self):
-        self.md = markdown.Markdown(extensions=[
-            'tables',
-            'fenced_code', 
-            'toc',
-            'attr_list',
-            'def_list'
-        ])
+        self._files_cache = (None, [])
+        self._local = threading.local()
+    
+    @property
+    def md(self):
+        """Markdown instance for the current thread (instances keep per-conversion state)"""
+        md = getattr(self._local, 'md', None)
+        if md is None:
+            md = markdown.Markdown(extensions=[
+                'tables',
+                'fenced_code', 
+                'toc',
+                'attr_list',
+                'def_list'
+            ])
+            self._local.md = md
+        return md
     
     def render_markdown(self, content):
         """Convert markdown to HTML"""
@@ -154,6 +293,121 @@ class MarkdownRenderer:
         self.md.reset()
         return self.md.convert(content)
     
+    def heading_anchors(self, lines):
+        """Locate headings outside fenced code and assign their toc ids.
+
+        The ``toc`` extension is run over the headings alone so the ids
+        match those of a full render. Returns the toc tokens and a list of
+        ``(line_index, level, text, anchor)`` tuples in document order.
+        """
+        headings = []
+        in_fence = False
+        for idx, line in enumerate(lines):
+            if FENCE_RE.match(line):
+                in_fence = not in_fence
+                continue
+            match = None if in_fence else HEADING_RE.match(line)
+            if match:
+                headings.append((idx, len(match.group(1)), match.group(2)))
+
+        self.md.reset()
+        self.md.convert('\n\n'.join(lines[idx] for idx, _, _ in headings))
+        toc_tokens = self.md.toc_tokens
+
+        def flatten(tokens):
+            for token in tokens:
+                yield token
+                yield from flatten(token['children'])
+
+        ids = [token['id'] for token in flatten(toc_tokens)]
+        if len(ids) != len(headings):
+            # Unusual heading markup; fall back to the extension's slugify
+            toc = self.md.treeprocessors['toc']
+            ids = [toc.slugify(html.unescape(text), toc.sep) for _, _, text in headings]
+
+        return toc_tokens, [heading + (anchor,) for heading, anchor in zip(headings, ids)]
+
+    def split_sections(self, content):
+        """Split markdown into sections starting at level 1-2 headings.
+
+        Returns the toc tokens and a list of sections, each with its anchor,
+        title, the raw markdown and a copy with explicit ``{: #id}``
+        attributes on every heading.
+        """
+        lines = content.split('\n')
+        toc_tokens, headings = self.heading_anchors(lines)
+
+        anchored = list(lines)
+        heading_ids = {}
+        for idx, level, text, anchor in headings:
+            heading_ids[idx] = (anchor, level, text)
+            if not text.rstrip().endswith('}'):
+                anchored[idx] = f"{'#' * level} {text} {{: #{anchor} }}"
+
+        starts = sorted({0} | {idx for idx, level, _, _ in headings if level <= SECTION_LEVEL})
+        sections = []
+        for start, end in zip(starts, starts[1:] + [len(lines)]):
+            anchor, _, title = heading_ids.get(start, ('top', 0, ''))
+            raw = '\n'.join(lines[start:end])
+            if not raw.strip():
+                continue
+            sections.append({
+                'id': anchor,
+                'title': title,
+                'markdown': raw,
+                'anchored_markdown': '\n'.join(anchored[start:end])
+            })
+        return toc_tokens, sections
+
+    def select_sections(self, content, anchors):
+        """Return only the markdown under the given heading anchors.
+
+        Each anchor covers its heading down to the next heading of the same
+        or a higher level. Overlapping selections are merged and the result
+        keeps document order. Raises KeyError naming any unknown anchor.
+        """
+        lines = content.split('\n')
+        _, headings = self.heading_anchors(lines)
+        positions = {anchor: pos for pos, (_, _, _, anchor) in enumerate(headings)}
+
+        unknown = [anchor for anchor in anchors if anchor not in positions]
+        if unknown:
+            raise KeyError(', '.join(unknown))
+
+        selected = set()
+        for anchor in anchors:
+            pos = positions[anchor]
+            start, level = headings[pos][0], headings[pos][1]
+            end = next((idx for idx, other_level, _, _ in headings[pos + 1:]
+                        if other_level <= level), len(lines))
+            selected.update(range(start, end))
+
+        return '\n'.join(lines[idx] for idx in sorted(selected))
+
+    @lru_cache(maxsize=64)
+    def document_sections(self, file_path, mtime_ns):
+        """Return the cached section split of a document version"""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        return self.split_sections(content)
+
+    @lru_cache(maxsize=256)
+    def source_digest(self, file_path, mtime_ns):
+        """Return the sha256 of a document version, used in shared cache keys"""
+        return hashlib.sha256(Path(file_path).read_bytes()).hexdigest()
+
+    def render_section(self, file_path, mtime_ns, anchor):
+        """Render a single document section to HTML via the shared cache"""
+        _, sections = self.document_sections(file_path, mtime_ns)
+        for section in sections:
+            if section['id'] == anchor:
+                key = render_cache.make_key('section', CODE_VERSION,
+                                            self.source_digest(file_path, mtime_ns), anchor)
+                return render_cache.get_or_set(
+                    key, lambda: self.render_markdown(section['anchored_markdown'])
+                ).decode('utf-8')
+        return None
+
     def clean_html_for_reportlab(self, html_content):
         """Clean HTML content for ReportLab compatibility"""
         import re
@@ -186,7 +440,10 @@ class MarkdownRenderer:
         return html_content
     
     def needs_landscape(self, table_data):
-        """Determine if a table needs landscape orientation based on content"""
+        """Determine if a table needs landscape orientation based on content
+
+        Used by the 'auto' PDF orientation to place wide tables on landscape pages.
+        """
         if not table_data or len(table_data) == 0:
             return False
         
@@ -323,128 +580,170 @@ class MarkdownRenderer:
         table.setStyle(table_style)
         return table
     
-    def get_document_files(self):
-        """Get all markdown files from docs and analysis directories"""
-        files = []
-        
-        # Files to exclude from the home page (deployment-related)
-        excluded_files = {
-            'DEPLOYMENT.md',
-            'HEROKU_QUICKSTART.md', 
-            'DEPLOYMENT_CONFIG.md'
-        }
-        
-        # Root files that should be in Documentation category
-        documentation_root_files = {
-            'EXECUTIVE_SUMMARY.md',
-            'README.md'
-        }
-        
-        # Get docs files
-        if DOCS_DIR.exists():
-            for file in DOCS_DIR.glob('*.md'):
-                files.append({
-                    'name': file.stem,
-                    'path': str(file.relative_to(BASE_DIR)),
-                    'category': 'Documentation',
-                    'file_path': str(file)
-                })
-        
-        # Get analysis files
-        if ANALYSIS_DIR.exists():
-            for file in ANALYSIS_DIR.glob('*.md'):
-                files.append({
-                    'name': file.stem,
-                    'path': str(file.relative_to(BASE_DIR)),
-                    'category': 'Analysis',
-                    'file_path': str(file)
-                })
-        
-        # Add root level files (excluding deployment docs)
-        for file in BASE_DIR.glob('*.md'):
-            # Skip excluded deployment files
-            if file.name in excluded_files:
-                continue
-                
-            # Categorize root files
-            if file.name in documentation_root_files:
-                category = 'Documentation'
-            else:
-                category = 'Project Root'
-                
-            files.append({
-                'name': file.stem,
-                'path': str(file.relative_to(BASE_DIR)),
-                'category': category,
-                'file_path': str(file)
-            })
-        
-        return sorted(files, key=lambda x: (x['category'], x['name']))
-
-renderer = MarkdownRenderer()
-
-@app.route('/')
-def index():
-    """Main page showing all available documents"""
-    files = renderer.get_document_files()
-    return render_template('index.html', files=files)
+    def create_doc_template(self, buffer, pdf_orientation):
+        """Create the document template for the requested orientation.
 
-@app.route('/document/<path:doc_path>')
-def view_document(doc_path):
-    """View a specific markdown document"""
-    file_path = BASE_DIR / doc_path
-    
-    if not file_path.exists() or not file_path.suffix == '.md':
-        return "Document not found", 404
+        'portrait' and 'landscape' use a single page size. 'auto' registers
+        a portrait and a landscape page template so one build can mix both;
+        append_markdown_flowables switches between them.
+        """
+        margins = dict(rightMargin=0.8*inch, leftMargin=0.8*inch,
+                       topMargin=1*inch, bottomMargin=1*inch)
+        if pdf_orientation != 'auto':
+            page_size = A4 if pdf_orientation == 'portrait' else landscape(A4)
+            return SimpleDocTemplate(buffer, pagesize=page_size, **margins)
+        
+        doc = BaseDocTemplate(buffer, pagesize=A4, **margins)
+        page_templates = []
+        for template_id, page_size in (('portrait', A4), ('landscape', landscape(A4))):
+            frame = Frame(doc.leftMargin, doc.bottomMargin,
+                          page_size[0] - doc.leftMargin - doc.rightMargin,
+                          page_size[1] - doc.topMargin - doc.bottomMargin,
+                          id=template_id)
+            page_templates.append(PageTemplate(id=template_id, frames=[frame], pagesize=page_size))
+        doc.addPageTemplates(page_templates)
+        return doc
     
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        html_content = renderer.render_markdown(content)
-        
-        return render_template('document.html', 
-                             content=html_content, 
-                             title=file_path.stem,
-                             doc_path=doc_path)
-    except Exception as e:
-        return f"Error reading document: {str(e)}", 500
+    def switch_page_template(self, story, layout, template_id, heading_start=None):
+        """Start a new page with another template in an 'auto' orientation build.
 
-@app.route('/collection')
-def document_collection():
-    """Document collection page for bulk PDF generation"""
-    files = renderer.get_document_files()
-    return render_template('collection.html', files=files)
+        Flowables from heading_start onwards (a heading still waiting for its
+        content) are moved onto the new page with the content they introduce.
+        """
+        if layout['template'] == template_id:
+            return
+        moved = []
+        if heading_start is not None:
+            moved = story[heading_start:]
+            del story[heading_start:]
+        story.append(NextPageTemplate(template_id))
+        story.append(PageBreakIfNotEmpty())
+        story.extend(moved)
+        layout['template'] = template_id
+    
+    def append_markdown_flowables(self, story, content, title_style, heading_style, normal_style,
+                                  pdf_orientation, spacing=(20, 15, 10), layout=None):
+        """Parse markdown content and append its flowables to the story.
 
-@app.route('/export-bulk-pdf', methods=['POST'])
-def export_bulk_pdf():
-    """Generate a combined PDF from selected documents with user-selected orientation"""
-    try:
-        # Get selected documents and orientation from form
-        selected_docs = request.form.getlist('selected_documents')
-        pdf_orientation = request.form.get('pdf_orientation', 'landscape')  # Default to landscape
-        
-        if not selected_docs:
-            return jsonify({'error': 'No documents selected'}), 400
-        
+        With pdf_orientation 'auto', tables that need_landscape go on
+        landscape pages and prose on portrait pages; ``layout`` carries the
+        current page template between calls.
+        """
+        auto = pdf_orientation == 'auto'
+        if layout is None:
+            layout = {'template': 'portrait'}
+        heading_start = None  # Index of a heading not yet followed by content
+        
+        lines = content.split('\n')
+        i = 0
+        
+        while i < len(lines):
+            line = lines[i].strip()
+            
+            # Skip empty lines
+            if not line:
+                i += 1
+                continue
+            
+            # Handle headers
+            if line.startswith('#'):
+                level = len(line) - len(line.lstrip('#'))
+                header_text = line.lstrip('#').strip()
+                if heading_start is None:
+                    heading_start = len(story)
+                
+                if level == 1:
+                    story.append(Spacer(1, spacing[0]))
+                    story.append(Paragraph(html.escape(header_text), title_style))
+                elif level == 2:
+                    story.append(Spacer(1, spacing[1]))
+                    story.append(Paragraph(html.escape(header_text), heading_style))
+                else:
+                    story.append(Spacer(1, spacing[2]))
+                    story.append(Paragraph(html.escape(header_text), heading_style))
+                
+                story.append(Spacer(1, 6))
+                i += 1
+                continue
+            
+            # Handle tables
+            if '|' in line and ('Element' in line or 'Classification' in line or '---' in line):
+                # This looks like a table, let's parse it
+                table_data = []
+                
+                # Get table rows
+                while i < len(lines) and ('|' in lines[i] or not lines[i].strip()):
+                    current_line = lines[i].strip()
+                    if current_line and '|' in current_line:
+                        # Parse table row
+                        row_data = [cell.strip() for cell in current_line.split('|')[1:-1]]  # Remove empty first/last
+                        if row_data and not all('---' in cell for cell in row_data):  # Skip separator lines
+                            table_data.append(row_data)
+                    i += 1
+                
+                if table_data:
+                    if auto:
+                        # Wide tables move to a landscape page; narrow ones stay where they are
+                        if self.needs_landscape(table_data):
+                            self.switch_page_template(story, layout, 'landscape', heading_start)
+                        is_landscape = layout['template'] == 'landscape'
+                    else:
+                        is_landscape = (pdf_orientation == 'landscape')
+                    wrapped_table = self.create_wrapped_table(table_data, is_landscape=is_landscape)
+                    if wrapped_table:
+                        story.append(wrapped_table)
+                        story.append(Spacer(1, 12))
+                heading_start = None
+                continue
+            
+            # Handle regular paragraphs (horizontal rules don't count as prose)
+            if auto and not re.fullmatch(r'([-*_])\1{2,}', line):
+                self.switch_page_template(story, layout, 'portrait', heading_start)
+                heading_start = None
+            paragraph_lines = [line]
+            i += 1
+            
+            # Collect multi-line paragraphs
+            while i < len(lines) and lines[i].strip() and not lines[i].startswith('#') and '|' not in lines[i]:
+                paragraph_lines.append(lines[i].strip())
+                i += 1
+            
+            if paragraph_lines:
+                # Join paragraph lines and clean up markdown
+                para_text = ' '.join(paragraph_lines)
+                
+                # First convert markdown to HTML
+                html_content = self.render_markdown(para_text)
+                
+                # Clean HTML for ReportLab compatibility
+                clean_html = self.clean_html_for_reportlab(html_content)
+                
+                # Remove paragraph tags as ReportLab adds them
+                clean_html = re.sub(r'</?p[^>]*>', '', clean_html)
+                
+                try:
+                    story.append(Paragraph(clean_html, normal_style))
+                    story.append(Spacer(1, 6))
+                except Exception as e:
+                    # Fallback to plain text if HTML parsing fails
+                    plain_text = html.escape(para_text)
+                    story.append(Paragraph(plain_text, normal_style))
+                    story.append(Spacer(1, 6))
+    
+    def build_collection_pdf(self, selected_docs, pdf_orientation):
+        """Lay out the selected documents as one combined PDF and return its bytes"""
         # Create a BytesIO buffer to store the PDF
         buffer = io.BytesIO()
         
         # Create PDF document with user-selected orientation
-        if pdf_orientation == 'portrait':
-            page_size = A4
-        else:
-            page_size = landscape(A4)
-            
-        doc = SimpleDocTemplate(buffer, pagesize=page_size, 
-                              rightMargin=0.8*inch, leftMargin=0.8*inch,
-                              topMargin=1*inch, bottomMargin=1*inch)
+        doc = self.create_doc_template(buffer, pdf_orientation)
+        layout = {'template': 'portrait'}
         
         # Get styles
         styles = getSampleStyleSheet()
         
-        # Determine font sizes based on orientation
-        if page_size == landscape(A4):
+        # Determine font sizes based on orientation ('auto' starts on portrait pages)
+        if pdf_orientation == 'landscape':
             # Landscape orientation - more horizontal space, can use larger fonts
             title_font_size = 22
             doc_title_font_size = 18
@@ -522,6 +821,10 @@ def export_bulk_pdf():
                 
                 # Add document separator (except for the first document)
                 if i > 1:
+                    if pdf_orientation == 'auto':
+                        # Each document starts on a portrait page
+                        story.append(NextPageTemplate('portrait'))
+                        layout['template'] = 'portrait'
                     story.append(PageBreak())
                     story.append(Spacer(1, 20))
                 
@@ -554,86 +857,9 @@ def export_bulk_pdf():
                 story.append(Spacer(1, 10))
                 
                 # Parse markdown content for this document
-                lines = content.split('\n')
-                line_idx = 0
-                
-                while line_idx < len(lines):
-                    line = lines[line_idx].strip()
-                    
-                    # Skip empty lines
-                    if not line:
-                        line_idx += 1
-                        continue
-                    
-                    # Handle headers
-                    if line.startswith('#'):
-                        level = len(line) - len(line.lstrip('#'))
-                        header_text = line.lstrip('#').strip()
-                        
-                        if level == 1:
-                            story.append(Spacer(1, 15))
-                            story.append(Paragraph(html.escape(header_text), heading_style))
-                        elif level == 2:
-                            story.append(Spacer(1, 12))
-                            story.append(Paragraph(html.escape(header_text), heading_style))
-                        else:
-                            story.append(Spacer(1, 8))
-                            story.append(Paragraph(html.escape(header_text), heading_style))
-                        
-                        story.append(Spacer(1, 6))
-                        line_idx += 1
-                        continue
-                    
-                    # Handle tables
-                    if '|' in line and ('Element' in line or 'Classification' in line or '---' in line):
-                        # Parse table
-                        table_data = []
-                        
-                        while line_idx < len(lines) and ('|' in lines[line_idx] or not lines[line_idx].strip()):
-                            current_line = lines[line_idx].strip()
-                            if current_line and '|' in current_line:
-                                row_data = [cell.strip() for cell in current_line.split('|')[1:-1]]
-                                if row_data and not all('---' in cell for cell in row_data):
-                                    table_data.append(row_data)
-                            line_idx += 1
-                        
-                        if table_data:
-                            # Use the new wrapped table method with user-selected orientation
-                            is_landscape = (pdf_orientation == 'landscape')
-                            wrapped_table = renderer.create_wrapped_table(table_data, is_landscape=is_landscape)
-                            if wrapped_table:
-                                story.append(wrapped_table)
-                                story.append(Spacer(1, 12))
-                        continue
-                    
-                    # Handle regular paragraphs
-                    paragraph_lines = [line]
-                    line_idx += 1
-                    
-                    while line_idx < len(lines) and lines[line_idx].strip() and not lines[line_idx].startswith('#') and '|' not in lines[line_idx]:
-                        paragraph_lines.append(lines[line_idx].strip())
-                        line_idx += 1
-                    
-                    if paragraph_lines:
-                        para_text = ' '.join(paragraph_lines)
-                        
-                        # First convert markdown to HTML
-                        html_content = renderer.render_markdown(para_text)
-                        
-                        # Clean HTML for ReportLab compatibility
-                        clean_html = renderer.clean_html_for_reportlab(html_content)
-                        
-                        # Remove paragraph tags as ReportLab adds them
-                        clean_html = re.sub(r'</?p[^>]*>', '', clean_html)
-                        
-                        try:
-                            story.append(Paragraph(clean_html, normal_style))
-                            story.append(Spacer(1, 6))
-                        except Exception as e:
-                            # Fallback to plain text if HTML parsing fails
-                            plain_text = html.escape(para_text)
-                            story.append(Paragraph(plain_text, normal_style))
-                            story.append(Spacer(1, 6))
+                self.append_markdown_flowables(story, content, heading_style, heading_style,
+                                               normal_style, pdf_orientation,
+                                               spacing=(15, 12, 8), layout=layout)
                 
                 # Add document footer separator
                 story.append(Spacer(1, 20))
@@ -690,6 +916,8 @@ def export_bulk_pdf():
                     pass
         
         # Add final summary section
+        if pdf_orientation == 'auto':
+            story.append(NextPageTemplate('portrait'))
         story.append(PageBreak())
         story.append(Spacer(1, 30))
         
@@ -748,12 +976,377 @@ def export_bulk_pdf():
         story.append(Paragraph("Thank you for using the Xt-EHR Analysis Platform", final_footer_style))
         
         # Build PDF
-        doc.build(story)
+        with cached_text_widths():
+            doc.build(story)
         
         # Get PDF bytes
         pdf_bytes = buffer.getvalue()
         buffer.close()
         
+        return pdf_bytes
+
+    def build_document_pdf(self, file_path, content, pdf_orientation):
+        """Lay out a single markdown document as a PDF and return its bytes"""
+        # Create a BytesIO buffer to store the PDF
+        buffer = io.BytesIO()
+        
+        # Create PDF document with user-selected orientation
+        doc = self.create_doc_template(buffer, pdf_orientation)
+        layout = {'template': 'portrait'}
+        
+        # Get styles
+        styles = getSampleStyleSheet()
+        
+        # Create custom styles with HCO colors
+        title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=18,
+            textColor=colors.Color(0, 95/255, 95/255),  # HCO primary teal
+            spaceAfter=30,
+            alignment=1  # Center alignment
+        )
+        
+        heading_style = ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=14,
+            textColor=colors.Color(45/255, 90/255, 39/255),  # HCO secondary green
+            spaceBefore=20,
+            spaceAfter=12
+        )
+        
+        normal_style = ParagraphStyle(
+            'CustomNormal',
+            parent=styles['Normal'],
+            fontSize=11,
+            textColor=colors.Color(45/255, 55/255, 72/255),  # HCO neutral dark
+            spaceAfter=12
+        )
+        
+        # Build PDF content with proper markdown parsing
+        story = []
+        
+        # Add header
+        story.append(Paragraph("Xt-EHR T7.2 Sub-team for Imaging Reports Model", title_style))
+        story.append(Paragraph(f"Xt-EHR Analysis Platform", normal_style))
+        story.append(Paragraph(f"Document: {file_path.stem}", heading_style))
+        story.append(Paragraph(f"Generated: {datetime.now().strftime('%B %d, %Y')}", normal_style))
+        story.append(Spacer(1, 10))
+        
+        # Add data source credits
+        credits_style = ParagraphStyle(
+            'CreditsContent',
+            parent=normal_style,
+            fontSize=9,
+            textColor=colors.Color(100/255, 100/255, 100/255),
+            alignment=1,  # Center alignment
+            spaceAfter=8
+        )
+        story.append(Paragraph("Analysis based on PARROT v1.0 dataset and Xt-EHR FHIR Implementation Guide", credits_style))
+        story.append(Spacer(1, 20))
+        
+        # Parse markdown content properly
+        self.append_markdown_flowables(story, content, title_style, heading_style,
+                                       normal_style, pdf_orientation, layout=layout)
+        
+        # Build PDF
+        with cached_text_widths():
+            doc.build(story)
+        
+        # Get PDF bytes
+        pdf_bytes = buffer.getvalue()
+        buffer.close()
+        
+        return pdf_bytes
+    def document_index_version(self):
+        """Return a cheap token that changes whenever the document list changes.
+
+        Adding, removing or renaming a markdown file updates the mtime of its
+        directory, so stat-ing the three source directories is enough.
+        """
+        version = []
+        for directory in (BASE_DIR, DOCS_DIR, ANALYSIS_DIR):
+            try:
+                version.append(directory.stat().st_mtime_ns)
+            except OSError:
+                version.append(0)
+        return '-'.join(str(part) for part in version)
+
+    def get_document_files(self):
+        """Get all markdown files, reusing the last scan while the index version is unchanged"""
+        version = self.document_index_version()
+        if self._files_cache[0] != version:
+            self._files_cache = (version, self._scan_document_files())
+        return self._files_cache[1]
+
+    def _scan_document_files(self):
+        """Scan the docs, analysis and root directories for markdown files"""
+        files = []
+        
+        # Files to exclude from the home page (deployment-related)
+        excluded_files = {
+            'DEPLOYMENT.md',
+            'HEROKU_QUICKSTART.md', 
+            'DEPLOYMENT_CONFIG.md'
+        }
+        
+        # Root files that should be in Documentation category
+        documentation_root_files = {
+            'EXECUTIVE_SUMMARY.md',
+            'README.md'
+        }
+        
+        # Get docs files
+        if DOCS_DIR.exists():
+            for file in DOCS_DIR.glob('*.md'):
+                files.append({
+                    'name': file.stem,
+                    'path': str(file.relative_to(BASE_DIR)),
+                    'category': 'Documentation',
+                    'file_path': str(file)
+                })
+        
+        # Get analysis files
+        if ANALYSIS_DIR.exists():
+            for file in ANALYSIS_DIR.glob('*.md'):
+                files.append({
+                    'name': file.stem,
+                    'path': str(file.relative_to(BASE_DIR)),
+                    'category': 'Analysis',
+                    'file_path': str(file)
+                })
+        
+        # Add root level files (excluding deployment docs)
+        for file in BASE_DIR.glob('*.md'):
+            # Skip excluded deployment files
+            if file.name in excluded_files:
+                continue
+                
+            # Categorize root files
+            if file.name in documentation_root_files:
+                category = 'Documentation'
+            else:
+                category = 'Project Root'
+                
+            files.append({
+                'name': file.stem,
+                'path': str(file.relative_to(BASE_DIR)),
+                'category': category,
+                'file_path': str(file)
+            })
+        
+        return sorted(files, key=lambda x: (x['category'], x['name']))
+
+renderer = MarkdownRenderer()
+
+def render_document_pdf(file_path, pdf_orientation, selected_sections=()):
+    """Return the PDF bytes for one document, going through the shared render cache.
+
+    Raises KeyError when a selected section anchor does not exist.
+    """
+    digest = renderer.source_digest(str(file_path), file_path.stat().st_mtime_ns)
+    cache_key = render_cache.make_key('pdf', CODE_VERSION, digest, pdf_orientation,
+                                      *selected_sections)
+    pdf_bytes = render_cache.get(cache_key)
+    if pdf_bytes is None:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        if selected_sections:
+            content = renderer.select_sections(content, selected_sections)
+        pdf_bytes = renderer.build_document_pdf(file_path, content, pdf_orientation)
+        render_cache.set(cache_key, pdf_bytes)
+    return pdf_bytes
+
+class ZipStreamSink(io.RawIOBase):
+    """Unseekable write target that hands ZipFile output back in chunks"""
+    
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self._position
+    
+    def drain(self):
+        """Return and forget everything written since the last drain"""
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def stream_pdf_zip(selected_docs, pdf_orientation, workers=PDF_EXPORT_WORKERS):
+    """Render each document to its own PDF in parallel and yield a ZIP as they finish.
+
+    At most ``2 * workers`` documents are in flight, so memory stays bounded
+    however many documents are selected. Members are named with their
+    selection number so they sort in selection order; a document that fails
+    to render becomes a short ``.error.txt`` member instead.
+    """
+    def render(number, doc_path):
+        file_path = BASE_DIR / doc_path
+        name = f"{number:02d}_{file_path.stem}_{pdf_orientation.capitalize()}"
+        try:
+            return f"{name}.pdf", render_document_pdf(file_path, pdf_orientation)
+        except Exception as e:
+            print(f"ZIP PDF Error: {doc_path}: {e}")
+            return f"{name}.error.txt", f"Error generating PDF for {doc_path}: {e}\n".encode('utf-8')
+    
+    sink = ZipStreamSink()
+    jobs = iter(enumerate(selected_docs, 1))
+    # PDFs are already compressed, so members are stored as-is
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            
+            def submit_more():
+                for number, doc_path in jobs:
+                    pending.add(pool.submit(render, number, doc_path))
+                    if len(pending) >= workers * 2:
+                        break
+            
+            submit_more()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.discard(future)
+                    name, data = future.result()
+                    archive.writestr(name, data)
+                    yield sink.drain()
+                submit_more()
+    # Central directory, written when the archive closes
+    yield sink.drain()
+
+@app.route('/')
+def index():
+    """Main page showing all available documents"""
+    files = renderer.get_document_files()
+    return render_template('index.html', files=files,
+                           index_version=renderer.document_index_version())
+
+@app.route('/document/<path:doc_path>')
+def view_document(doc_path):
+    """View a specific markdown document"""
+    file_path = BASE_DIR / doc_path
+    
+    if not file_path.exists() or not file_path.suffix == '.md':
+        return "Document not found", 404
+    
+    try:
+        if request.args.get('lazy'):
+            # Send only the first section; the page fetches the rest on scroll
+            mtime_ns = file_path.stat().st_mtime_ns
+            _, sections = renderer.document_sections(str(file_path), mtime_ns)
+            first = sections[0]['id'] if sections else None
+            html_content = renderer.render_section(str(file_path), mtime_ns, first) or ''
+            return render_template('document.html',
+                                 content=html_content,
+                                 title=file_path.stem,
+                                 doc_path=doc_path,
+                                 lazy_sections=[{'id': s['id'], 'title': s['title']} for s in sections[1:]])
+
+        def render_full_document():
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return renderer.render_markdown(f.read())
+        
+        digest = renderer.source_digest(str(file_path), file_path.stat().st_mtime_ns)
+        html_content = render_cache.get_or_set(
+            render_cache.make_key('html', CODE_VERSION, digest), render_full_document
+        ).decode('utf-8')
+        
+        return render_template('document.html', 
+                             content=html_content, 
+                             title=file_path.stem,
+                             doc_path=doc_path)
+    except Exception as e:
+        return f"Error reading document: {str(e)}", 500
+
+@app.route('/api/sections/<path:doc_path>')
+def api_document_sections(doc_path):
+    """Return a document's TOC and first section, or one section by ?anchor="""
+    file_path = BASE_DIR / doc_path
+    
+    if not file_path.exists() or not file_path.suffix == '.md':
+        return jsonify({'error': 'Document not found'}), 404
+    
+    mtime_ns = file_path.stat().st_mtime_ns
+    toc_tokens, sections = renderer.document_sections(str(file_path), mtime_ns)
+    anchors = [section['id'] for section in sections]
+    
+    anchor = request.args.get('anchor')
+    if anchor is None:
+        first = anchors[0] if anchors else None
+        return jsonify({
+            'title': file_path.stem,
+            'toc': toc_tokens,
+            'sections': [{'id': s['id'], 'title': s['title']} for s in sections],
+            'id': first,
+            'html': renderer.render_section(str(file_path), mtime_ns, first) if first else '',
+            'next': anchors[1] if len(anchors) > 1 else None
+        })
+    
+    if anchor not in anchors:
+        return jsonify({'error': f'Section not found: {anchor}'}), 404
+    position = anchors.index(anchor)
+    return jsonify({
+        'id': anchor,
+        'html': renderer.render_section(str(file_path), mtime_ns, anchor),
+        'next': anchors[position + 1] if position + 1 < len(anchors) else None
+    })
+
+@app.route('/collection')
+def document_collection():
+    """Document collection page for bulk PDF generation"""
+    files = renderer.get_document_files()
+    return render_template('collection.html', files=files,
+                           index_version=renderer.document_index_version())
+
+@app.route('/export-bulk-pdf', methods=['POST'])
+def export_bulk_pdf():
+    """Generate a combined PDF (or a ZIP of per-document PDFs) from selected documents"""
+    try:
+        # Get selected documents and orientation from form
+        selected_docs = request.form.getlist('selected_documents')
+        pdf_orientation = request.form.get('pdf_orientation', 'landscape')  # Default to landscape
+        
+        if not selected_docs:
+            return jsonify({'error': 'No documents selected'}), 400
+        
+        # ZIP mode: one PDF per document, streamed as each finishes
+        if request.form.get('output_format') == 'zip':
+            existing_docs = [doc_path for doc_path in selected_docs
+                             if (BASE_DIR / doc_path).exists() and (BASE_DIR / doc_path).suffix == '.md']
+            if not existing_docs:
+                return jsonify({'error': 'None of the selected documents exist'}), 404
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f'XtEHR_T7.2_Documents_{pdf_orientation.capitalize()}_{timestamp}.zip'
+            return Response(
+                stream_pdf_zip(existing_docs, pdf_orientation),
+                mimetype='application/zip',
+                headers={'Content-Disposition': f'attachment; filename={filename}'}
+            )
+        
+        # Key the combined PDF on every selected document's content
+        digests = []
+        for doc_path in selected_docs:
+            file_path = BASE_DIR / doc_path
+            if file_path.exists():
+                digests.append(renderer.source_digest(str(file_path), file_path.stat().st_mtime_ns))
+            else:
+                digests.append('missing')
+        cache_key = render_cache.make_key('bulk-pdf', CODE_VERSION, pdf_orientation,
+                                          *selected_docs, *digests)
+        pdf_bytes = render_cache.get_or_set(
+            cache_key, lambda: renderer.build_collection_pdf(selected_docs, pdf_orientation)
+        )
+        
         # Create filename with timestamp and orientation
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         orientation_suffix = pdf_orientation.capitalize()
@@ -795,173 +1388,26 @@ def export_pdf(doc_path):
         else:
             pdf_orientation = 'landscape'  # Default for backward compatibility
             
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        html_content = renderer.render_markdown(content)
+        # Optionally restrict the export to the sections under given heading anchors
+        selected_sections = request.values.getlist('section')
         
         # Generate PDF using reportlab
         try:
-            # Create a BytesIO buffer to store the PDF
-            buffer = io.BytesIO()
-            
-            # Create PDF document with user-selected orientation
-            if pdf_orientation == 'portrait':
-                page_size = A4
-            else:
-                page_size = landscape(A4)
-                
-            doc = SimpleDocTemplate(buffer, pagesize=page_size, 
-                                  rightMargin=0.8*inch, leftMargin=0.8*inch,
-                                  topMargin=1*inch, bottomMargin=1*inch)
-            
-            # Get styles
-            styles = getSampleStyleSheet()
-            
-            # Create custom styles with HCO colors
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=18,
-                textColor=colors.Color(0, 95/255, 95/255),  # HCO primary teal
-                spaceAfter=30,
-                alignment=1  # Center alignment
-            )
-            
-            heading_style = ParagraphStyle(
-                'CustomHeading',
-                parent=styles['Heading2'],
-                fontSize=14,
-                textColor=colors.Color(45/255, 90/255, 39/255),  # HCO secondary green
-                spaceBefore=20,
-                spaceAfter=12
-            )
-            
-            normal_style = ParagraphStyle(
-                'CustomNormal',
-                parent=styles['Normal'],
-                fontSize=11,
-                textColor=colors.Color(45/255, 55/255, 72/255),  # HCO neutral dark
-                spaceAfter=12
-            )
-            
-            # Build PDF content with proper markdown parsing
-            story = []
-            
-            # Add header
-            story.append(Paragraph("Xt-EHR T7.2 Sub-team for Imaging Reports Model", title_style))
-            story.append(Paragraph(f"Xt-EHR Analysis Platform", normal_style))
-            story.append(Paragraph(f"Document: {file_path.stem}", heading_style))
-            story.append(Paragraph(f"Generated: {datetime.now().strftime('%B %d, %Y')}", normal_style))
-            story.append(Spacer(1, 10))
-            
-            # Add data source credits
-            credits_style = ParagraphStyle(
-                'CreditsContent',
-                parent=normal_style,
-                fontSize=9,
-                textColor=colors.Color(100/255, 100/255, 100/255),
-                alignment=1,  # Center alignment
-                spaceAfter=8
-            )
-            story.append(Paragraph("Analysis based on PARROT v1.0 dataset and Xt-EHR FHIR Implementation Guide", credits_style))
-            story.append(Spacer(1, 20))
-            
-            # Parse markdown content properly
-            lines = content.split('\n')
-            i = 0
-            
-            while i < len(lines):
-                line = lines[i].strip()
-                
-                # Skip empty lines
-                if not line:
-                    i += 1
-                    continue
-                
-                # Handle headers
-                if line.startswith('#'):
-                    level = len(line) - len(line.lstrip('#'))
-                    header_text = line.lstrip('#').strip()
-                    
-                    if level == 1:
-                        story.append(Spacer(1, 20))
-                        story.append(Paragraph(html.escape(header_text), title_style))
-                    elif level == 2:
-                        story.append(Spacer(1, 15))
-                        story.append(Paragraph(html.escape(header_text), heading_style))
-                    else:
-                        story.append(Spacer(1, 10))
-                        story.append(Paragraph(html.escape(header_text), heading_style))
-                    
-                    story.append(Spacer(1, 6))
-                    i += 1
-                    continue
-                
-                # Handle tables
-                if '|' in line and ('Element' in line or 'Classification' in line or '---' in line):
-                    # This looks like a table, let's parse it
-                    table_data = []
-                    
-                    # Get table rows
-                    while i < len(lines) and ('|' in lines[i] or not lines[i].strip()):
-                        current_line = lines[i].strip()
-                        if current_line and '|' in current_line:
-                            # Parse table row
-                            row_data = [cell.strip() for cell in current_line.split('|')[1:-1]]  # Remove empty first/last
-                            if row_data and not all('---' in cell for cell in row_data):  # Skip separator lines
-                                table_data.append(row_data)
-                        i += 1
-                    
-                    if table_data:
-                        # Use the new wrapped table method with user-selected orientation
-                        is_landscape = (pdf_orientation == 'landscape')
-                        wrapped_table = renderer.create_wrapped_table(table_data, is_landscape=is_landscape)
-                        if wrapped_table:
-                            story.append(wrapped_table)
-                            story.append(Spacer(1, 12))
-                    continue
-                
-                # Handle regular paragraphs
-                paragraph_lines = [line]
-                i += 1
-                
-                # Collect multi-line paragraphs
-                while i < len(lines) and lines[i].strip() and not lines[i].startswith('#') and '|' not in lines[i]:
-                    paragraph_lines.append(lines[i].strip())
-                    i += 1
-                
-                if paragraph_lines:
-                    # Join paragraph lines and clean up markdown
-                    para_text = ' '.join(paragraph_lines)
-                    
-                    # First convert markdown to HTML
-                    html_content = renderer.render_markdown(para_text)
-                    
-                    # Clean HTML for ReportLab compatibility
-                    clean_html = renderer.clean_html_for_reportlab(html_content)
-                    
-                    # Remove paragraph tags as ReportLab adds them
-                    clean_html = re.sub(r'</?p[^>]*>', '', clean_html)
-                    
-                    try:
-                        story.append(Paragraph(clean_html, normal_style))
-                        story.append(Spacer(1, 6))
-                    except Exception as e:
-                        # Fallback to plain text if HTML parsing fails
-                        plain_text = html.escape(para_text)
-                        story.append(Paragraph(plain_text, normal_style))
-                        story.append(Spacer(1, 6))
-            
-            # Build PDF
-            doc.build(story)
-            
-            # Get PDF bytes
-            pdf_bytes = buffer.getvalue()
-            buffer.close()
+            try:
+                pdf_bytes = render_document_pdf(file_path, pdf_orientation, selected_sections)
+            except KeyError as e:
+                return jsonify({
+                    'error': 'Section not found',
+                    'message': f'Unknown heading anchor(s): {e.args[0]}',
+                    'suggestion': 'Use the ids listed by /api/sections/<path>'
+                }), 400
             
-            # Create response with orientation in filename
+            # Create response with orientation (and section) in filename
             orientation_suffix = pdf_orientation.capitalize()
+            if selected_sections:
+                orientation_suffix += f"_{selected_sections[0]}"
+                if len(selected_sections) > 1:
+                    orientation_suffix += f"_and_{len(selected_sections) - 1}_more"
             response = send_file(
                 io.BytesIO(pdf_bytes),
                 mimetype='application/pdf',
@@ -986,6 +1432,58 @@ def api_documents():
     files = renderer.get_document_files()
     return jsonify(files)
 
+@app.route('/api/cache')
+def api_cache_stats():
+    """API endpoint reporting render cache and text width cache counters"""
+    stats = render_cache.stats()
+    stats['text_widths'] = _cached_string_width.cache_info()._asdict()
+    return jsonify(stats)
+
+@app.route('/api/analysis')
+def api_analysis_index():
+    """API endpoint listing the sections of the PARROT analysis results"""
+    snapshot = analysis_store.snapshot()
+    return jsonify({**analysis_store.stats(), 'sections': snapshot.sections() if snapshot else []})
+
+@app.route('/api/analysis/<section>')
+@app.route('/api/analysis/<section>/<path:key_path>')
+def api_analysis_section(section, key_path=None):
+    """One section of the PARROT analysis results, or a slice of it by key path.
+
+    e.g. /api/analysis/cross_tabs/modality_by_language/French. Responses
+    carry an ETag that only changes when the requested data does.
+    """
+    snapshot = analysis_store.snapshot()
+    if snapshot is None:
+        return jsonify({'error': 'Analysis results not found'}), 404
+    try:
+        etag = snapshot.etag(section)
+    except KeyError:
+        return jsonify({'error': f'Section not found: {section}'}), 404
+    keys = key_path.strip('/').split('/') if key_path else []
+    if keys:
+        etag = hashlib.sha256(f"{etag}/{'/'.join(keys)}".encode('utf-8')).hexdigest()[:20]
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        body = None if keys else snapshot.raw_section(section)
+        if body is None:
+            value = snapshot.section(section)
+            for position, key in enumerate(keys):
+                if isinstance(value, dict) and key in value:
+                    value = value[key]
+                elif isinstance(value, list) and key.isdigit() and int(key) < len(value):
+                    value = value[int(key)]
+                else:
+                    return jsonify({'error': f"Key not found: {'/'.join(keys[:position + 1])}"}), 404
+            # Not jsonify: it would sort keys, and most tables are ordered by count
+            body = json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @app.route('/favicon.ico')
 def favicon():
     """Serve the MyHealth@EU favicon"""
@@ -994,6 +1492,111 @@ def favicon():
         mimetype='image/vnd.microsoft.icon'
     )
 
+def _hash_paths(paths):
+    """Return a sha256 digest over the contents of the given files"""
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(str(path).encode('utf-8'))
+        digest.update(Path(path).read_bytes())
+    return digest.hexdigest()
+
+def _write_frozen_page(target, body):
+    """Write a frozen page plus its precompressed .gz (and .br) variants"""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_bytes(body)
+    # mtime=0 keeps the gzip output byte-identical between freezes
+    Path(f"{target}.gz").write_bytes(gzip.compress(body, compresslevel=9, mtime=0))
+    if brotli is not None:
+        Path(f"{target}.br").write_bytes(brotli.compress(body))
+
+def _remove_frozen_page(target):
+    """Remove a frozen page and its precompressed variants"""
+    for path in (target, Path(f"{target}.gz"), Path(f"{target}.br")):
+        if path.exists():
+            path.unlink()
+
+@app.cli.command('freeze')
+@click.option('--output', type=click.Path(file_okay=False), default=None,
+              help='Directory to write the static site to (default: FREEZE_DIR)')
+@click.option('--force', is_flag=True, help='Regenerate every page, ignoring the manifest')
+def freeze_command(output, force):
+    """Render the site into static files for read-only deployments.
+
+    Pages are written as ``<url>/index.html`` (``/api/documents`` as
+    ``api/documents/index.json``) with precompressed ``.gz`` variants, and
+    ``.br`` variants when the ``brotli`` package is installed. Only document
+    pages whose source markdown changed since the last freeze are rendered
+    again; the listing pages are rebuilt when the document list changes.
+    """
+    output_dir = Path(output) if output else FREEZE_DIR
+    manifest_path = output_dir / FREEZE_MANIFEST
+
+    manifest = {}
+    if manifest_path.exists() and not force:
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            manifest = {}
+
+    # Template or code changes invalidate every page
+    template_dir = Path(app.root_path) / app.template_folder
+    site_hash = _hash_paths(list(template_dir.glob('*.html')) + [Path(__file__)])
+    if manifest.get('site_hash') != site_hash:
+        manifest = {}
+
+    files = renderer.get_document_files()
+    old_documents = manifest.get('documents', {})
+    documents = {}
+    rendered = 0
+    client = app.test_client()
+
+    for file in files:
+        source_hash = _hash_paths([file['file_path']])
+        documents[file['path']] = source_hash
+        target = output_dir / 'document' / file['path'] / 'index.html'
+        if old_documents.get(file['path']) == source_hash and target.exists():
+            continue
+
+        response = client.get(f"/document/{file['path']}")
+        if response.status_code != 200:
+            click.echo(f"Skipping {file['path']}: HTTP {response.status_code}", err=True)
+            documents.pop(file['path'])
+            continue
+        _write_frozen_page(target, response.data)
+        rendered += 1
+
+    # Drop pages for documents that no longer exist
+    for doc_path in set(old_documents) - set(documents):
+        _remove_frozen_page(output_dir / 'document' / doc_path / 'index.html')
+
+    listing_pages = {
+        '/': output_dir / 'index.html',
+        '/collection': output_dir / 'collection' / 'index.html',
+        '/api/documents': output_dir / 'api' / 'documents' / 'index.json',
+    }
+    listing_changed = sorted(documents) != sorted(old_documents)
+    for url, target in listing_pages.items():
+        if not listing_changed and target.exists():
+            continue
+        response = client.get(url)
+        _write_frozen_page(target, response.data)
+        rendered += 1
+
+    # Static assets are copied verbatim
+    static_dir = Path(app.static_folder)
+    if static_dir.exists():
+        shutil.copytree(static_dir, output_dir / 'static', dirs_exist_ok=True)
+
+    manifest = {
+        'site_hash': site_hash,
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'documents': documents
+    }
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path.write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+
+    click.echo(f"Froze {rendered} page(s) for {len(documents)} document(s) into {output_dir}")
+
 if __name__ == '__main__':
     # Get configuration from environment variables
     host = os.environ.get('HOST', '0.0.0.0')
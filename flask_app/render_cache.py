@@ -0,0 +1,382 @@
+"""
+Shared cache backends for rendered artifacts (document HTML, sections and PDFs)
+
+Every gunicorn worker or dyno can point at the same store so an artifact
+rendered once is reused everywhere:
+
+- FileSystemCache: a directory on a (possibly network-)shared filesystem
+- RedisCache: any server speaking the Redis protocol (Redis, Valkey, KeyDB...)
+- NullCache: disables caching
+
+All backends store bytes, honour a per-entry TTL, evict the least recently
+written entries once ``max_bytes`` is exceeded and count hits and misses.
+"""
+import os
+import time
+import socket
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from urllib.parse import urlparse
+
+
+class BaseCache:
+    """Common interface and hit/miss accounting for cache backends"""
+
+    def __init__(self, default_ttl=86400, max_bytes=256 * 1024 * 1024, prefix='xtehr'):
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def make_key(self, *parts):
+        """Build a cache key from its parts, hashing it to a fixed length"""
+        raw = '\x1f'.join(str(part) for part in parts)
+        return f"{self.prefix}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+
+    def get(self, key):
+        """Return the cached bytes for key, or None"""
+        value = self._get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        """Store bytes under key for ttl seconds (default_ttl when omitted)"""
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        self._set(key, value, self.default_ttl if ttl is None else ttl)
+
+    def get_or_set(self, key, factory, ttl=None):
+        """Return the cached bytes, calling factory() to fill them on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            if isinstance(value, str):
+                value = value.encode('utf-8')
+            self.set(key, value, ttl)
+        return value
+
+    def delete(self, key):
+        """Remove a single entry"""
+        self._delete(key)
+
+    def stats(self):
+        """Return hit/miss counters for this process"""
+        total = self.hits + self.misses
+        return {
+            'backend': type(self).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0
+        }
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def _set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def _delete(self, key):
+        raise NotImplementedError
+
+
+class NullCache(BaseCache):
+    """Backend that never stores anything"""
+
+    def _get(self, key):
+        return None
+
+    def _set(self, key, value, ttl):
+        pass
+
+    def _delete(self, key):
+        pass
+
+
+class FileSystemCache(BaseCache):
+    """One file per entry in a directory shared by all workers.
+
+    Files start with a fixed-width expiry timestamp and are replaced
+    atomically, so concurrent workers never see partial writes. A file
+    whose header cannot be read (truncated or corrupt) counts as a miss
+    and is removed.
+
+    Scanning the directory for eviction is not done on every write: each
+    process keeps an estimate of the directory size (the last scan plus
+    its own writes since) and rescans once that passes ``max_bytes`` or
+    after ``EVICT_INTERVAL`` writes, which picks up other workers' writes.
+    """
+
+    HEADER_SIZE = 20
+    EVICT_INTERVAL = 64
+
+    def __init__(self, cache_dir, **kwargs):
+        super().__init__(**kwargs)
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._writes_since_scan = 0
+        self._estimated_bytes = None  # unknown until the first scan
+
+    def _path(self, key):
+        return self.cache_dir / key.replace(':', '_')
+
+    def _get(self, key):
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        try:
+            expires = float(data[:self.HEADER_SIZE])
+        except (ValueError, IndexError):
+            self._delete(key)
+            return None
+        if expires and expires < time.time():
+            self._delete(key)
+            return None
+        return data[self.HEADER_SIZE:]
+
+    def _set(self, key, value, ttl):
+        expires = time.time() + ttl if ttl else 0
+        header = f"{expires:<{self.HEADER_SIZE}.3f}".encode('ascii')
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header + value)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        with self._lock:
+            self._writes_since_scan += 1
+            if self._estimated_bytes is not None:
+                self._estimated_bytes += len(header) + len(value)
+            due = (self._estimated_bytes is None or self._estimated_bytes > self.max_bytes
+                   or self._writes_since_scan >= self.EVICT_INTERVAL)
+            if due:
+                self._writes_since_scan = 0
+        if due:
+            self._evict()
+
+    def _delete(self, key):
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Drop the oldest entries until the directory is under max_bytes"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.startswith('.tmp-') or not entry.is_file():
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+        if total > self.max_bytes:
+            for _, size, path in sorted(entries):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                total -= size
+                if total <= self.max_bytes * 0.9:
+                    break
+        with self._lock:
+            self._estimated_bytes = total
+
+
+class RedisCache(BaseCache):
+    """Backend for any Redis-protocol server with Lua scripting (EVAL), using
+    a minimal RESP client.
+
+    TTLs use the server's own expiry. For size-based eviction every entry
+    is recorded in a sorted set (by write time) and a hash of sizes, and
+    the oldest entries are removed once the running byte total exceeds
+    ``max_bytes``. Each write or removal updates the entry and that
+    bookkeeping in one server-side script, so concurrent workers cannot
+    leave the byte total out of step with the entries. Hit/miss counters
+    are also kept on the server so they cover every worker.
+    """
+
+    # KEYS: entry, index, sizes, bytes; ARGV: value, TTL in ms (0 = none), write time.
+    # Returns the new byte total.
+    SET_SCRIPT = """
+local previous = tonumber(redis.call('HGET', KEYS[3], KEYS[1]) or 0)
+if tonumber(ARGV[2]) > 0 then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+else
+    redis.call('SET', KEYS[1], ARGV[1])
+end
+redis.call('ZADD', KEYS[2], ARGV[3], KEYS[1])
+redis.call('HSET', KEYS[3], KEYS[1], string.len(ARGV[1]))
+return redis.call('INCRBY', KEYS[4], string.len(ARGV[1]) - previous)
+"""
+
+    # KEYS: entry, index, sizes, bytes. Returns the remaining byte total; an
+    # entry already forgotten (e.g. by another worker's eviction) counts 0.
+    FORGET_SCRIPT = """
+local size = tonumber(redis.call('HGET', KEYS[3], KEYS[1]) or 0)
+redis.call('DEL', KEYS[1])
+redis.call('ZREM', KEYS[2], KEYS[1])
+redis.call('HDEL', KEYS[3], KEYS[1])
+return redis.call('INCRBY', KEYS[4], -size)
+"""
+
+    def __init__(self, url='redis://localhost:6379/0', timeout=2.0, **kwargs):
+        super().__init__(**kwargs)
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.password = parsed.password
+        self.timeout = timeout
+        self._local = threading.local()
+        self._index_key = f"{self.prefix}:_index"
+        self._sizes_key = f"{self.prefix}:_sizes"
+        self._bytes_key = f"{self.prefix}:_bytes"
+
+    # RESP protocol -------------------------------------------------------
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            conn = (sock, sock.makefile('rb'))
+            self._local.conn = conn
+            if self.password:
+                self._command('AUTH', self.password)
+            if self.db:
+                self._command('SELECT', self.db)
+        return conn
+
+    def _command(self, *args):
+        """Send one command and return its decoded reply"""
+        sock, reader = self._connection()
+        payload = [f"*{len(args)}\r\n".encode('ascii')]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode('utf-8')
+            payload.append(f"${len(arg)}\r\n".encode('ascii') + arg + b"\r\n")
+        try:
+            sock.sendall(b''.join(payload))
+            return self._read_reply(reader)
+        except OSError:
+            self._local.conn = None
+            sock.close()
+            raise
+
+    def _read_reply(self, reader):
+        line = reader.readline()
+        if not line:
+            raise ConnectionError('Connection closed by cache server')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode('utf-8')
+        if kind == b'-':
+            raise RuntimeError(rest.decode('utf-8'))
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            count = int(rest)
+            if count < 0:
+                return None
+            return [self._read_reply(reader) for _ in range(count)]
+        raise RuntimeError(f'Unexpected reply from cache server: {line!r}')
+
+    # Cache operations ----------------------------------------------------
+
+    def get(self, key):
+        value = super().get(key)
+        try:
+            self._command('INCR', f"{self.prefix}:_{'misses' if value is None else 'hits'}")
+        except (OSError, RuntimeError):
+            pass
+        return value
+
+    def _get(self, key):
+        try:
+            return self._command('GET', key)
+        except (OSError, RuntimeError):
+            return None
+
+    def _script(self, script, key, *args):
+        """Run one of the bookkeeping scripts for an entry, atomically on the server"""
+        return self._command('EVAL', script, 4, key, self._index_key, self._sizes_key, self._bytes_key, *args)
+
+    def _set(self, key, value, ttl):
+        try:
+            total = self._script(self.SET_SCRIPT, key, value, max(1, int(ttl * 1000)) if ttl else 0,
+                                 f"{time.time():.6f}")
+            if total > self.max_bytes:
+                self._evict(total)
+        except (OSError, RuntimeError):
+            # A cache outage must never break rendering
+            pass
+
+    def _delete(self, key):
+        try:
+            self._forget(key)
+        except (OSError, RuntimeError):
+            pass
+
+    def _forget(self, key):
+        """Delete an entry and its bookkeeping; return the remaining byte total"""
+        return self._script(self.FORGET_SCRIPT, key)
+
+    def _evict(self, total):
+        """Remove the oldest entries until under 90% of max_bytes"""
+        while total > self.max_bytes * 0.9:
+            oldest = self._command('ZRANGE', self._index_key, 0, 15)
+            if not oldest:
+                break
+            for key in oldest:
+                total = self._forget(key)
+                if total <= self.max_bytes * 0.9:
+                    break
+
+    def stats(self):
+        stats = super().stats()
+        try:
+            hits = int(self._command('GET', f"{self.prefix}:_hits") or 0)
+            misses = int(self._command('GET', f"{self.prefix}:_misses") or 0)
+            stats['shared'] = {
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                'bytes': int(self._command('GET', self._bytes_key) or 0)
+            }
+        except (OSError, RuntimeError) as e:
+            stats['shared'] = {'error': str(e)}
+        return stats
+
+
+def create_cache(backend=None, **kwargs):
+    """Build the cache backend selected by CACHE_BACKEND and related env vars"""
+    backend = (backend or os.environ.get('CACHE_BACKEND', 'filesystem')).lower()
+    kwargs.setdefault('default_ttl', int(os.environ.get('CACHE_DEFAULT_TTL', 86400)))
+    kwargs.setdefault('max_bytes', int(os.environ.get('CACHE_MAX_BYTES', 256 * 1024 * 1024)))
+
+    if backend == 'redis':
+        return RedisCache(url=os.environ.get('CACHE_URL', 'redis://localhost:6379/0'), **kwargs)
+    if backend == 'filesystem':
+        cache_dir = os.environ.get('CACHE_DIR', Path(tempfile.gettempdir()) / 'xtehr-render-cache')
+        return FileSystemCache(cache_dir, **kwargs)
+    if backend in ('null', 'none'):
+        return NullCache(**kwargs)
+    raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
@@ -0,0 +1,143 @@
+"""
+Opt-in profiling of individual requests
+
+When ``REQUEST_PROFILING`` is enabled, any request carrying an
+``X-Profile`` header or a ``_profile`` query parameter is profiled and the
+response body is replaced by the profile as a downloadable artifact:
+
+- ``stacks`` (default): a sampling profile in collapsed-stack format, one
+  ``frame;frame;frame count`` line per unique stack, ready for
+  flamegraph.pl, speedscope or inferno
+- ``cprofile``: a cProfile dump loadable with ``pstats.Stats`` or snakeviz
+
+The original status code and the wall time are returned in the
+``X-Profile-Status`` and ``X-Profile-Duration`` headers. Only work done
+before the view returns is captured, so streamed bodies are not profiled.
+"""
+import sys
+import time
+import marshal
+import cProfile
+import threading
+from collections import Counter
+from datetime import datetime
+
+from flask import current_app, g, request, make_response
+
+
+class StackSampler:
+    """Samples one thread's call stack at a fixed interval"""
+
+    def __init__(self, thread_id, interval=0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        """Return the samples in collapsed-stack format"""
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + '\n'
+
+
+class RequestProfiler:
+    """Flask extension wiring the profiling hooks into an app"""
+
+    MODES = ('stacks', 'cprofile')
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('REQUEST_PROFILING', False)
+        app.config.setdefault('PROFILE_SAMPLE_INTERVAL', 0.001)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        # after_request is skipped when the view raises; teardown always runs
+        app.teardown_request(self._teardown)
+
+    def _requested_mode(self, app):
+        if not app.config['REQUEST_PROFILING']:
+            return None
+        mode = request.headers.get('X-Profile') or request.args.get('_profile')
+        if not mode:
+            return None
+        mode = mode.lower()
+        return mode if mode in self.MODES else 'stacks'
+
+    def _start(self):
+        mode = self._requested_mode(current_app)
+        if mode is None:
+            return
+        g.profile_mode = mode
+        g.profile_started = time.perf_counter()
+        if mode == 'cprofile':
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+        else:
+            g.profiler = StackSampler(threading.get_ident(),
+                                      current_app.config['PROFILE_SAMPLE_INTERVAL'])
+            g.profiler.start()
+
+    def _stop(self):
+        """Stop this request's profiler, if one is running, and return it
+        with its mode and the wall time so far (or None)"""
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return None
+        mode = g.pop('profile_mode')
+        duration = time.perf_counter() - g.pop('profile_started')
+        if mode == 'cprofile':
+            profiler.disable()
+        else:
+            profiler.stop()
+        return profiler, mode, duration
+
+    def _teardown(self, exception=None):
+        self._stop()
+
+    def _finish(self, response):
+        stopped = self._stop()
+        if stopped is None:
+            return response
+        profiler, mode, duration = stopped
+
+        if mode == 'cprofile':
+            profiler.create_stats()
+            body = marshal.dumps(profiler.stats)
+            extension = 'prof'
+            mimetype = 'application/octet-stream'
+        else:
+            body = profiler.collapsed()
+            extension = 'collapsed'
+            mimetype = 'text/plain'
+
+        endpoint = request.endpoint or 'unknown'
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        profile_response = make_response(body)
+        profile_response.mimetype = mimetype
+        profile_response.headers['Content-Disposition'] = (
+            f'attachment; filename=profile_{endpoint}_{timestamp}.{extension}'
+        )
+        profile_response.headers['X-Profile-Status'] = str(response.status_code)
+        profile_response.headers['X-Profile-Duration'] = f"{duration:.6f}"
+        return profile_response
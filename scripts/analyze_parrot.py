@@ -13,34 +13,991 @@ The script extracts and analyzes:
 5. Mapping to Xt-EHR model elements
 """
 
+import os
 import json
+import mmap
+import hashlib
+import argparse
+import functools
+import time
 import pandas as pd
 import numpy as np
 from collections import Counter, defaultdict
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor
 import re
 from pathlib import Path
-import matplotlib.pyplot as plt
-import seaborn as sns
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Tuple, Iterator, Iterable, Optional, Sequence
+
+from parrot_records import ParrotReport, gc_paused, iter_records
+from parrot_sketch import QuantileSketch
+from parrot_cube import CUBE_DIMENSIONS, ReportCube
+from parrot_icd import IcdCooccurrence, normalise_icd_codes
+from parrot_dedup import MinHashLSH
+from parrot_results_io import RESULT_FORMATS, format_available, write_results, write_tables
+from parrot_profile import StageProfiler, profiled
+from parrot_charts import render_charts
+
+# Common clinical terms, keyed by the clinical pattern they signal
+CLINICAL_TERMS = {
+    'normal_reports': ['normal', 'unremarkable', 'sin particularidades', 'conservado', 'respetado'],
+    'pathological_reports': ['lesion', 'abnormal', 'pathological', 'lesión', 'anormal', 'patológico'],
+    'comparison_mentioned': ['comparison', 'compare', 'previous', 'prior', 'comparación', 'previo'],
+    'contrast_mentioned': ['contrast', 'gadolinium', 'contraste', 'gadolinio'],
+    'measurements_present': ['mm', 'cm', 'size', 'diameter', 'tamaño', 'diámetro'],
+    'recommendations_present': ['recommend', 'suggest', 'follow', 'recomienda', 'sugiere', 'seguimiento']
+}
+
+# Terms that must stand as whole words; every other term is a stem that also
+# matches its inflections ('lesions', 'Recommendation', 'followed', 'lesiones')
+WHOLE_WORD_TERMS = ('mm', 'cm')
+
+
+class ClinicalTermMatcher:
+    """Finds which CLINICAL_TERMS categories occur in a text.
+
+    Terms must start a word: a match may not follow a letter, so 'normal'
+    does not match inside 'abnormal'. Terms are stems and may be followed
+    by more letters ('lesion' matches 'lesiones'), except the whole_words,
+    which may not touch a letter on either side: 'mm' does not match inside
+    'mmHg' but does in '12mm'.
+
+    Each term is located with str.find, the same C substring search as a
+    plain ``in`` test, and only its occurrences are checked for word
+    boundaries. A category stops at its first valid occurrence, so an
+    absent term costs one scan and a present one usually a single check.
+    """
+
+    # Any letter, in any script (\w minus digits and underscore)
+    _LETTER = r'[^\W\d_]'
+
+    def __init__(self, terms: Dict[str, List[str]] = CLINICAL_TERMS,
+                 whole_words: Iterable[str] = WHOLE_WORD_TERMS):
+        self.categories = tuple(terms)
+        whole_words = {term.lower() for term in whole_words}
+        # (category bit, ((term, whole word?), ...)) in category order
+        self._terms = tuple(
+            (1 << index, tuple((term.lower(), term.lower() in whole_words) for term in term_list))
+            for index, term_list in enumerate(terms.values())
+        )
+
+    @classmethod
+    def _trie_pattern(cls, terms, whole_words: Iterable[str] = ()) -> str:
+        """Build a regex alternation matching terms, factored by common prefixes,
+        for scanning many texts at once (see ColumnarEngine).
+
+        Terms in whole_words only match when no letter follows them.
+        """
+        whole_words = {term.lower() for term in whole_words}
+        trie = {}
+        for term in terms:
+            node = trie
+            for char in term:
+                node = node.setdefault(char, {})
+            # End marker: the lookahead a match ending here needs ('' for none)
+            node[''] = f'(?!{cls._LETTER})' if term in whole_words else ''
+
+        def emit(node):
+            branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+            end = node.get('')
+            if not branches:
+                return end
+            body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+            if end is None:
+                return body
+            return f'(?:{body}|{end})' if end else f'(?:{body})?'
+
+        return emit(trie)
+
+    def flags_in(self, *texts: str) -> int:
+        """Bitmask of the categories found in any of the texts (bit i = categories[i])"""
+        # One lowercase text; the newline keeps words of adjacent texts apart
+        text = '\n'.join(text for text in texts if text).lower()
+        found = 0
+        for bit, terms in self._terms:
+            for term, whole_word in terms:
+                index = text.find(term)
+                while index >= 0:
+                    end = index + len(term)
+                    if not (index and text[index - 1].isalpha()) and not (whole_word and text[end:end + 1].isalpha()):
+                        found |= bit
+                        break
+                    index = text.find(term, index + 1)
+                if found & bit:
+                    break
+        return found
+
+    def categories_in(self, *texts: str) -> set:
+        """Return the set of categories found in any of the texts"""
+        found = self.flags_in(*texts)
+        return {category for index, category in enumerate(self.categories) if found >> index & 1}
+
+
+CLINICAL_TERM_MATCHER = ClinicalTermMatcher()
+
+# Metadata fields whose non-empty presence backs the 'derivable' Xt-EHR elements
+DERIVABLE_FIELDS = ('language', 'contributor_code', 'subspecialty', 'area')
+
+# Per-report bitflags stored in the metadata cube: one per clinical pattern,
+# in CLINICAL_TERMS order, then whether the report has any text and any ICD code
+CUBE_FLAGS = tuple(CLINICAL_TERMS) + ('findings_present', 'icd_present')
+FINDINGS_FLAG = 1 << CUBE_FLAGS.index('findings_present')
+ICD_FLAG = 1 << CUBE_FLAGS.index('icd_present')
+
+# Content-derived Xt-EHR elements and the CUBE_FLAGS that signal them (any of)
+XT_EHR_CONTENT_FLAGS = {
+    'body.examinationReport.resultData.resultText': ('findings_present',),
+    'body.examinationReport.conclusion.conditionOrFinding': ('icd_present',),
+    'body.supportingInformation.condition': ('pathological_reports', 'icd_present'),
+    'body.comparisonStudy': ('comparison_mentioned',),
+    'body.examinationReport.medication': ('contrast_mentioned',),
+    'body.recommendation': ('recommendations_present',)
+}
+
+# Rarely present Xt-EHR elements and the (non-standard) report fields that
+# would carry them; PARROT has none of them, but extended exports might
+XT_EHR_SOURCE_FIELDS = {
+    'header.identifier': ('identifier', 'document_id', 'report_id'),
+    'header.authorship.datetime': ('datetime', 'date', 'timestamp'),
+    'header.status': ('status',),
+    'header.accessionNumber': ('accession_number', 'accession'),
+    'header.healthInsuranceAndPaymentInformation': ('insurance',),
+    'body.orderInformation': ('order', 'order_id'),
+    'body.exposureInformation': ('dose', 'radiation_dose'),
+    'body.specimen': ('specimen',),
+    'dicomStudyMetadata': ('dicom', 'study_instance_uid'),
+    'attachments': ('attachments',)
+}
+
+# Bit i of a report's element bitmask = XT_EHR_PRESENCE_ELEMENTS[i]
+XT_EHR_PRESENCE_ELEMENTS = tuple(XT_EHR_CONTENT_FLAGS) + tuple(XT_EHR_SOURCE_FIELDS)
+# Element bitmask for every possible CUBE_FLAGS value
+ELEMENTS_BY_FLAGS = tuple(
+    sum(1 << index for index, element in enumerate(XT_EHR_PRESENCE_ELEMENTS)
+        if any(flags >> CUBE_FLAGS.index(flag) & 1 for flag in XT_EHR_CONTENT_FLAGS.get(element, ())))
+    for flags in range(1 << len(CUBE_FLAGS))
+)
+# Positions of the set bits of every possible CUBE_FLAGS value
+FLAG_INDEXES = tuple(
+    tuple(index for index in range(len(CUBE_FLAGS)) if flags >> index & 1) for flags in range(1 << len(CUBE_FLAGS))
+)
+# (element bit, source fields) for the field-backed elements
+ELEMENT_FIELD_BITS = tuple(
+    (1 << XT_EHR_PRESENCE_ELEMENTS.index(element), fields) for element, fields in XT_EHR_SOURCE_FIELDS.items()
+)
+
+# The per-report steps of a run, as separately timed stages: the fused single
+# pass times each report's steps and records them under these names (summed
+# over workers), nested in its 'analyze_reports' stage
+PASS_STAGES = ('load_data', 'analyze_basic_structure', 'analyze_report_content')
+
+# Bump whenever accumulator contents or semantics change, to invalidate saved state
+ANALYSIS_STATE_VERSION = 10
+
+
+class StructureAccumulator:
+    """Mergeable counters behind analyze_basic_structure"""
+
+    def __init__(self):
+        self.total_reports = 0
+        self.fields_present = Counter()
+        self.fields_non_empty = Counter()
+        self.languages = Counter()
+        self.modalities = Counter()
+        self.areas = Counter()
+        self.countries = Counter()
+        self.subspecialties = Counter()
+        self.icd_codes = Counter()
+        self._metadata = {
+            'language': self.languages,
+            'modality': self.modalities,
+            'area': self.areas,
+            'country': self.countries,
+            'subspecialty': self.subspecialties
+        }
+
+    def add(self, report: Dict[str, Any], icd_codes: Optional[List[str]] = None) -> None:
+        """Count one report (icd_codes: its already normalised ICD codes, if known)"""
+        self.total_reports += 1
+
+        # Count which fields are present (and non-empty) and extract metadata,
+        # in one pass over the report's fields
+        for field, value in report.items():
+            self.fields_present[field] += 1
+            if value:
+                self.fields_non_empty[field] += 1
+            if field in self._metadata:
+                self._metadata[field][value] += 1
+            elif field == 'icd':
+                # Handle multiple ICD codes
+                for icd in normalise_icd_codes(value) if icd_codes is None else icd_codes:
+                    self.icd_codes[icd] += 1
+
+    def merge(self, other: 'StructureAccumulator') -> 'StructureAccumulator':
+        """Fold another accumulator's counts into this one"""
+        self.total_reports += other.total_reports
+        for name in self.COUNTERS:
+            getattr(self, name).update(getattr(other, name))
+        return self
+
+    COUNTERS = ('fields_present', 'fields_non_empty', 'languages', 'modalities',
+                'areas', 'countries', 'subspecialties', 'icd_codes')
+
+    def state(self) -> Dict[str, Any]:
+        """JSON-serialisable snapshot (counters as ordered [key, count] pairs)"""
+        return {
+            'total_reports': self.total_reports,
+            **{name: list(getattr(self, name).items()) for name in self.COUNTERS}
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'StructureAccumulator':
+        """Rebuild an accumulator from state()"""
+        accumulator = cls()
+        accumulator.total_reports = state['total_reports']
+        for name in cls.COUNTERS:
+            getattr(accumulator, name).update(dict(state[name]))
+        return accumulator
+
+    def result(self) -> Dict[str, Any]:
+        """Return the structure analysis section"""
+        return {
+            'total_reports': self.total_reports,
+            'fields_present': dict(self.fields_present),
+            'languages': dict(self.languages),
+            'modalities': dict(self.modalities),
+            'anatomical_areas': dict(self.areas),
+            'countries': dict(self.countries),
+            'subspecialties': dict(self.subspecialties),
+            'icd_codes': dict(self.icd_codes)
+        }
+
+
+class ContentAccumulator:
+    """Mergeable state behind analyze_report_content.
+
+    Report and translation lengths go into QuantileSketches (exact
+    count/mean/min/max, p50/p90/p99 within 0.5%), overall and per language
+    and modality for reports, so memory stays bounded however many reports
+    are processed.
+    """
+
+    LENGTH_DIMENSIONS = ('language', 'modality')
+
+    def __init__(self):
+        self.report_lengths = QuantileSketch()
+        self.translation_lengths = QuantileSketch()
+        self.report_lengths_by = {dimension: {} for dimension in self.LENGTH_DIMENSIONS}
+        self.clinical_patterns = {
+            'findings_present': 0,
+            'normal_reports': 0,
+            'pathological_reports': 0,
+            'comparison_mentioned': 0,
+            'contrast_mentioned': 0,
+            'measurements_present': 0,
+            'recommendations_present': 0,
+            'technique_described': 0
+        }
+
+    def add(self, report: Dict[str, Any], icd_codes: Optional[List[str]] = None) -> int:
+        """Analyse one report's text; return its CUBE_FLAGS bitmask
+        (icd_codes: its already normalised ICD codes, if known)"""
+        report_text = report.get('report', '')
+        translation_text = report.get('translation', '')
+
+        self.report_lengths.add(len(report_text))
+        if translation_text:
+            self.translation_lengths.add(len(translation_text))
+        for dimension, sketches in self.report_lengths_by.items():
+            value = report.get(dimension)
+            if value is not None:
+                if value not in sketches:
+                    sketches[value] = QuantileSketch()
+                sketches[value].add(len(report_text))
+
+        # Check for clinical patterns in both fields
+        flags = CLINICAL_TERM_MATCHER.flags_in(report_text, translation_text)
+        if flags:
+            for index, pattern in enumerate(CLINICAL_TERM_MATCHER.categories):
+                if flags >> index & 1:
+                    self.clinical_patterns[pattern] += 1
+
+        # Check for findings vs normal
+        if report_text:
+            self.clinical_patterns['findings_present'] += 1
+            flags |= FINDINGS_FLAG
+        if normalise_icd_codes(report.get('icd')) if icd_codes is None else icd_codes:
+            flags |= ICD_FLAG
+
+        return flags
+
+    def merge(self, other: 'ContentAccumulator') -> 'ContentAccumulator':
+        """Fold another accumulator's state into this one"""
+        self.report_lengths.merge(other.report_lengths)
+        self.translation_lengths.merge(other.translation_lengths)
+        for dimension, sketches in other.report_lengths_by.items():
+            own = self.report_lengths_by[dimension]
+            for value, sketch in sketches.items():
+                if value in own:
+                    own[value].merge(sketch)
+                else:
+                    own[value] = QuantileSketch.from_state(sketch.state())
+        for pattern, count in other.clinical_patterns.items():
+            self.clinical_patterns[pattern] += count
+        return self
+
+    def state(self) -> Dict[str, Any]:
+        """JSON-serialisable snapshot"""
+        return {
+            'report_lengths': self.report_lengths.state(),
+            'translation_lengths': self.translation_lengths.state(),
+            'report_lengths_by': {
+                dimension: [[value, sketch.state()] for value, sketch in sketches.items()]
+                for dimension, sketches in self.report_lengths_by.items()
+            },
+            'clinical_patterns': dict(self.clinical_patterns)
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'ContentAccumulator':
+        """Rebuild an accumulator from state()"""
+        accumulator = cls()
+        accumulator.report_lengths = QuantileSketch.from_state(state['report_lengths'])
+        accumulator.translation_lengths = QuantileSketch.from_state(state['translation_lengths'])
+        for dimension, sketches in state['report_lengths_by'].items():
+            accumulator.report_lengths_by[dimension] = {
+                value: QuantileSketch.from_state(sketch) for value, sketch in sketches
+            }
+        accumulator.clinical_patterns.update(state['clinical_patterns'])
+        return accumulator
+
+    @staticmethod
+    def _length_stats(sketch: QuantileSketch) -> Optional[Dict[str, Any]]:
+        stats = sketch.summary()
+        if stats is not None:
+            stats['median'] = stats['p50']  # kept for existing consumers
+        return stats
+
+    def result(self) -> Dict[str, Any]:
+        """Return the content analysis section"""
+        return {
+            'report_length_stats': self._length_stats(self.report_lengths),
+            'translation_length_stats': self._length_stats(self.translation_lengths),
+            **{
+                f'report_length_by_{dimension}': {
+                    value: self._length_stats(sketch) for value, sketch in sketches.items()
+                }
+                for dimension, sketches in self.report_lengths_by.items()
+            },
+            'clinical_patterns': dict(self.clinical_patterns)
+        }
+
+
+class ElementPresenceAccumulator:
+    """Presence of the content-derived and rarely present Xt-EHR elements,
+    broken down by language and modality.
+
+    Each report reduces to a bitmask of the elements it provides (see
+    XT_EHR_PRESENCE_ELEMENTS): content-derived elements follow from the CUBE_FLAGS the
+    content scan already computed, rarely present ones from non-empty
+    source fields. Only (language, modality, bitmask) combinations are
+    counted, so every total and breakdown is a sum over a handful of cells.
+    """
+
+    ELEMENTS = XT_EHR_PRESENCE_ELEMENTS
+    DIMENSIONS = ('language', 'modality')
+
+    def __init__(self):
+        # (language, modality, element bitmask) -> reports
+        self.cells = Counter()
+
+    def add(self, report: Dict[str, Any], flags: int) -> None:
+        """Count one report, given the CUBE_FLAGS returned by ContentAccumulator.add"""
+        mask = ELEMENTS_BY_FLAGS[flags]
+        # Source fields are never among a ParrotReport's known fields
+        fields = report.extra if isinstance(report, ParrotReport) else report
+        if fields:
+            for bit, names in ELEMENT_FIELD_BITS:
+                if any(fields.get(name) for name in names):
+                    mask |= bit
+        self.cells[(report.get('language'), report.get('modality'), mask)] += 1
+
+    def merge(self, other: 'ElementPresenceAccumulator') -> 'ElementPresenceAccumulator':
+        """Fold another accumulator's counts into this one"""
+        self.cells.update(other.cells)
+        return self
+
+    def state(self) -> Dict[str, Any]:
+        """JSON-serialisable snapshot"""
+        return {'cells': [[*key, count] for key, count in self.cells.items()]}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'ElementPresenceAccumulator':
+        """Rebuild an accumulator from state()"""
+        accumulator = cls()
+        for language, modality, mask, count in state['cells']:
+            accumulator.cells[(language, modality, mask)] = count
+        return accumulator
+
+    def result(self) -> Dict[str, Any]:
+        """Per element: reports providing it, overall and per language/modality value.
+
+        Breakdowns list every value seen, with the share of that value's
+        reports that provide the element.
+        """
+        totals = {dimension: Counter() for dimension in self.DIMENSIONS}
+        present = {element: [0, {dimension: Counter() for dimension in self.DIMENSIONS}]
+                   for element in self.ELEMENTS}
+        for (language, modality, mask), count in self.cells.items():
+            values = dict(zip(self.DIMENSIONS, (language, modality)))
+            for dimension, value in values.items():
+                totals[dimension][value] += count
+            for index, element in enumerate(self.ELEMENTS):
+                if mask >> index & 1:
+                    present[element][0] += count
+                    for dimension, value in values.items():
+                        present[element][1][dimension][value] += count
+
+        total = sum(totals[self.DIMENSIONS[0]].values())
+        result = {}
+        for element, (count, by_dimension) in present.items():
+            result[element] = {'count': count, 'percentage': (count / total) * 100 if total else 0.0}
+            for dimension in self.DIMENSIONS:
+                result[element][f'by_{dimension}'] = {
+                    value: {'count': by_dimension[dimension][value],
+                            'percentage': (by_dimension[dimension][value] / reports) * 100}
+                    for value, reports in totals[dimension].items()
+                }
+        return result
+
+
+class CrossTabAccumulator:
+    """Language/modality/area cross-tabs and clinical patterns per modality.
+
+    Only (language, modality) and (modality, area) pairs and per-modality
+    flag totals are counted, so memory is bounded by the variety of the
+    metadata, not the number of reports. Tables come out in the order
+    ReportCube.crosstab gives them: by descending count, ties in order of
+    first appearance (missing first).
+    """
+
+    def __init__(self):
+        # Reports per pair, in order of first appearance
+        self.language_modality = Counter()
+        self.modality_area = Counter()
+        # Modality -> reports with each of CUBE_FLAGS
+        self.patterns = {}
+
+    def add(self, report: Dict[str, Any], flags: int) -> None:
+        """Count one report, given the CUBE_FLAGS returned by ContentAccumulator.add"""
+        modality = report.get('modality')
+        self.language_modality[(report.get('language'), modality)] += 1
+        self.modality_area[(modality, report.get('area'))] += 1
+        if modality is not None:
+            counts = self.patterns.get(modality)
+            if counts is None:
+                counts = self.patterns[modality] = [0] * len(CUBE_FLAGS)
+            for index in FLAG_INDEXES[flags]:
+                counts[index] += 1
+
+    def merge(self, other: 'CrossTabAccumulator') -> 'CrossTabAccumulator':
+        """Fold another accumulator's counts into this one"""
+        self.language_modality.update(other.language_modality)
+        self.modality_area.update(other.modality_area)
+        for modality, other_counts in other.patterns.items():
+            counts = self.patterns.setdefault(modality, [0] * len(CUBE_FLAGS))
+            for index, count in enumerate(other_counts):
+                counts[index] += count
+        return self
+
+    def state(self) -> Dict[str, Any]:
+        """JSON-serialisable snapshot"""
+        return {
+            'language_modality': [[*key, count] for key, count in self.language_modality.items()],
+            'modality_area': [[*key, count] for key, count in self.modality_area.items()],
+            'patterns': [[modality, counts] for modality, counts in self.patterns.items()]
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'CrossTabAccumulator':
+        """Rebuild an accumulator from state()"""
+        accumulator = cls()
+        for language, modality, count in state['language_modality']:
+            accumulator.language_modality[(language, modality)] = count
+        for modality, area, count in state['modality_area']:
+            accumulator.modality_area[(modality, area)] = count
+        accumulator.patterns = {modality: counts for modality, counts in state['patterns']}
+        return accumulator
+
+    @staticmethod
+    def _table(counts: Counter) -> Dict[Any, Dict[Any, int]]:
+        """Nested {row value: {column value: count}} table from pair counts"""
+        ranks = ({None: 0}, {None: 0})  # Missing first, then values in order of first appearance
+        for pair in counts:
+            for rank, value in zip(ranks, pair):
+                rank.setdefault(value, len(rank))
+        table = {}
+        for (row, column), count in sorted(
+                counts.items(), key=lambda item: (-item[1], ranks[0][item[0][0]], ranks[1][item[0][1]])):
+            table.setdefault(row, {})[column] = count
+        return table
+
+    def result(self) -> Dict[str, Any]:
+        """The cross_tabs section of the results"""
+        return {
+            'modality_by_language': self._table(self.language_modality),
+            'area_by_modality': self._table(self.modality_area),
+            'patterns_by_modality': {
+                modality: dict(zip(CUBE_FLAGS, counts)) for modality, counts in self.patterns.items()
+            }
+        }
+
+
+class ReportAccumulator:
+    """All per-report analyses fed from a single pass over the data.
+
+    Every analysis is bounded by the variety of the data except two
+    opt-in ones that keep a row per report: the metadata cube
+    (``cube=True``, ~22 bytes per report) for ad-hoc queries, and
+    near-duplicate detection (``near_duplicates=True``, a 257-byte MinHash
+    signature per report, and the slowest analysis), which needs the cube
+    to describe its clusters. Analyses left off are skipped in the pass,
+    in merges and in saved state.
+    """
+
+    def __init__(self, cube: bool = False, near_duplicates: bool = False):
+        self.structure = StructureAccumulator()
+        self.content = ContentAccumulator()
+        self.elements = ElementPresenceAccumulator()
+        self.cross_tabs = CrossTabAccumulator()
+        self.icd = IcdCooccurrence()
+        # One row per report
+        self.cube = ReportCube(CUBE_DIMENSIONS, CUBE_FLAGS) if cube or near_duplicates else None
+        self.near_duplicates = MinHashLSH() if near_duplicates else None
+
+    def add(self, report: Dict[str, Any]) -> None:
+        """Feed one report to every analysis"""
+        self.add_content(report, self.add_structure(report))
+
+    def add_timed(self, report: Dict[str, Any], timings: Dict[str, float]) -> None:
+        """add(), adding the time spent on the structure and on the content
+        analyses to timings (see PASS_STAGES)"""
+        started = time.perf_counter()
+        icd_codes = self.add_structure(report)
+        structured = time.perf_counter()
+        self.add_content(report, icd_codes)
+        timings['analyze_basic_structure'] += structured - started
+        timings['analyze_report_content'] += time.perf_counter() - structured
+
+    def add_structure(self, report: Dict[str, Any]) -> List[str]:
+        """Feed one report to the structure and ICD analyses; return its normalised ICD codes"""
+        icd_codes = normalise_icd_codes(report.get('icd'))
+        self.structure.add(report, icd_codes)
+        self.icd.add(icd_codes, report)
+        return icd_codes
+
+    def add_content(self, report: Dict[str, Any], icd_codes: List[str]) -> None:
+        """Feed one report to the analyses of its text, given add_structure()'s ICD codes"""
+        flags = self.content.add(report, icd_codes)
+        self.elements.add(report, flags)
+        self.cross_tabs.add(report, flags)
+        if self.cube is not None:
+            self.cube.add(report, flags)
+        if self.near_duplicates is not None:
+            self.near_duplicates.add(report.get('report'))
+
+    def merge(self, other: 'ReportAccumulator') -> 'ReportAccumulator':
+        """Fold another accumulator (e.g. from a later shard) into this one"""
+        self.structure.merge(other.structure)
+        self.content.merge(other.content)
+        self.elements.merge(other.elements)
+        self.cross_tabs.merge(other.cross_tabs)
+        self.icd.merge(other.icd)
+        if self.cube is not None:
+            self.cube.merge(other.cube)
+        if self.near_duplicates is not None:
+            self.near_duplicates.merge(other.near_duplicates)
+        return self
+
+    def state(self) -> Dict[str, Any]:
+        """JSON-serialisable snapshot of every analysis except the cube and
+        the MinHash index, which are persisted on their own with save()"""
+        return {
+            'structure': self.structure.state(),
+            'content': self.content.state(),
+            'elements': self.elements.state(),
+            'cross_tabs': self.cross_tabs.state(),
+            'icd': self.icd.state()
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], cube: Optional[ReportCube] = None,
+                   near_duplicates: Optional[MinHashLSH] = None) -> 'ReportAccumulator':
+        """Rebuild an accumulator from state() and its saved cube and MinHash
+        index (each opt-in analysis is on when its data is given)"""
+        accumulator = cls()
+        accumulator.structure = StructureAccumulator.from_state(state['structure'])
+        accumulator.content = ContentAccumulator.from_state(state['content'])
+        accumulator.elements = ElementPresenceAccumulator.from_state(state['elements'])
+        accumulator.cross_tabs = CrossTabAccumulator.from_state(state['cross_tabs'])
+        accumulator.icd = IcdCooccurrence.from_state(state['icd'])
+        accumulator.cube = cube
+        accumulator.near_duplicates = near_duplicates
+        return accumulator
+
+
+class ColumnarEngine:
+    """Vectorised alternative to feeding reports through the accumulators.
+
+    Reports are loaded into a pandas DataFrame with categorical dtypes for
+    the metadata columns, and every count is computed with column
+    operations. The outcome is returned as a filled ReportAccumulator, so
+    results compile (and merge with shards) exactly like the other paths.
+    """
+
+    CATEGORICAL_FIELDS = ('language', 'modality', 'area', 'country', 'subspecialty')
+
+    def __init__(self, terms: Dict[str, List[str]] = CLINICAL_TERMS):
+        # Same word-start and whole-word rules as ClinicalTermMatcher, as one pattern; each
+        # category gets a bit so a text's matches reduce to one integer
+        letter = ClinicalTermMatcher._LETTER
+        self.categories = tuple(terms)
+        self.term_bits = {
+            term.lower(): 1 << index
+            for index, term_list in enumerate(terms.values()) for term in term_list
+        }
+        self.term_pattern = re.compile(
+            rf'(?<!{letter})(?:{ClinicalTermMatcher._trie_pattern(self.term_bits, WHOLE_WORD_TERMS)})'
+        )
+
+    def to_frame(self, reports: List[Dict[str, Any]]) -> pd.DataFrame:
+        """Build a DataFrame with categorical metadata columns.
+
+        Categories are kept in order of first appearance so counts come out
+        in the same order as the per-report path. Once in the frame, a key
+        set to null looks the same as a missing key, so the frame's attrs
+        also keep how many reports have each key ('fields_present') and
+        which rows of each metadata column hold an explicit null
+        ('explicit_nulls'), both of which the per-report path counts.
+        """
+        frame = pd.DataFrame.from_records(reports)
+        fields_present = Counter(chain.from_iterable(reports))
+        explicit_nulls = {}
+        for field in self.CATEGORICAL_FIELDS:
+            if field in frame:
+                missing = frame[field].isna()
+                if fields_present[field] > len(frame) - int(missing.sum()):
+                    explicit_nulls[field] = missing.to_numpy() & np.fromiter(
+                        (field in report for report in reports), dtype=bool, count=len(reports))
+                frame[field] = pd.Categorical(frame[field], categories=pd.unique(frame[field].dropna()))
+        frame.attrs['fields_present'] = dict(fields_present)
+        frame.attrs['explicit_nulls'] = explicit_nulls
+        return frame
+
+    @staticmethod
+    def _ordered_counts(series: pd.Series) -> Counter:
+        """Value counts in order of first appearance, as a Counter"""
+        counts = series.groupby(series, sort=False, observed=True).size()
+        return Counter({key: int(count) for key, count in counts.items()})
+
+    @staticmethod
+    def _metadata_counts(series: pd.Series, explicit_nulls: Optional[np.ndarray]) -> Counter:
+        """Counts of a categorical column in order of first appearance, with
+        explicit nulls counted under None (written as 'null') like the per-report path"""
+        codes = series.cat.codes.to_numpy()
+        values = list(series.cat.categories)
+        if explicit_nulls is not None:
+            codes = np.where(explicit_nulls, len(values), codes)
+            values.append(None)
+        ids, uniques = pd.factorize(codes[codes >= 0])
+        return Counter({values[code]: int(count) for code, count in zip(uniques.tolist(), np.bincount(ids).tolist())})
+
+    @staticmethod
+    def _row_groups(series: pd.Series):
+        """(value, row positions) per distinct value, in order of first appearance"""
+        return series.groupby(series, sort=False, observed=True).indices.items()
+
+    @staticmethod
+    def _truthy(series: pd.Series) -> np.ndarray:
+        """Boolean array marking the truthy values of a column"""
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            truthy = np.array([bool(value) for value in series.cat.categories] + [False])
+            return truthy[series.cat.codes.to_numpy()]  # code -1 (missing) -> False
+        present = series.notna().to_numpy()
+        if pd.api.types.is_numeric_dtype(series):
+            return present & (series.fillna(0) != 0).to_numpy()
+        return present & (series.astype(str) != '').to_numpy()
+
+    @classmethod
+    def _non_empty(cls, series: pd.Series) -> int:
+        """Number of truthy values in a column"""
+        return int(cls._truthy(series).sum())
+
+    @staticmethod
+    def _dimension_codes(frame: pd.DataFrame, field: str) -> Tuple[np.ndarray, List[Any]]:
+        """Categorical codes (-1 = missing) and categories of a metadata column"""
+        if field not in frame:
+            return np.full(len(frame), -1), []
+        return frame[field].cat.codes.to_numpy(), list(frame[field].cat.categories)
+
+    def cells(self, frame: pd.DataFrame, dimensions: Sequence[str],
+              masks: Optional[np.ndarray] = None) -> Counter:
+        """Reports per combination of dimension values (and mask, when given),
+        in order of first appearance"""
+        columns, values = {}, {}
+        for dimension in dimensions:
+            columns[dimension], categories = self._dimension_codes(frame, dimension)
+            values[dimension] = categories + [None]  # code -1 (missing) -> None
+        if masks is not None:
+            columns['mask'] = masks
+        counts = pd.DataFrame(columns).groupby(list(columns), sort=False).size()
+        return Counter({
+            (*(values[dimension][code] for dimension, code in zip(dimensions, key)), *key[len(dimensions):]): count
+            for key, count in zip(counts.index.tolist(), counts.tolist())
+        })
+
+    def pattern_counts(self, frame: pd.DataFrame, flags: np.ndarray) -> Dict[Any, List[int]]:
+        """CrossTabAccumulator.patterns for the frame, given each row's CUBE_FLAGS"""
+        codes, modalities = self._dimension_codes(frame, 'modality')
+        present = codes >= 0
+        bits = (flags[present, None] >> np.arange(len(CUBE_FLAGS))) & 1
+        counts = np.zeros((len(modalities), len(CUBE_FLAGS)), dtype=np.int64)
+        np.add.at(counts, codes[present], bits)
+        return {modality: row for modality, row in zip(modalities, counts.tolist())}
+
+    def element_cells(self, frame: pd.DataFrame, flags: np.ndarray) -> Counter:
+        """ElementPresenceAccumulator cells for the frame, given each row's CUBE_FLAGS"""
+        masks = np.asarray(ELEMENTS_BY_FLAGS, dtype=np.int64)[flags]
+        for bit, names in ELEMENT_FIELD_BITS:
+            for name in names:
+                if name in frame:
+                    masks |= np.where(self._truthy(frame[name]), bit, 0)
+        return self.cells(frame, ElementPresenceAccumulator.DIMENSIONS, masks)
+
+    def _text(self, frame: pd.DataFrame, field: str) -> pd.Series:
+        # Object dtype keeps .str on Python's re (Arrow strings would use RE2,
+        # which has no lookbehind)
+        if field not in frame:
+            return pd.Series([''] * len(frame), dtype=object)
+        return frame[field].astype(object).fillna('')
+
+    def term_masks(self, text: pd.Series) -> np.ndarray:
+        """Bitmask of the term categories found in each text.
+
+        Texts are factorised first so each distinct text is lowercased and
+        scanned once, however often it repeats.
+        """
+        codes, uniques = pd.factorize(text)
+        matches = pd.Series(uniques, dtype=object).str.lower().str.findall(self.term_pattern)
+        masks = np.zeros(len(uniques) + 1, dtype=np.int64)  # last slot for missing (code -1)
+        for index, terms in enumerate(matches):
+            for term in terms:
+                masks[index] |= self.term_bits[term]
+        return masks[codes]
+
+    def accumulate(self, frame: pd.DataFrame, cube: bool = False, near_duplicates: bool = False,
+                   profiler: Optional[StageProfiler] = None) -> ReportAccumulator:
+        """Compute every analysis over the frame (see ReportAccumulator for the
+        opt-in ones), timing the structure and the content analyses as
+        separate stages of profiler"""
+        profiler = profiler or StageProfiler()
+        accumulator = ReportAccumulator(cube, near_duplicates)
+        with profiler.stage('analyze_basic_structure') as stage:
+            has_icd = self.accumulate_structure(frame, accumulator)
+            stage.records = len(frame)
+        with profiler.stage('analyze_report_content') as stage:
+            self.accumulate_content(frame, accumulator, has_icd)
+            stage.records = len(frame)
+        return accumulator
+
+    def accumulate_structure(self, frame: pd.DataFrame, accumulator: ReportAccumulator) -> np.ndarray:
+        """Field, metadata and ICD counts; return which rows have ICD codes"""
+        structure = accumulator.structure
+
+        structure.total_reports = len(frame)
+        fields_present = frame.attrs.get('fields_present', {})
+        for field in frame.columns:
+            structure.fields_present[field] = fields_present.get(field, int(frame[field].notna().sum()))
+            structure.fields_non_empty[field] = self._non_empty(frame[field])
+
+        explicit_nulls = frame.attrs.get('explicit_nulls', {})
+        for field, counter in (('language', structure.languages), ('modality', structure.modalities),
+                               ('area', structure.areas), ('country', structure.countries),
+                               ('subspecialty', structure.subspecialties)):
+            if field in frame:
+                counter.update(self._metadata_counts(frame[field], explicit_nulls.get(field)))
+
+        has_icd = np.zeros(len(frame), dtype=bool)
+        if 'icd' in frame:
+            # Handle multiple ICD codes
+            icd_codes = frame['icd'].astype(object).where(frame['icd'].notna(), None).map(normalise_icd_codes)
+            has_icd = (icd_codes.str.len() > 0).to_numpy()
+            structure.icd_codes.update(self._ordered_counts(icd_codes.explode().dropna()))
+            dimensions = {dimension: frame[dimension].astype(object).where(frame[dimension].notna(), None)
+                          for dimension in IcdCooccurrence.DIMENSIONS if dimension in frame}
+            for row, codes in enumerate(icd_codes):
+                if codes:
+                    accumulator.icd.add(codes, {dimension: values.iat[row] for dimension, values in dimensions.items()})
+        return has_icd
+
+    def accumulate_content(self, frame: pd.DataFrame, accumulator: ReportAccumulator, has_icd: np.ndarray) -> None:
+        """Text lengths, clinical patterns, element presence, cross-tabs and the
+        opt-in analyses, given accumulate_structure()'s has-ICD rows"""
+        content = accumulator.content
+        report_text = self._text(frame, 'report')
+        translation_text = self._text(frame, 'translation')
+        report_lengths = report_text.str.len().to_numpy()
+        content.report_lengths.add_many(report_lengths)
+        translated = translation_text[translation_text != '']
+        content.translation_lengths.add_many(translated.str.len().to_numpy())
+        for dimension, sketches in content.report_lengths_by.items():
+            if dimension in frame:
+                for value, rows in self._row_groups(frame[dimension]):
+                    sketches[value] = QuantileSketch()
+                    sketches[value].add_many(report_lengths[rows])
+
+        masks = self.term_masks(report_text) | self.term_masks(translation_text)
+        for index, category in enumerate(self.categories):
+            content.clinical_patterns[category] = int(np.count_nonzero(masks & (1 << index)))
+        has_findings = (report_text != '').to_numpy()
+        content.clinical_patterns['findings_present'] = int(has_findings.sum())
+
+        flags = masks | np.where(has_findings, FINDINGS_FLAG, 0) | np.where(has_icd, ICD_FLAG, 0)
+        accumulator.elements.cells = self.element_cells(frame, flags)
+        accumulator.cross_tabs.language_modality = self.cells(frame, ('language', 'modality'))
+        accumulator.cross_tabs.modality_area = self.cells(frame, ('modality', 'area'))
+        accumulator.cross_tabs.patterns = self.pattern_counts(frame, flags)
+        if accumulator.cube is not None:
+            accumulator.cube.add_columns(
+                {dimension: (frame[dimension].cat.codes.to_numpy(), list(frame[dimension].cat.categories))
+                 for dimension in CUBE_DIMENSIONS if dimension in frame},
+                flags
+            )
+        if accumulator.near_duplicates is not None:
+            accumulator.near_duplicates.add_many(report_text)
+
+
+def shard_byte_ranges(data_path, shard_count: int, start: int = 0,
+                      end: Optional[int] = None) -> List[Tuple[int, int]]:
+    """Split a file (or its [start, end) byte range) into up to shard_count ranges on line boundaries"""
+    end = os.path.getsize(data_path) if end is None else end
+    boundaries = [start]
+    with open(data_path, 'rb') as f:
+        for i in range(1, shard_count):
+            f.seek(start + (end - start) * i // shard_count)
+            f.readline()  # move to the start of the next full line
+            boundary = min(f.tell(), end)
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+    if boundaries[-1] < end:
+        boundaries.append(end)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def last_line_end(data_path, start: int, end: int) -> int:
+    """Offset just past the last newline in [start, end), or start if there is none"""
+    if start >= end:
+        return start
+    with open(data_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return mapped.rfind(b'\n', start, end) + 1 or start
+
+
+def _prefix_digest(data_path, length: int) -> str:
+    """SHA-256 of the first length bytes of a file"""
+    digest = hashlib.sha256()
+    # Read in chunks rather than mapped, so the whole prefix never becomes resident
+    with open(data_path, 'rb', buffering=0) as f:
+        buffer = bytearray(1 << 20)
+        while length > 0:
+            read = f.readinto(memoryview(buffer)[:min(length, len(buffer))])
+            if not read:
+                break
+            digest.update(memoryview(buffer)[:read])
+            length -= read
+    return digest.hexdigest()
+
+
+def analysis_fingerprint() -> str:
+    """Identifies the analysis definition, so saved state from another version is not reused"""
+    definition = repr((ANALYSIS_STATE_VERSION, CLINICAL_TERMS, WHOLE_WORD_TERMS, DERIVABLE_FIELDS,
+                       XT_EHR_CONTENT_FLAGS, XT_EHR_SOURCE_FIELDS, MinHashLSH.parameters()))
+    return hashlib.sha256(definition.encode('utf-8')).hexdigest()[:16]
+
+
+def _timed(iterable: Iterable, timings: Dict[str, float], name: str) -> Iterator:
+    """Yield from iterable, adding the time spent producing its items to timings[name]"""
+    iterator = iter(iterable)
+    while True:
+        started = time.perf_counter()
+        item = next(iterator, _DONE)
+        timings[name] += time.perf_counter() - started
+        if item is _DONE:
+            return
+        yield item
+
+
+_DONE = object()
+
+
+def analyze_shard(data_path, start: int, end: int, options: Optional[Dict[str, bool]] = None,
+                  timed: bool = False) -> Tuple[ReportAccumulator, int, List[Tuple[int, str]], Optional[Dict[str, float]]]:
+    """Accumulate the reports in one byte range of the JSONL file.
+
+    ``options`` are ReportAccumulator arguments. Returns the accumulator,
+    the number of lines read, any parse errors as (line number within
+    the shard, message), so the caller can report file-wide line numbers
+    once shard sizes are known, and with ``timed=True`` the seconds spent
+    in each of PASS_STAGES (None otherwise).
+    """
+    accumulator = ReportAccumulator(**(options or {}))
+    errors = []
+    line_count = 0
+    records = iter_records(data_path, start, end)
+    timings = None
+    add = accumulator.add
+    if timed:
+        timings = dict.fromkeys(PASS_STAGES, 0.0)
+        records = _timed(records, timings, 'load_data')
+        add = functools.partial(accumulator.add_timed, timings=timings)
+    for line_count, report, error in records:
+        if report is None:
+            errors.append((line_count, error))
+        else:
+            add(report)
+    return accumulator, line_count, errors, timings
+
 
 class ParrotAnalyzer:
     """Analyzer for PARROT imaging reports dataset"""
     
-    def __init__(self, data_path: str):
+    def __init__(self, data_path: str, profiler: Optional[StageProfiler] = None,
+                 cube: bool = False, near_duplicates: bool = False):
         self.data_path = Path(data_path)
+        # Stage timings and memory peaks (see parrot_profile.py); disabled by default
+        self.profiler = profiler or StageProfiler()
+        # Opt-in analyses (see ReportAccumulator)
+        self.accumulator_options = {'cube': cube, 'near_duplicates': near_duplicates}
         self.reports = []
         self.analysis_results = {}
+        self._structure = None
+        self._elements = None
+        self.cube = None
         
+    def iter_reports(self) -> Iterator[ParrotReport]:
+        """Yield typed reports one at a time from the memory-mapped JSONL file"""
+        for line_num, report, error in iter_records(self.data_path):
+            if report is None:
+                print(f"Error parsing line {line_num}: {error}")
+            else:
+                yield report
+
     def load_data(self) -> None:
         """Load JSONL data from file"""
         print(f"Loading data from {self.data_path}")
-        with open(self.data_path, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                try:
-                    report = json.loads(line.strip())
-                    self.reports.append(report)
-                except json.JSONDecodeError as e:
-                    print(f"Error parsing line {line_num}: {e}")
+        with self.profiler.stage('load_data') as stage, gc_paused():
+            self.reports.extend(self.iter_reports())
+            stage.records = len(self.reports)
         
         print(f"Loaded {len(self.reports)} reports")
     
@@ -48,130 +1005,54 @@ class ParrotAnalyzer:
         """Analyze basic structure and metadata of reports"""
         print("Analyzing basic report structure...")
         
-        # Extract basic fields
-        fields_present = Counter()
-        languages = Counter()
-        modalities = Counter()
-        areas = Counter()
-        countries = Counter()
-        subspecialties = Counter()
-        icd_codes = Counter()
-        
-        for report in self.reports:
-            # Count which fields are present
-            for field in report.keys():
-                fields_present[field] += 1
-            
-            # Extract metadata
-            if 'language' in report:
-                languages[report['language']] += 1
-            if 'modality' in report:
-                modalities[report['modality']] += 1
-            if 'area' in report:
-                areas[report['area']] += 1
-            if 'country' in report:
-                countries[report['country']] += 1
-            if 'subspecialty' in report:
-                subspecialties[report['subspecialty']] += 1
-            if 'icd' in report:
-                # Handle multiple ICD codes
-                icd_list = report['icd'].split(', ') if ',' in report['icd'] else [report['icd']]
-                for icd in icd_list:
-                    icd_codes[icd.strip()] += 1
-        
-        structure_analysis = {
-            'total_reports': len(self.reports),
-            'fields_present': dict(fields_present),
-            'languages': dict(languages),
-            'modalities': dict(modalities),
-            'anatomical_areas': dict(areas),
-            'countries': dict(countries),
-            'subspecialties': dict(subspecialties),
-            'icd_codes': dict(icd_codes)
-        }
+        with self.profiler.stage('analyze_basic_structure') as stage:
+            structure = StructureAccumulator()
+            for report in self.reports:
+                structure.add(report)
+            stage.records = structure.total_reports
+        self._structure = structure
         
-        return structure_analysis
+        return structure.result()
     
     def analyze_report_content(self) -> Dict[str, Any]:
         """Analyze the actual report content for clinical elements"""
         print("Analyzing report content...")
         
-        # Content analysis patterns
-        report_lengths = []
-        translation_lengths = []
+        with self.profiler.stage('analyze_report_content') as stage:
+            content = ContentAccumulator()
+            elements = ElementPresenceAccumulator()
+            for report in self.reports:
+                elements.add(report, content.add(report))
+            stage.records = len(self.reports)
+        self._elements = elements
         
-        # Clinical patterns to look for
-        clinical_patterns = {
-            'findings_present': 0,
-            'normal_reports': 0,
-            'pathological_reports': 0,
-            'comparison_mentioned': 0,
-            'contrast_mentioned': 0,
-            'measurements_present': 0,
-            'recommendations_present': 0,
-            'technique_described': 0
-        }
-        
-        # Common clinical terms
-        normal_terms = ['normal', 'unremarkable', 'sin particularidades', 'conservado', 'respetado']
-        pathology_terms = ['lesion', 'abnormal', 'pathological', 'lesión', 'anormal', 'patológico']
-        comparison_terms = ['comparison', 'compare', 'previous', 'prior', 'comparación', 'previo']
-        contrast_terms = ['contrast', 'gadolinium', 'contraste', 'gadolinio']
-        measurement_terms = ['mm', 'cm', 'size', 'diameter', 'tamaño', 'diámetro']
-        recommendation_terms = ['recommend', 'suggest', 'follow', 'recomienda', 'sugiere', 'seguimiento']
-        
-        for report in self.reports:
-            # Analyze report content
-            report_text = report.get('report', '')
-            translation_text = report.get('translation', '')
-            
-            report_lengths.append(len(report_text))
-            if translation_text:
-                translation_lengths.append(len(translation_text))
-            
-            # Combine report and translation for analysis
-            full_text = (report_text + ' ' + translation_text).lower()
-            
-            # Check for clinical patterns
-            if any(term in full_text for term in normal_terms):
-                clinical_patterns['normal_reports'] += 1
-            if any(term in full_text for term in pathology_terms):
-                clinical_patterns['pathological_reports'] += 1
-            if any(term in full_text for term in comparison_terms):
-                clinical_patterns['comparison_mentioned'] += 1
-            if any(term in full_text for term in contrast_terms):
-                clinical_patterns['contrast_mentioned'] += 1
-            if any(term in full_text for term in measurement_terms):
-                clinical_patterns['measurements_present'] += 1
-            if any(term in full_text for term in recommendation_terms):
-                clinical_patterns['recommendations_present'] += 1
-            
-            # Check for findings vs normal
-            if report_text:
-                clinical_patterns['findings_present'] += 1
-        
-        content_analysis = {
-            'report_length_stats': {
-                'mean': np.mean(report_lengths),
-                'median': np.median(report_lengths),
-                'min': min(report_lengths),
-                'max': max(report_lengths)
-            },
-            'translation_length_stats': {
-                'mean': np.mean(translation_lengths) if translation_lengths else 0,
-                'median': np.median(translation_lengths) if translation_lengths else 0,
-                'min': min(translation_lengths) if translation_lengths else 0,
-                'max': max(translation_lengths) if translation_lengths else 0
-            } if translation_lengths else None,
-            'clinical_patterns': clinical_patterns
-        }
-        
-        return content_analysis
+        return content.result()
     
-    def map_to_xt_ehr_elements(self) -> Dict[str, Any]:
-        """Map PARROT data elements to Xt-EHR model elements"""
+    @profiled('map_to_xt_ehr_elements')
+    def map_to_xt_ehr_elements(self, structure: Optional[StructureAccumulator] = None,
+                               elements: Optional[ElementPresenceAccumulator] = None) -> Dict[str, Any]:
+        """Map PARROT data elements to Xt-EHR model elements
+
+        Field presence comes from the structure counts gathered by
+        analyze_basic_structure, and content-derived and rarely present
+        elements from the presence counts gathered by
+        analyze_report_content (or the single analysis pass), so no extra
+        scan of the reports is needed.
+        """
         print("Mapping to Xt-EHR elements...")
         
+        if structure is None:
+            structure = self._structure
+        if structure is None:
+            structure = StructureAccumulator()
+            for report in self.reports:
+                structure.add(report)
+        if elements is None:
+            if self._elements is None:
+                self.analyze_report_content()
+            elements = self._elements
+        element_presence = elements.result()
+        
         # Mapping of PARROT fields to Xt-EHR elements
         xt_ehr_mapping = {
             # Header elements that are definitely present
@@ -218,7 +1099,7 @@ class ParrotAnalyzer:
         
         # Calculate presence statistics
         presence_stats = {}
-        total_reports = len(self.reports)
+        total_reports = structure.total_reports
         
         # Count actual occurrences in the dataset
         for category, elements in xt_ehr_mapping.items():
@@ -227,27 +1108,21 @@ class ParrotAnalyzer:
                 if category == 'present_required':
                     presence_stats[category][element] = {'count': total_reports, 'percentage': 100.0}
                 elif category == 'derivable':
-                    # Check actual field presence
-                    if 'language' in element:
-                        count = sum(1 for r in self.reports if 'language' in r and r['language'])
-                    elif 'contributor_code' in element:
-                        count = sum(1 for r in self.reports if 'contributor_code' in r and r['contributor_code'])
-                    elif 'subspecialty' in element:
-                        count = sum(1 for r in self.reports if 'subspecialty' in r and r['subspecialty'])
-                    elif 'area' in element:
-                        count = sum(1 for r in self.reports if 'area' in r and r['area'])
-                    else:
-                        count = 0
+                    # Check actual (non-empty) field presence
+                    source_field = next((field for field in DERIVABLE_FIELDS if field in element), None)
+                    count = structure.fields_non_empty[source_field] if source_field else 0
                     presence_stats[category][element] = {
                         'count': count, 
                         'percentage': (count / total_reports) * 100
                     }
                 else:
                     # For content-derived and rarely present, use content analysis
+                    presence = element_presence.get(element, {'count': 0, 'percentage': 0.0})
                     presence_stats[category][element] = {
-                        'count': 0, 
-                        'percentage': 0.0,
-                        'description': description
+                        'count': presence['count'],
+                        'percentage': presence['percentage'],
+                        'description': description,
+                        **{key: value for key, value in presence.items() if key.startswith('by_')}
                     }
         
         return {
@@ -255,41 +1130,311 @@ class ParrotAnalyzer:
             'presence_statistics': presence_stats
         }
     
-    def run_complete_analysis(self) -> Dict[str, Any]:
-        """Run complete analysis pipeline"""
+    def run_complete_analysis(self, streaming: bool = False, workers: int = 1,
+                              columnar: bool = False, state_path: Optional[str] = None,
+                              resume: bool = True) -> Dict[str, Any]:
+        """Run complete analysis pipeline
+
+        With ``streaming=True`` the JSONL is read once and every report is
+        fed straight into mergeable accumulators instead of being kept.
+        Their counters and sketches grow with the variety of the data
+        (distinct metadata values, ICD codes and code pairs), not with the
+        number of reports; only the opt-in cube and near-duplicate
+        detection keep a row per report (see ReportAccumulator).
+        ``workers`` > 1 additionally splits the file into shards analysed
+        in parallel. ``columnar=True`` computes the same results with
+        vectorised pandas operations instead. Given a ``state_path``, the
+        streaming run is incremental: only reports appended since the
+        saved state are analysed (see run_incremental_analysis). The
+        results are identical either way.
+        """
+        if columnar:
+            return self.run_columnar_analysis()
+        if state_path is not None:
+            return self.run_incremental_analysis(state_path, workers, resume)
+        if streaming or workers > 1:
+            return self.run_streaming_analysis(workers)
+        
         print("Starting complete PARROT dataset analysis...")
         
         # Load data
         self.load_data()
         
-        # Run all analyses
-        structure_analysis = self.analyze_basic_structure()
-        content_analysis = self.analyze_report_content()
-        mapping_analysis = self.map_to_xt_ehr_elements()
+        # Run all analyses in one pass over the loaded reports
+        print("Analyzing report structure and content...")
+        with self.profiler.stage('analyze_reports') as stage:
+            accumulator = ReportAccumulator(**self.accumulator_options)
+            if self.profiler.enabled:
+                timings = dict.fromkeys(PASS_STAGES[1:], 0.0)
+                for report in self.reports:
+                    accumulator.add_timed(report, timings)
+                self.record_pass_stages(timings, len(self.reports))
+            else:
+                for report in self.reports:
+                    accumulator.add(report)
+            stage.records = len(self.reports)
+        
+        return self.compile_results(accumulator)
+    
+    def run_streaming_analysis(self, workers: int = 1) -> Dict[str, Any]:
+        """Run the analysis in one pass without keeping reports in memory"""
+        if workers > 1:
+            print(f"Starting parallel PARROT dataset analysis of {self.data_path} ({workers} workers)...")
+        else:
+            print(f"Starting streaming PARROT dataset analysis of {self.data_path}...")
+        
+        accumulator, _ = self.accumulate_range(0, os.path.getsize(self.data_path), workers)
+        
+        return self.compile_results(accumulator)
+    
+    def accumulate_range(self, start: int, end: int, workers: int = 1,
+                         lines_before: int = 0) -> Tuple[ReportAccumulator, int]:
+        """Accumulate the reports in a byte range of the file.
+
+        With several workers the range is split into shards analysed in a
+        process pool and merged in file order, so Counter ordering matches
+        a serial run. Parse errors are reported with file-wide line numbers
+        (offset by ``lines_before``). Returns the accumulator and the number
+        of lines read. When profiling, the time spent in each of
+        PASS_STAGES is recorded too, summed over the workers.
+        """
+        timed = self.profiler.enabled
+        with self.profiler.stage('analyze_reports') as stage:
+            if workers <= 1:
+                results = [analyze_shard(self.data_path, start, end, self.accumulator_options, timed)]
+            else:
+                shards = shard_byte_ranges(self.data_path, workers, start, end)
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = [executor.submit(analyze_shard, self.data_path, *shard, self.accumulator_options, timed)
+                               for shard in shards]
+                    results = [future.result() for future in futures]
+            
+            accumulator = ReportAccumulator(**self.accumulator_options)
+            line_total = 0
+            timings = dict.fromkeys(PASS_STAGES, 0.0)
+            for shard_accumulator, line_count, errors, shard_timings in results:
+                for line_num, message in errors:
+                    print(f"Error parsing line {lines_before + line_total + line_num}: {message}")
+                accumulator.merge(shard_accumulator)
+                line_total += line_count
+                for name, seconds in (shard_timings or {}).items():
+                    timings[name] += seconds
+            stage.records = accumulator.structure.total_reports
+            if timed:
+                self.record_pass_stages(timings, stage.records)
+        
+        return accumulator, line_total
+    
+    def record_pass_stages(self, timings: Dict[str, float], records: int) -> None:
+        """Record the PASS_STAGES timed inside a single pass as stages of their own"""
+        for name, seconds in timings.items():
+            self.profiler.record(name, seconds, records)
+    
+    def run_incremental_analysis(self, state_path: str, workers: int = 1,
+                                 resume: bool = True) -> Dict[str, Any]:
+        """Analyse only what was appended since the state saved at state_path.
+
+        The state holds the accumulators, the byte offset analysed so far
+        and a hash of the file up to that offset. If the hash no longer
+        matches (the file was edited, truncated or replaced), or the
+        analysis itself changed, everything is recomputed. Only complete
+        lines are committed to the state, so a final line still being
+        written is analysed again on the next run.
+        """
+        print(f"Starting incremental PARROT dataset analysis of {self.data_path}...")
+        size = os.path.getsize(self.data_path)
+        accumulator, offset, lines_done = ReportAccumulator(**self.accumulator_options), 0, 0
+        # Opt-in analyses need their per-report data saved with the state
+        needs_cube, needs_index = accumulator.cube is not None, accumulator.near_duplicates is not None
+        
+        with self.profiler.stage('load_state'):
+            state = self.load_state(state_path) if resume else None
+            cube = (self.load_state_cube(state_path, state['reports'])
+                    if state is not None and needs_cube else None)
+            near_duplicates = (self.load_state_near_duplicates(state_path, state['reports'])
+                               if state is not None and needs_index else None)
+        if state is not None:
+            if state['offset'] > size or _prefix_digest(self.data_path, state['offset']) != state['prefix_sha256']:
+                print("Dataset changed since the saved state; running a full analysis")
+            elif (needs_cube and cube is None) or (needs_index and near_duplicates is None):
+                print("Saved cube or MinHash index is missing or incomplete; running a full analysis")
+            else:
+                accumulator = ReportAccumulator.from_state(state['accumulator'], cube, near_duplicates)
+                offset, lines_done = state['offset'], state['lines']
+                print(f"Resuming from saved state: {lines_done} lines already analysed, "
+                      f"{size - offset} new bytes")
+        
+        complete_end = last_line_end(self.data_path, offset, size)
+        appended, line_count = self.accumulate_range(offset, complete_end, workers, lines_done)
+        accumulator.merge(appended)
+        lines_done += line_count
+        with self.profiler.stage('save_state'):
+            self.save_state(state_path, accumulator, complete_end, lines_done)
+        
+        if complete_end < size:
+            # Unterminated final line: count it in these results only
+            tail, _ = self.accumulate_range(complete_end, size, 1, lines_done)
+            accumulator.merge(tail)
+        
+        return self.compile_results(accumulator)
+    
+    def load_state(self, state_path: str) -> Optional[Dict[str, Any]]:
+        """Return the saved incremental state if it is usable with this analysis"""
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get('fingerprint') != analysis_fingerprint():
+            print("Saved analysis state was produced by a different analysis; ignoring it")
+            return None
+        return state
+    
+    @staticmethod
+    def state_cube_path(state_path: str) -> Path:
+        """Where the cube belonging to a state file is kept (e.g. parrot_analysis.state.cube.npz)"""
+        state_path = Path(state_path)
+        return state_path.with_name(f"{state_path.stem}.cube.npz")
+    
+    def load_state_cube(self, state_path: str, rows: int) -> Optional[ReportCube]:
+        """Load the saved cube if it covers exactly the rows of the state
+        (a state saved without the cube has none)"""
+        try:
+            cube = ReportCube.load(self.state_cube_path(state_path))
+        except (OSError, ValueError, KeyError):
+            return None
+        return cube if len(cube) == rows and cube.flag_names == CUBE_FLAGS else None
+    
+    @staticmethod
+    def state_near_duplicates_path(state_path: str) -> Path:
+        """Where the MinHash index belonging to a state file is kept (e.g. parrot_analysis.state.minhash.npz)"""
+        state_path = Path(state_path)
+        return state_path.with_name(f"{state_path.stem}.minhash.npz")
+    
+    def load_state_near_duplicates(self, state_path: str, rows: int) -> Optional[MinHashLSH]:
+        """Load the saved MinHash index if it covers exactly the rows of the state
+        (a state saved without near-duplicate detection has none)"""
+        try:
+            near_duplicates = MinHashLSH.load(self.state_near_duplicates_path(state_path))
+        except (OSError, ValueError, KeyError):
+            return None
+        return near_duplicates if len(near_duplicates) == rows else None
+    
+    def save_state(self, state_path: str, accumulator: ReportAccumulator, offset: int, lines: int) -> None:
+        """Persist the accumulators and how far into the file they reach"""
+        for saved, path in ((accumulator.cube, self.state_cube_path(state_path)),
+                            (accumulator.near_duplicates, self.state_near_duplicates_path(state_path))):
+            if saved is not None:
+                saved.save(path)
+            elif path.exists():
+                # Left from an earlier run, it would no longer match the state
+                path.unlink()
+        state = {
+            'fingerprint': analysis_fingerprint(),
+            'source_file': str(self.data_path),
+            'offset': offset,
+            'lines': lines,
+            'prefix_sha256': _prefix_digest(self.data_path, offset),
+            'reports': accumulator.structure.total_reports,
+            'accumulator': accumulator.state()
+        }
+        state_path = Path(state_path)
+        state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = state_path.with_name(state_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, state_path)
+    
+    def run_columnar_analysis(self) -> Dict[str, Any]:
+        """Run the analysis with the vectorised pandas engine"""
+        if not self.reports:
+            self.load_data()
+        
+        print("Running columnar PARROT dataset analysis...")
+        engine = ColumnarEngine()
+        with self.profiler.stage('build_frame') as stage:
+            frame = engine.to_frame(self.reports)
+            stage.records = len(frame)
+        with self.profiler.stage('analyze_reports') as stage:
+            accumulator = engine.accumulate(frame, **self.accumulator_options, profiler=self.profiler)
+            stage.records = len(frame)
         
-        # Compile results
+        return self.compile_results(accumulator)
+    
+    @profiled('compile_results')
+    def compile_results(self, accumulator: ReportAccumulator) -> Dict[str, Any]:
+        """Build the results tree from a filled accumulator"""
+        self._structure = accumulator.structure
+        self._elements = accumulator.elements
+        self.cube = accumulator.cube
         self.analysis_results = {
             'dataset_info': {
-                'total_reports': len(self.reports),
+                'total_reports': accumulator.structure.total_reports,
                 'source_file': str(self.data_path)
             },
-            'structure_analysis': structure_analysis,
-            'content_analysis': content_analysis,
-            'xt_ehr_mapping': mapping_analysis
+            'structure_analysis': accumulator.structure.result(),
+            'content_analysis': accumulator.content.result(),
+            'cross_tabs': accumulator.cross_tabs.result(),
+            'icd_analysis': accumulator.icd.summary(),
+            'xt_ehr_mapping': self.map_to_xt_ehr_elements(accumulator.structure, accumulator.elements)
         }
+        if accumulator.near_duplicates is not None:
+            self.analysis_results['near_duplicates'] = self.analyze_near_duplicates(accumulator.near_duplicates)
         
         return self.analysis_results
     
-    def save_results(self, output_path: str) -> None:
-        """Save analysis results to JSON file"""
-        output_file = Path(output_path)
-        output_file.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(self.analysis_results, f, indent=2, ensure_ascii=False)
+    @profiled('near_duplicates')
+    def analyze_near_duplicates(self, near_duplicates: MinHashLSH) -> Dict[str, Any]:
+        """Cluster near-duplicate reports and recompute the pattern rates with
+        one report per cluster (its first), using the cube's rows"""
+        labels = near_duplicates.cluster_labels()
+        section = near_duplicates.summary(labels)
+        for cluster in section['largest_clusters']:
+            for dimension in ('language', 'modality', 'area'):
+                code = int(self.cube.codes(dimension)[cluster['first_report']])
+                cluster[dimension] = self.cube.dictionaries[dimension].values[code] if code >= 0 else None
+
+        keep = labels == np.arange(len(labels))
+        kept = int(keep.sum())
+        total = len(labels)
+        kept_counts = {flag: self.cube.count(flags=[flag], rows=keep) for flag in CUBE_FLAGS}
+        section['deduplicated'] = {
+            'total_reports': kept,
+            'clinical_patterns': {
+                flag: {
+                    'count': count,
+                    'percentage': count / kept * 100 if kept else 0,
+                    'all_reports_percentage': self.cube.count(flags=[flag]) / total * 100 if total else 0
+                }
+                for flag, count in kept_counts.items()
+            },
+            'languages': self.cube.count('language', rows=keep),
+            'modalities': self.cube.count('modality', rows=keep)
+        }
+        return section
+    
+    @profiled('save_results')
+    def save_results(self, output_path: str, fmt: str = 'json') -> None:
+        """Save analysis results (indented JSON by default; see parrot_results_io.py)"""
+        output_file = write_results(self.analysis_results, output_path, fmt)
         
         print(f"Analysis results saved to {output_file}")
     
+    @profiled('save_tables')
+    def save_tables(self, directory: str) -> None:
+        """Save the per-dimension counts and cross-tabs as Parquet tables"""
+        for path in write_tables(self.analysis_results, directory):
+            print(f"Table saved to {path}")
+    
+    @profiled('render_charts')
+    def save_charts(self, directory: str) -> None:
+        """Render the distribution charts, skipping those whose counts are unchanged (see parrot_charts.py)"""
+        charts = render_charts(self.analysis_results, directory)
+        for path in charts['rendered']:
+            print(f"Chart saved to {path}")
+        if charts['unchanged']:
+            print(f"{len(charts['unchanged'])} chart(s) unchanged in {directory}")
+    
     def generate_summary_report(self) -> str:
         """Generate a human-readable summary report"""
         if not self.analysis_results:
@@ -342,23 +1487,131 @@ class ParrotAnalyzer:
         report_lines.append(f"- Content-Derived Elements: {len(mapping['mapping']['content_derived'])}")
         report_lines.append(f"- Rarely Present Elements: {len(mapping['mapping']['rarely_present'])}")
         report_lines.append("")
+        report_lines.append("### Content-Derived Element Presence:")
+        for element, presence in mapping['presence_statistics']['content_derived'].items():
+            report_lines.append(f"- {element}: {presence['count']} ({presence['percentage']:.1f}%)")
+        report_lines.append("")
+        
+        # Near-duplicates
+        duplicates = self.analysis_results.get('near_duplicates')
+        if duplicates:
+            report_lines.append("## Near-Duplicate Reports")
+            report_lines.append(f"- Clusters: {duplicates['clusters']} ({duplicates['reports_in_clusters']} reports)")
+            report_lines.append(f"- Duplicate Reports: {duplicates['duplicate_reports']} "
+                                f"({duplicates['duplicate_percentage']:.1f}%)")
+            report_lines.append(f"- Reports After Deduplication: {duplicates['deduplicated']['total_reports']}")
+            report_lines.append("")
+            report_lines.append("### Clinical Patterns After Deduplication:")
+            for pattern in CLINICAL_TERMS:
+                rates = duplicates['deduplicated']['clinical_patterns'][pattern]
+                report_lines.append(f"- {pattern}: {rates['percentage']:.1f}% "
+                                    f"(all reports: {rates['all_reports_percentage']:.1f}%)")
+            report_lines.append("")
+        
+        # Stage profile (--profile)
+        profile = self.analysis_results.get('profile')
+        if profile:
+            report_lines.append("## Profile")
+            report_lines.append(f"- Total: {profile['total_seconds']:.2f}s")
+            for stage in profile['stages']:
+                if 'skipped' in stage:
+                    report_lines.append(f"- {stage['stage']}: skipped ({stage['skipped']})")
+                    continue
+                line = f"- {stage['stage']}: {stage['seconds']:.3f}s"
+                if stage.get('records_per_second'):
+                    line += f", {stage['records_per_second']:,.0f} records/s"
+                if 'peak_memory_mb' in stage:
+                    line += f", peak {stage['peak_memory_mb']:.1f} MB"
+                report_lines.append(line)
+            report_lines.append("")
         
         return "\\n".join(report_lines)
 
 
+# Default locations, relative to the repository root
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_DATA_PATH = PROJECT_DIR / 'data' / 'PARROT_v1_0.jsonl'
+DEFAULT_OUTPUT_PATH = PROJECT_DIR / 'output' / 'parrot_analysis.json'
+DEFAULT_SUMMARY_PATH = PROJECT_DIR / 'output' / 'parrot_summary.md'
+
+
 def main():
     """Main execution function"""
-    # Set up paths
-    data_path = "c:/Users/duncanfalconer/VS_Code_Projects/FHIR Imaging Report/data/PARROT_v1_0.jsonl"
-    output_path = "c:/Users/duncanfalconer/VS_Code_Projects/FHIR Imaging Report/output/parrot_analysis.json"
-    summary_path = "c:/Users/duncanfalconer/VS_Code_Projects/FHIR Imaging Report/output/parrot_summary.md"
+    parser = argparse.ArgumentParser(description="Analyze the PARROT imaging report dataset")
+    parser.add_argument('data_path', nargs='?', default=str(DEFAULT_DATA_PATH),
+                        help="PARROT JSONL file (default: data/PARROT_v1_0.jsonl)")
+    parser.add_argument('--output', default=str(DEFAULT_OUTPUT_PATH),
+                        help="analysis results output path (default: output/parrot_analysis.json)")
+    parser.add_argument('--summary', default=str(DEFAULT_SUMMARY_PATH),
+                        help="markdown summary output path (default: output/parrot_summary.md)")
+    parser.add_argument('--cube', metavar='PATH',
+                        help="also save the per-report metadata cube for ad-hoc queries to PATH "
+                             "(see parrot_cube.py; keeps ~22 bytes per report during the run)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="processes to shard the analysis across (default: 1)")
+    parser.add_argument('--engine', choices=('streaming', 'columnar', 'memory'), default='streaming',
+                        help="per-report accumulators over the file, vectorised pandas, or per-report "
+                             "accumulators over reports loaded into memory (default: streaming)")
+    parser.add_argument('--state', help="incremental state file for the streaming engine (default: next to --output)")
+    parser.add_argument('--full', action='store_true',
+                        help="ignore saved state and re-analyse the whole file")
+    parser.add_argument('--format', choices=RESULT_FORMATS, default='json',
+                        help="results encoding: indented JSON, compact JSON or msgpack (default: json)")
+    parser.add_argument('--tables', metavar='DIR',
+                        help="also write per-dimension counts and cross-tabs as Parquet tables to DIR")
+    parser.add_argument('--charts', metavar='DIR',
+                        help="also render modality, language, area and clinical-pattern charts to DIR "
+                             "(needs matplotlib; charts whose counts are unchanged are not redrawn)")
+    parser.add_argument('--near-duplicates', action='store_true',
+                        help="also cluster near-duplicate reports (MinHash/LSH) and report deduplicated "
+                             "pattern rates; keeps a 256-byte signature per report and slows the run")
+    parser.add_argument('--profile', nargs='?', const='full', choices=('full', 'time'),
+                        help="record wall time, records/s and tracemalloc peak per stage in the results "
+                             "(memory is traced in this process only, and tracing slows the run; "
+                             "'--profile time' records timings only)")
+    args = parser.parse_args()
+    if not format_available(args.format):
+        parser.error(f"--format {args.format} needs the {args.format} package (pip install {args.format})")
+    if not Path(args.data_path).is_file():
+        parser.error(f"data file not found: {args.data_path}")
+    data_path, output_path, summary_path = args.data_path, args.output, args.summary
+    workers = max(1, args.workers)
     
     # Run analysis
-    analyzer = ParrotAnalyzer(data_path)
-    results = analyzer.run_complete_analysis()
+    profiler = StageProfiler(enabled=bool(args.profile), trace_memory=args.profile == 'full').start()
+    analyzer = ParrotAnalyzer(data_path, profiler, cube=bool(args.cube), near_duplicates=args.near_duplicates)
+    if args.engine == 'memory':
+        results = analyzer.run_complete_analysis(workers=workers)
+    else:
+        state_path = args.state or str(Path(output_path).with_suffix('.state.json'))
+        results = analyzer.run_complete_analysis(streaming=True, workers=workers,
+                                                columnar=args.engine == 'columnar',
+                                                state_path=state_path, resume=not args.full)
+    
+    # Save results, plus the metadata cube when asked for (see parrot_cube.py)
+    analyzer.save_results(output_path, args.format)
+    if args.tables:
+        try:
+            analyzer.save_tables(args.tables)
+        except ImportError as e:
+            print(f"Skipping Parquet tables: {e}")
+    if args.charts:
+        try:
+            analyzer.save_charts(args.charts)
+        except ImportError as e:
+            print(f"Skipping charts: {e}")
+    if args.cube:
+        with profiler.stage('save_cube'):
+            analyzer.cube.save(args.cube)
     
-    # Save results
-    analyzer.save_results(output_path)
+    if args.profile:
+        # Written again so the results include the save stages themselves
+        profiler.stop()
+        analyzer.analysis_results['profile'] = profiler.result(
+            engine=args.engine, workers=workers, dataset_bytes=os.path.getsize(data_path),
+            total_reports=results['dataset_info']['total_reports']
+        )
+        write_results(analyzer.analysis_results, output_path, args.format)
     
     # Generate and save summary
     summary = analyzer.generate_summary_report()
@@ -367,6 +1620,8 @@ def main():
     
     print(f"Analysis complete!")
     print(f"Results saved to: {output_path}")
+    if args.cube:
+        print(f"Metadata cube saved to: {args.cube}")
     print(f"Summary saved to: {summary_path}")
     
     # Print summary to console
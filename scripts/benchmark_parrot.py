@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Benchmark the PARROT analyzer on synthetic datasets of increasing size
+
+For each size (3k, 100k and 1M reports by default) a synthetic dataset is
+generated once with parrot_synthetic.py and cached, then analyze_parrot.py
+is run on it in a fresh process with ``--profile``. Both run as child
+processes so that this one stays small: on Linux a child's peak RSS
+includes its parent's at the time it was started. The per-stage wall
+time, records per second and tracemalloc peaks it embeds in its results
+are collected, together with the whole run's wall time and the process's
+peak resident memory, into one JSON report and a table on the console.
+
+    python benchmark_parrot.py
+    python benchmark_parrot.py --sizes 3000 100000 --engines streaming columnar
+    python benchmark_parrot.py --no-trace-memory   # timings without tracing overhead
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, List
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+DEFAULT_WORK_DIR = SCRIPTS_DIR.parent / 'build' / 'benchmarks'
+DEFAULT_RESULTS_PATH = SCRIPTS_DIR.parent / 'output' / 'parrot_analysis.json'
+DEFAULT_SIZES = (3000, 100000, 1000000)
+
+
+def dataset_path(work_dir: Path, size: int, seed: int) -> Path:
+    return work_dir / f"parrot_synthetic_{size}_seed{seed}.jsonl"
+
+
+def ensure_dataset(work_dir: Path, size: int, seed: int, results_path: str) -> Path:
+    """Generate the synthetic dataset for size unless it is already cached"""
+    path = dataset_path(work_dir, size, seed)
+    if not path.exists():
+        print(f"Generating {size} synthetic reports...")
+        run = _run([sys.executable, str(SCRIPTS_DIR / 'parrot_synthetic.py'), str(path),
+                    '--reports', str(size), '--seed', str(seed), '--results', results_path])
+        if run['returncode'] != 0:
+            raise RuntimeError(f"Generating {path.name} failed:\n{run['stderr'][-2000:]}")
+        print(f"  {path.name}: {path.stat().st_size / 2 ** 20:.1f} MB in {run['seconds']:.1f}s")
+    return path
+
+
+def _run(command: List[str]) -> Dict[str, Any]:
+    """Run command; return its exit code, wall time and peak RSS (where the OS reports it)"""
+    started = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if hasattr(os, 'wait4'):
+        stderr = process.stderr.read()
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        # ru_maxrss is in KiB on Linux and bytes on macOS
+        peak_rss = usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    else:
+        _, stderr = process.communicate()
+        peak_rss = None
+    return {
+        'returncode': process.returncode,
+        'seconds': time.perf_counter() - started,
+        'peak_rss_mb': round(peak_rss / 2 ** 20, 1) if peak_rss else None,
+        'stderr': stderr.decode('utf-8', 'replace')
+    }
+
+
+def benchmark(data_path: Path, work_dir: Path, engine: str, workers: int,
+              trace_memory: bool, near_duplicates: bool = False) -> Dict[str, Any]:
+    """Analyse data_path once and return the run's measurements"""
+    output = work_dir / f"{data_path.stem}.{engine}.w{workers}.json"
+    command = [
+        sys.executable, str(SCRIPTS_DIR / 'analyze_parrot.py'), str(data_path),
+        '--output', str(output), '--summary', str(output.with_suffix('.md')),
+        '--engine', engine, '--workers', str(workers), '--full', '--format', 'compact',
+        '--profile', 'full' if trace_memory else 'time'
+    ] + (['--near-duplicates'] if near_duplicates else [])
+    run = _run(command)
+    if run['returncode'] != 0:
+        raise RuntimeError(f"Analyzer failed on {data_path.name} ({engine}):\n{run['stderr'][-2000:]}")
+    with open(output, 'r', encoding='utf-8') as f:
+        profile = json.load(f)['profile']
+    reports = profile['total_reports']
+    return {
+        'dataset': data_path.name,
+        'reports': reports,
+        'dataset_mb': round(data_path.stat().st_size / 2 ** 20, 1),
+        'engine': engine,
+        'workers': workers,
+        'near_duplicates': near_duplicates,
+        'seconds': round(run['seconds'], 3),
+        'records_per_second': round(reports / run['seconds'], 1),
+        'peak_rss_mb': run['peak_rss_mb'],
+        'stages': profile['stages']
+    }
+
+
+def format_table(runs: List[Dict[str, Any]]) -> str:
+    """Console table: one line per run, then one per stage"""
+    lines = [f"{'reports':>9}  {'engine':<9} {'workers':>7}  {'seconds':>8}  {'records/s':>10}  {'peak RSS':>9}"]
+    for run in runs:
+        rss = f"{run['peak_rss_mb']:.0f} MB" if run['peak_rss_mb'] else '-'
+        lines.append(f"{run['reports']:>9}  {run['engine']:<9} {run['workers']:>7}  {run['seconds']:>8.2f}  "
+                     f"{run['records_per_second']:>10,.0f}  {rss:>9}")
+        for stage in run['stages']:
+            if 'skipped' in stage:
+                lines.append(f"{'':>11}- {stage['stage']:<24} {'skipped':>9}")
+                continue
+            rate = f"{stage['records_per_second']:,.0f}/s" if stage.get('records_per_second') else ''
+            peak = f"{stage['peak_memory_mb']:.1f} MB" if 'peak_memory_mb' in stage else ''
+            lines.append(f"{'':>11}- {stage['stage']:<24} {stage['seconds']:>8.3f}s {rate:>12} {peak:>10}")
+    return '\n'.join(lines)
+
+
+def main():
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark analyze_parrot.py on synthetic datasets")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help="dataset sizes in reports (default: 3000 100000 1000000)")
+    parser.add_argument('--engines', nargs='+', default=['streaming'],
+                        choices=('streaming', 'columnar', 'memory'), help="analyzer engines (default: streaming)")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1], help="worker counts (default: 1)")
+    parser.add_argument('--seed', type=int, default=0, help="synthetic data seed (default: 0)")
+    parser.add_argument('--results', default=str(DEFAULT_RESULTS_PATH),
+                        help="analysis results the synthetic distributions come from")
+    parser.add_argument('--work-dir', default=str(DEFAULT_WORK_DIR),
+                        help="where datasets and analyzer outputs are kept (default: build/benchmarks)")
+    parser.add_argument('--output', help="benchmark report path (default: <work-dir>/benchmark_results.json)")
+    parser.add_argument('--no-trace-memory', action='store_true',
+                        help="skip tracemalloc, for timings without its overhead (peak RSS is still reported)")
+    parser.add_argument('--near-duplicates', action='store_true',
+                        help="include the opt-in near-duplicate detection in the analyzer runs")
+    args = parser.parse_args()
+
+    work_dir = Path(args.work_dir)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    runs = []
+    for size in args.sizes:
+        data_path = ensure_dataset(work_dir, size, args.seed, args.results)
+        for engine in args.engines:
+            for workers in args.workers:
+                if engine != 'streaming' and workers > 1:
+                    continue  # only the streaming engine shards across processes
+                print(f"Analysing {size} reports ({engine}, {workers} worker(s))...")
+                runs.append(benchmark(data_path, work_dir, engine, workers, not args.no_trace_memory,
+                                      args.near_duplicates))
+
+    report = {
+        'generated': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': sys.platform,
+        'cpu_count': os.cpu_count(),
+        'memory_traced': not args.no_trace_memory,
+        'runs': runs
+    }
+    output = Path(args.output) if args.output else work_dir / 'benchmark_results.json'
+    output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+
+    print()
+    print(format_table(runs))
+    print(f"\nBenchmark report saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Distribution charts of the analysis results, rendered only when they change
+
+render_charts() draws the standard charts (modalities, languages,
+anatomical areas and clinical pattern rates) from a results tree:
+
+- matplotlib (and seaborn, when installed) are imported only here, inside
+  the processes doing the drawing, so runs without charts never pay for
+  importing them
+- charts are drawn in parallel worker processes, one chart per task
+- each chart's input counts are hashed and recorded in a manifest next to
+  the images (``charts.manifest.json``); a chart whose counts and image
+  are unchanged since the last run is not redrawn
+"""
+
+import os
+import json
+import hashlib
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+MANIFEST_NAME = 'charts.manifest.json'
+
+# Bump when the drawing code changes, so existing images are redrawn
+CHART_VERSION = 1
+
+# name: (results section, key, title, value axis label, bars shown)
+DISTRIBUTION_CHARTS = {
+    'modalities': ('structure_analysis', 'modalities', "Reports by modality", "Reports", 20),
+    'languages': ('structure_analysis', 'languages', "Reports by language", "Reports", 20),
+    'anatomical_areas': ('structure_analysis', 'anatomical_areas', "Reports by anatomical area", "Reports", 25),
+    'clinical_patterns': ('content_analysis', 'clinical_patterns', "Clinical pattern rates",
+                          "Reports (%)", None)
+}
+
+
+def chart_inputs(results: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """The data each chart is drawn from: its title, axis label and (label, value) bars"""
+    total = results.get('dataset_info', {}).get('total_reports', 0)
+    inputs = {}
+    for name, (section, key, title, axis_label, limit) in DISTRIBUTION_CHARTS.items():
+        counts = results.get(section, {}).get(key)
+        if not counts:
+            continue
+        if name == 'clinical_patterns':
+            bars = [(pattern.replace('_', ' '), round(count / total * 100, 2) if total else 0.0)
+                    for pattern, count in counts.items()]
+        else:
+            bars = sorted(((str(label), count) for label, count in counts.items()),
+                          key=lambda bar: (-bar[1], bar[0]))[:limit]
+        inputs[name] = {'title': title, 'axis_label': axis_label, 'bars': bars}
+    return inputs
+
+
+def _input_hash(chart: Dict[str, Any], fmt: str) -> str:
+    content = json.dumps({'version': CHART_VERSION, 'format': fmt, 'chart': chart},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _load_manifest(directory: Path) -> Dict[str, Any]:
+    try:
+        with open(directory / MANIFEST_NAME, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _render(chart: Dict[str, Any], path: str) -> str:
+    """Draw one horizontal bar chart to path (runs in a worker process)"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    try:
+        import seaborn as sns
+    except ImportError:
+        sns = None
+
+    labels = [label for label, _ in chart['bars']]
+    values = [value for _, value in chart['bars']]
+    figure, axes = plt.subplots(figsize=(8, max(2.5, 0.35 * len(labels) + 1)))
+    if sns is not None:
+        sns.barplot(x=values, y=labels, orient='h', color=sns.color_palette()[0], ax=axes)
+    else:
+        axes.barh(labels, values)
+        axes.invert_yaxis()
+    axes.set_title(chart['title'])
+    axes.set_xlabel(chart['axis_label'])
+    figure.tight_layout()
+    tmp_path = f"{path}.tmp"
+    figure.savefig(tmp_path, dpi=120, format=Path(path).suffix[1:])
+    plt.close(figure)
+    os.replace(tmp_path, path)
+    return path
+
+
+def render_charts(results: Dict[str, Any], directory, workers: Optional[int] = None,
+                  fmt: str = 'png') -> Dict[str, List[Path]]:
+    """Draw the charts of results whose inputs changed since the last call.
+
+    Returns the paths drawn ('rendered') and left as they were ('unchanged').
+    Raises ImportError when charts need drawing but matplotlib is missing.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = _load_manifest(directory)
+
+    pending: List[Tuple[str, Dict[str, Any], Path]] = []
+    unchanged = []
+    hashes = {}
+    for name, chart in chart_inputs(results).items():
+        path = directory / f"{name}.{fmt}"
+        hashes[name] = _input_hash(chart, fmt)
+        if manifest.get(name, {}).get('input_hash') == hashes[name] and path.exists():
+            unchanged.append(path)
+        else:
+            pending.append((name, chart, path))
+
+    if pending and importlib.util.find_spec('matplotlib') is None:
+        raise ImportError("Charts need the matplotlib package (pip install matplotlib)")
+
+    workers = min(workers or os.cpu_count() or 1, len(pending))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_render, chart, str(path)) for _, chart, path in pending]
+            for future in futures:
+                future.result()
+    else:
+        for _, chart, path in pending:
+            _render(chart, str(path))
+
+    # Only charts present in these results are kept in the manifest
+    manifest = {
+        name: {'file': f"{name}.{fmt}", 'input_hash': input_hash} for name, input_hash in hashes.items()
+    }
+    tmp_manifest = directory / f"{MANIFEST_NAME}.tmp"
+    with open(tmp_manifest, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    tmp_manifest.replace(directory / MANIFEST_NAME)
+    return {'rendered': [path for _, _, path in pending], 'unchanged': unchanged}
@@ -0,0 +1,268 @@
+"""
+Compact multi-dimensional cube over PARROT report metadata
+
+Each report becomes one row: an integer code per metadata dimension
+(language, modality, area, country, subspecialty), looked up in a
+per-dimension Dictionary, plus a bitmask of the clinical patterns found in
+its text. Rows live in numpy arrays (five int32 columns and one uint16
+column, ~22 bytes per report), so arbitrary filter/group-by counts such as
+
+    cube.count(group_by='language',
+               where={'modality': 'CT', 'area': 'chest'},
+               flags=['contrast_mentioned'])
+
+take milliseconds even for millions of reports, without rescanning the
+JSONL. Cubes built from shards merge by remapping codes, and are saved to
+and loaded from a single .npz file.
+"""
+
+import json
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+CUBE_DIMENSIONS = ('language', 'modality', 'area', 'country', 'subspecialty')
+
+MISSING_CODE = -1
+
+
+class Dictionary:
+    """Interns values to dense integer codes, in first-seen order"""
+
+    def __init__(self, values: Iterable = ()):
+        self.values = []
+        self._codes = {}
+        for value in values:
+            self.code(value)
+
+    def code(self, value) -> int:
+        """Return the code for value, assigning the next one if it is new"""
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def lookup(self, value) -> Optional[int]:
+        """Return the code for value, or None if it was never seen"""
+        return self._codes.get(value)
+
+    def __len__(self):
+        return len(self.values)
+
+
+class ReportCube:
+    """Per-report dimension codes and pattern bitflags, with a query API"""
+
+    def __init__(self, dimensions: Sequence[str] = CUBE_DIMENSIONS, flag_names: Sequence[str] = ()):
+        if len(flag_names) > 16:
+            raise ValueError("ReportCube supports at most 16 flags")
+        self.dimensions = tuple(dimensions)
+        self.flag_names = tuple(flag_names)
+        self.dictionaries = {dimension: Dictionary() for dimension in self.dimensions}
+        self._codes = {dimension: array('i') for dimension in self.dimensions}
+        self._flags = array('H')
+        self._arrays = None
+
+    def __len__(self):
+        return len(self._flags)
+
+    # Building -------------------------------------------------------------
+
+    def add(self, report: Dict[str, Any], flags: int = 0) -> None:
+        """Append one report's metadata codes and pattern bitflags"""
+        for dimension in self.dimensions:
+            value = report.get(dimension)
+            self._codes[dimension].append(
+                MISSING_CODE if value is None else self.dictionaries[dimension].code(value)
+            )
+        self._flags.append(flags)
+        self._arrays = None
+
+    def add_columns(self, codes: Dict[str, Tuple[np.ndarray, List[Any]]], flags: np.ndarray) -> None:
+        """Append many reports at once.
+
+        ``codes`` maps each dimension to (integer codes, values those codes
+        index), e.g. a pandas categorical's codes and categories; -1 marks
+        a missing value. Dimensions left out are recorded as missing.
+        """
+        rows = len(flags)
+        for dimension in self.dimensions:
+            if dimension in codes:
+                column, values = codes[dimension]
+                column = self._remap(dimension, values)[np.asarray(column)]
+            else:
+                column = np.full(rows, MISSING_CODE)
+            self._codes[dimension].frombytes(column.astype(np.int32).tobytes())
+        self._flags.frombytes(np.asarray(flags).astype(np.uint16).tobytes())
+        self._arrays = None
+
+    def _remap(self, dimension: str, values: List[Any]) -> np.ndarray:
+        """Array mapping positions in values (and -1 at the end) to this cube's codes"""
+        dictionary = self.dictionaries[dimension]
+        return np.array([dictionary.code(value) for value in values] + [MISSING_CODE], dtype=np.int32)
+
+    def merge(self, other: 'ReportCube') -> 'ReportCube':
+        """Append another cube's rows (e.g. a later shard), translating its codes"""
+        if other.dimensions != self.dimensions or other.flag_names != self.flag_names:
+            raise ValueError("Cannot merge cubes with different dimensions or flags")
+        self.add_columns(
+            {dimension: (other.codes(dimension), other.dictionaries[dimension].values)
+             for dimension in other.dimensions},
+            other.flags
+        )
+        return self
+
+    def truncate(self, rows: int) -> None:
+        """Keep only the first rows reports"""
+        for dimension in self.dimensions:
+            del self._codes[dimension][rows:]
+        del self._flags[rows:]
+        self._arrays = None
+
+    # Column access --------------------------------------------------------
+
+    def _materialise(self):
+        if self._arrays is None:
+            # Copies, so the growable buffers are never locked by a live view
+            self._arrays = {
+                dimension: np.frombuffer(self._codes[dimension], dtype=np.int32).copy()
+                for dimension in self.dimensions
+            }
+            self._arrays[None] = np.frombuffer(self._flags, dtype=np.uint16).copy()
+        return self._arrays
+
+    def codes(self, dimension: str) -> np.ndarray:
+        """int32 codes of one dimension (-1 = missing)"""
+        return self._materialise()[dimension]
+
+    @property
+    def flags(self) -> np.ndarray:
+        """uint16 pattern bitflags, one per report"""
+        return self._materialise()[None]
+
+    def flag_bit(self, name: str) -> int:
+        try:
+            return 1 << self.flag_names.index(name)
+        except ValueError:
+            raise KeyError(f"Unknown flag: {name}") from None
+
+    # Queries --------------------------------------------------------------
+
+    def mask(self, where: Optional[Dict[str, Any]] = None, flags: Iterable[str] = (),
+             exclude_flags: Iterable[str] = (), rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Boolean row mask for a filter.
+
+        ``where`` maps dimensions to a value or a list of accepted values
+        (None matches a missing value). Rows must have every flag in
+        ``flags`` and none in ``exclude_flags``, and be selected by the
+        boolean ``rows`` mask when one is given.
+        """
+        selected = np.ones(len(self), dtype=bool) if rows is None else np.array(rows, dtype=bool)
+        for dimension, accepted in (where or {}).items():
+            if dimension not in self.dictionaries:
+                raise KeyError(f"Unknown dimension: {dimension}")
+            if isinstance(accepted, (list, tuple, set, frozenset)):
+                wanted = [self._code_of(dimension, value) for value in accepted]
+                selected &= np.isin(self.codes(dimension), [code for code in wanted if code is not None])
+            else:
+                code = self._code_of(dimension, accepted)
+                if code is None:
+                    return np.zeros(len(self), dtype=bool)
+                selected &= self.codes(dimension) == code
+        required = sum(self.flag_bit(name) for name in flags)
+        if required:
+            selected &= (self.flags & required) == required
+        excluded = sum(self.flag_bit(name) for name in exclude_flags)
+        if excluded:
+            selected &= (self.flags & excluded) == 0
+        return selected
+
+    def _code_of(self, dimension: str, value) -> Optional[int]:
+        return MISSING_CODE if value is None else self.dictionaries[dimension].lookup(value)
+
+    def count(self, group_by: Union[str, Sequence[str]] = (), where: Optional[Dict[str, Any]] = None,
+              flags: Iterable[str] = (), exclude_flags: Iterable[str] = (), rows: Optional[np.ndarray] = None):
+        """Count reports matching a filter, optionally grouped.
+
+        ``group_by`` takes dimension and/or flag names (flags group as
+        True/False). Without it the total is returned as an int; otherwise
+        a dict of group -> count sorted by descending count, keyed by the
+        value itself for a single group-by column and by a tuple otherwise.
+        """
+        selected = self.mask(where, flags, exclude_flags, rows)
+        single = isinstance(group_by, str)
+        columns = [group_by] if single else list(group_by)
+        if not columns:
+            return int(np.count_nonzero(selected))
+
+        keys, sizes, decoders = [], [], []
+        for column in columns:
+            if column in self.dictionaries:
+                # Shift codes so missing (-1) becomes 0
+                keys.append(self.codes(column)[selected].astype(np.int64) + 1)
+                values = [None] + self.dictionaries[column].values
+                sizes.append(len(values))
+                decoders.append(values.__getitem__)
+            else:
+                keys.append(((self.flags[selected] & self.flag_bit(column)) != 0).astype(np.int64))
+                sizes.append(2)
+                decoders.append(bool)
+
+        combined = np.ravel_multi_index(keys, sizes) if len(keys) > 1 else keys[0]
+        cells = int(np.prod(sizes))
+        if cells <= max(1 << 20, 4 * combined.size):
+            counts = np.bincount(combined, minlength=cells)
+            cell_ids = np.flatnonzero(counts)
+            counts = counts[cell_ids]
+        else:
+            cell_ids, counts = np.unique(combined, return_counts=True)
+
+        order = np.argsort(-counts, kind='stable')
+        indices = np.unravel_index(cell_ids[order], sizes)
+        result = {}
+        for position, count in enumerate(counts[order].tolist()):
+            key = tuple(decode(int(index[position])) for decode, index in zip(decoders, indices))
+            result[key[0] if single else key] = count
+        return result
+
+    def crosstab(self, rows: str, columns: str, **filters) -> Dict[Any, Dict[Any, int]]:
+        """Nested {row value: {column value: count}} table for two columns"""
+        table = {}
+        for (row, column), count in self.count((rows, columns), **filters).items():
+            table.setdefault(row, {})[column] = count
+        return table
+
+    # Persistence ----------------------------------------------------------
+
+    def save(self, path) -> None:
+        """Write the cube to a compressed .npz file"""
+        meta = {
+            'dimensions': self.dimensions,
+            'flag_names': self.flag_names,
+            'values': {dimension: self.dictionaries[dimension].values for dimension in self.dimensions}
+        }
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp.npz')
+        np.savez_compressed(
+            tmp_path,
+            meta=np.array(json.dumps(meta, ensure_ascii=False)),
+            flags=self.flags,
+            **{f'codes_{dimension}': self.codes(dimension) for dimension in self.dimensions}
+        )
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path) -> 'ReportCube':
+        """Read a cube written by save()"""
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            cube = cls(meta['dimensions'], meta['flag_names'])
+            for dimension in cube.dimensions:
+                cube.dictionaries[dimension] = Dictionary(meta['values'][dimension])
+                cube._codes[dimension].frombytes(data[f'codes_{dimension}'].astype(np.int32).tobytes())
+            cube._flags.frombytes(data['flags'].astype(np.uint16).tobytes())
+        return cube
@@ -0,0 +1,336 @@
+"""
+Near-duplicate report detection with MinHash signatures and LSH banding
+
+Templated reporting produces many reports that differ by a sentence or a
+measurement, and they skew pattern percentages. Comparing every pair is
+quadratic, so MinHashLSH instead gives each report, in the same pass as
+the other analyses, a fixed-size fingerprint:
+
+- the report text is lowercased, split into words and shingled into
+  overlapping word 3-grams, each hashed to 64 bits
+- 128 MinHash values (the minimum of 128 independent hash functions over
+  the shingles) estimate the Jaccard similarity of two shingle sets: the
+  fraction of values two signatures share
+
+Signatures keep 16 bits of each value (256 bytes per report, in file
+order), so millions of reports fit in memory, and instances built from
+shards merge by appending rows.
+
+cluster_labels() finds candidate pairs with 24 bands of 5 values each:
+reports sharing a band are candidates (~99% of pairs at a Jaccard
+similarity of 0.7 and ~100% at 0.8, but also ~53% at 0.5). Candidates
+are only hints. Reports are visited in file order and each joins the
+cluster of the most similar earlier cluster representative whose
+estimated similarity is at or above the threshold (0.8 by default), or
+else starts a cluster of its own. Every member is therefore similar to
+its cluster's first report, and clusters never chain through a series
+of pairwise matches. Each band bucket holds at most a few
+representatives, bounding the comparisons per report on heavily
+templated data. Signatures depend only on the text, so every engine and
+shard layout yields the same clusters.
+"""
+
+import json
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+# Bytes that belong to words: ASCII letters, digits and '_', and any byte of
+# a multi-byte UTF-8 character
+_WORD_BYTES = np.zeros(256, dtype=bool)
+for _byte in b'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_':
+    _WORD_BYTES[_byte] = True
+_WORD_BYTES[0x80:] = True
+
+# Polynomial word hash base (odd, so invertible modulo 2**64) and its inverse
+_HASH_BASE = np.uint64(0x100000001B3)
+_HASH_BASE_INVERSE = np.uint64(pow(0x100000001B3, -1, 1 << 64))
+_MIX_MULTIPLIER = np.uint64(0xBF58476D1CE4E5B9)
+
+# Distinct texts hashed per numpy batch
+_BATCH = 512
+
+
+_powers = (np.ones(0, dtype=np.uint64), np.ones(0, dtype=np.uint64))
+
+
+def _hash_powers(length: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Powers of _HASH_BASE and of its inverse, at least length of each (cached)"""
+    global _powers
+    if len(_powers[0]) < length:
+        size = max(1 << (length - 1).bit_length(), 1 << 16)
+        _powers = tuple(
+            np.concatenate((np.ones(1, dtype=np.uint64), np.cumprod(np.full(size - 1, base, dtype=np.uint64))))
+            for base in (_HASH_BASE, _HASH_BASE_INVERSE)
+        )
+    return _powers
+
+
+def _odd_constants(seed: int, count: int) -> np.ndarray:
+    """Fixed pseudo-random odd 64-bit multipliers, the same in every process"""
+    values = np.random.default_rng(seed).integers(0, 1 << 63, size=count, dtype=np.uint64)
+    return values * np.uint64(2) + np.uint64(1)
+
+
+class MinHashLSH:
+    """Mergeable per-report MinHash signatures, with clustering of near-duplicates"""
+
+    SHINGLE_WORDS = 3
+    PERMUTATIONS = 128
+    # Only the top bits of each MinHash value are kept: two different values
+    # agree by chance once in 2**16, which barely moves the estimates
+    SIGNATURE_BITS = 16
+    # Candidate bands, covering the first BANDS * ROWS_PER_BAND values
+    BANDS = 24
+    ROWS_PER_BAND = 5
+    # Estimated Jaccard similarity at which a report joins a cluster
+    SIMILARITY_THRESHOLD = 0.8
+    # Representatives compared per band bucket, bounding the work per report
+    BUCKET_REPRESENTATIVES = 4
+
+    # Shingle mixing, permutation (multiply-shift) and band hashing constants
+    _SHINGLE_MULTIPLIERS = _odd_constants(1, SHINGLE_WORDS)
+    _PERMUTATION_MULTIPLIERS = _odd_constants(2, PERMUTATIONS)
+    _BAND_MULTIPLIER = _odd_constants(3, 1)[0]
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self._signatures = array('H')  # PERMUTATIONS values per row
+        self._hashed = array('B')  # 1 where the row's text has words
+        self._pending: List[str] = []  # texts not hashed yet, in row order
+        self._arrays = None
+
+    def __len__(self):
+        return len(self._hashed) + len(self._pending)
+
+    @classmethod
+    def parameters(cls) -> Dict[str, Any]:
+        """Settings that determine the signatures"""
+        return {
+            'shingle_words': cls.SHINGLE_WORDS,
+            'permutations': cls.PERMUTATIONS,
+            'signature_bits': cls.SIGNATURE_BITS
+        }
+
+    # Building -------------------------------------------------------------
+
+    def add(self, text) -> None:
+        """Append one report's text (anything but a string counts as empty)"""
+        self._pending.append(text if isinstance(text, str) else '')
+        if len(self._pending) >= _BATCH:
+            self._flush()
+
+    def add_many(self, texts: Iterable) -> None:
+        """Append many reports' texts at once"""
+        self._pending.extend(text if isinstance(text, str) else '' for text in texts)
+        self._flush()
+
+    def _flush(self) -> None:
+        pending, self._pending = self._pending, []
+        for start in range(0, len(pending), _BATCH * 16):
+            signatures, hashed = self._text_signatures(pending[start:start + _BATCH * 16])
+            self._signatures.frombytes(signatures.tobytes())
+            self._hashed.frombytes(hashed.astype(np.uint8).tobytes())
+        self._arrays = None
+
+    @classmethod
+    def _text_signatures(cls, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """(signatures, has-words mask) of texts; repeated texts are hashed once"""
+        positions = {}
+        rows = np.array([positions.setdefault(text, len(positions)) for text in texts], dtype=np.int64)
+        distinct = list(positions)
+        signatures = np.zeros((len(distinct), cls.PERMUTATIONS), dtype=np.uint16)
+        hashed = np.zeros(len(distinct), dtype=bool)
+        for start in range(0, len(distinct), _BATCH):
+            batch_hashed, batch_signatures = cls._signatures(distinct[start:start + _BATCH])
+            hashed[start:start + len(batch_hashed)] = batch_hashed
+            # The top bits of each minimum
+            signatures[start + np.flatnonzero(batch_hashed)] = batch_signatures >> np.uint64(64 - cls.SIGNATURE_BITS)
+        return signatures[rows], hashed[rows]
+
+    @classmethod
+    def _word_hashes(cls, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """64-bit hash of every word of texts, and the index of the text it is in.
+
+        Words are runs of ASCII letters, digits and underscores and of
+        non-ASCII characters, in the lowercased UTF-8 bytes of all texts at
+        once (joined with NUL). Each word's hash is a polynomial hash of its
+        bytes, taken as the difference of two prefix sums rescaled by an
+        inverse power of the base, so there is no per-word Python code.
+        """
+        encoded = [text.lower().encode('utf-8') for text in texts]
+        data = np.frombuffer(b'\0'.join(encoded), dtype=np.uint8)
+        if not len(data):
+            return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64)
+        in_word = np.concatenate(([False], _WORD_BYTES[data], [False]))
+        edges = np.flatnonzero(in_word[1:] != in_word[:-1])
+        starts, ends = edges[0::2], edges[1::2]
+
+        powers, inverse_powers = _hash_powers(len(data))
+        prefix = np.concatenate(([np.uint64(0)], np.cumsum(data * powers[:len(data)], dtype=np.uint64)))
+        words = (prefix[ends] - prefix[starts]) * inverse_powers[starts]
+        # Spread the polynomial hash's bits (splitmix64 finaliser)
+        words ^= words >> np.uint64(31)
+        words *= _MIX_MULTIPLIER
+        words ^= words >> np.uint64(29)
+
+        text_starts = np.cumsum([0] + [len(text) + 1 for text in encoded[:-1]])
+        return words, np.searchsorted(text_starts, starts, side='right') - 1
+
+    @classmethod
+    def _signatures(cls, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Which texts have words, and the MinHash signatures of those"""
+        words, text_of_word = cls._word_hashes(texts)
+        word_counts = np.bincount(text_of_word, minlength=len(texts))
+        hashed = word_counts > 0
+        signatures = np.empty((int(hashed.sum()), cls.PERMUTATIONS), dtype=np.uint64)
+        if not len(signatures):
+            return hashed, signatures
+
+        # Shingle j covers words j .. j + SHINGLE_WORDS - 1 of the same text;
+        # a text with fewer words is one shingle, padded with zeros
+        span = cls.SHINGLE_WORDS - 1
+        padded_words = np.concatenate((words, np.zeros(span, dtype=np.uint64)))
+        padded_texts = np.concatenate((text_of_word, np.full(span, -1)))
+        shingles = words * cls._SHINGLE_MULTIPLIERS[0]
+        for position in range(1, cls.SHINGLE_WORDS):
+            same_text = padded_texts[position:position + len(words)] == text_of_word
+            shingles += np.where(same_text, padded_words[position:position + len(words)], 0) \
+                * cls._SHINGLE_MULTIPLIERS[position]
+        first_word = np.concatenate(([True], text_of_word[1:] != text_of_word[:-1]))
+        whole = padded_texts[span:span + len(words)] == text_of_word
+        complete = whole | (first_word & (word_counts[text_of_word] <= span))
+        shingles = shingles[complete]
+        shingle_texts = text_of_word[complete]
+        offsets = np.flatnonzero(np.concatenate(([True], shingle_texts[1:] != shingle_texts[:-1])))
+
+        # Multiply-shift hashing, a * x per permutation: the smallest product
+        # also has the smallest top bits, so no shift is needed
+        permuted = np.empty_like(shingles)
+        for permutation, multiplier in enumerate(cls._PERMUTATION_MULTIPLIERS):
+            np.multiply(shingles, multiplier, out=permuted)
+            signatures[:, permutation] = np.minimum.reduceat(permuted, offsets)
+        return hashed, signatures
+
+    @classmethod
+    def _bands(cls, signatures: np.ndarray) -> np.ndarray:
+        """One 64-bit key per band of each signature"""
+        covered = cls.BANDS * cls.ROWS_PER_BAND
+        bands = signatures[:, :covered].astype(np.uint64).reshape(len(signatures), cls.BANDS, cls.ROWS_PER_BAND)
+        keys = np.zeros((len(signatures), cls.BANDS), dtype=np.uint64)
+        for row in range(cls.ROWS_PER_BAND):
+            keys = (keys ^ bands[:, :, row]) * cls._BAND_MULTIPLIER
+        return keys
+
+    def merge(self, other: 'MinHashLSH') -> 'MinHashLSH':
+        """Append another instance's rows (e.g. a later shard)"""
+        self._flush()
+        other._flush()
+        self._signatures.extend(other._signatures)
+        self._hashed.extend(other._hashed)
+        self._arrays = None
+        return self
+
+    def truncate(self, rows: int) -> None:
+        """Keep only the first rows reports"""
+        self._flush()
+        del self._signatures[rows * self.PERMUTATIONS:]
+        del self._hashed[rows:]
+        self._arrays = None
+
+    def _materialise(self) -> Tuple[np.ndarray, np.ndarray]:
+        self._flush()
+        if self._arrays is None:
+            signatures = np.frombuffer(self._signatures, dtype=np.uint16).reshape(-1, self.PERMUTATIONS).copy()
+            self._arrays = (signatures, np.frombuffer(self._hashed, dtype=np.uint8).astype(bool))
+        return self._arrays
+
+    # Clustering -----------------------------------------------------------
+
+    def cluster_labels(self) -> np.ndarray:
+        """Row index of the first report of each report's cluster (its own for unique reports)"""
+        signatures, hashed = self._materialise()
+        labels = np.arange(len(hashed), dtype=np.int64)
+        rows = np.flatnonzero(hashed)
+        keys = self._bands(signatures[rows])
+
+        # Only reports sharing a band with another report can be in a cluster
+        candidate = np.zeros(len(rows), dtype=bool)
+        for band in range(self.BANDS):
+            _, inverse, counts = np.unique(keys[:, band], return_inverse=True, return_counts=True)
+            candidate |= counts[inverse] > 1
+
+        # band key -> representatives (first reports of clusters) with that band
+        buckets = [{} for _ in range(self.BANDS)]
+        required = self.threshold * self.PERMUTATIONS
+        for position in np.flatnonzero(candidate):
+            row = int(rows[position])
+            row_keys = keys[position].tolist()
+            representatives = sorted({
+                representative
+                for band, key in enumerate(row_keys) for representative in buckets[band].get(key, ())
+            })
+            if representatives:
+                matches = np.count_nonzero(signatures[representatives] == signatures[row], axis=1)
+                best = int(np.argmax(matches))  # the earliest of equally similar representatives
+                if matches[best] >= required:
+                    labels[row] = representatives[best]
+                    continue
+            for band, key in enumerate(row_keys):
+                bucket = buckets[band].setdefault(key, [])
+                if len(bucket) < self.BUCKET_REPRESENTATIVES:
+                    bucket.append(row)
+        return labels
+
+    def summary(self, labels: np.ndarray, k: int = 10) -> Dict[str, Any]:
+        """Results section for cluster_labels(): cluster counts, sizes and the k
+        largest, each identified by its first report's row (0-based, in file order)"""
+        _, hashed = self._materialise()
+        sizes = np.bincount(labels, minlength=len(labels))
+        firsts = np.flatnonzero(sizes > 1)
+        cluster_sizes = sizes[firsts]
+        in_clusters = int(cluster_sizes.sum())
+        largest = np.argsort(-cluster_sizes, kind='stable')[:k]
+        size_counts = np.unique(cluster_sizes, return_counts=True)
+        return {
+            'method': {
+                'shingles': f'word {self.SHINGLE_WORDS}-grams',
+                **self.parameters(),
+                'bands': self.BANDS,
+                'rows_per_band': self.ROWS_PER_BAND,
+                'similarity_threshold': self.threshold
+            },
+            'reports_compared': int(hashed.sum()),
+            'clusters': len(firsts),
+            'reports_in_clusters': in_clusters,
+            'duplicate_reports': in_clusters - len(firsts),
+            'duplicate_percentage': (in_clusters - len(firsts)) / len(labels) * 100 if len(labels) else 0,
+            'cluster_sizes': {int(size): int(count) for size, count in zip(*size_counts)},
+            'largest_clusters': [
+                {'first_report': int(firsts[index]), 'size': int(cluster_sizes[index])} for index in largest
+            ]
+        }
+
+    # Persistence ----------------------------------------------------------
+
+    def save(self, path) -> None:
+        """Write the signatures to a .npz file"""
+        signatures, hashed = self._materialise()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp.npz')
+        np.savez(tmp_path, meta=np.array(json.dumps(self.parameters())), signatures=signatures, hashed=hashed)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path, threshold: float = SIMILARITY_THRESHOLD) -> 'MinHashLSH':
+        """Read an instance written by save(); ValueError if it used other settings"""
+        with np.load(path, allow_pickle=False) as data:
+            if json.loads(str(data['meta'])) != cls.parameters():
+                raise ValueError(f"{path} was written with different MinHash settings")
+            index = cls(threshold)
+            index._signatures.frombytes(data['signatures'].astype(np.uint16).tobytes())
+            index._hashed.frombytes(data['hashed'].astype(np.uint8).tobytes())
+        return index
@@ -0,0 +1,288 @@
+"""
+ICD code normalisation, interning and sparse co-occurrence counts
+
+The ``icd`` field of a PARROT report is free text such as
+``"J18.9, R91,  C34.1"``. normalise_icd_codes() turns it into a clean,
+de-duplicated list of upper-case codes. IcdCooccurrence interns the codes
+to integer ids and, in one pass, counts per code, per pair of codes found
+in the same report, and per code x modality/area. Pairs are held
+sparsely (only pairs that actually occur) in sorted numpy arrays
+(SparseCounts), so memory follows the number of distinct pairs, not codes
+squared, at 16 bytes per pair rather than a dict entry. Top-k queries run on a compressed
+sparse row (CSR) matrix built once with numpy, so they cost time
+proportional to a code's row, even for millions of reports.
+"""
+
+import re
+from array import array
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from parrot_cube import Dictionary
+
+# Codes are separated by commas, semicolons, pipes or whitespace; '/' is
+# kept because it is part of ICD-O morphology codes (e.g. 8140/3)
+_SEPARATORS = re.compile(r'[,;|\s]+')
+_STRAY_CHARACTERS = '.-_:'
+
+_LOW_BITS = (1 << 32) - 1
+
+
+def normalise_icd_codes(raw) -> List[str]:
+    """Split an icd field into distinct, upper-case codes in order of appearance"""
+    if not raw:
+        return []
+    if isinstance(raw, (list, tuple)):
+        raw = ','.join(str(value) for value in raw)
+    codes = []
+    for token in _SEPARATORS.split(str(raw).upper()):
+        token = token.strip(_STRAY_CHARACTERS)
+        if token and token not in codes:
+            codes.append(token)
+    return codes
+
+
+def _pack(high_ids: np.ndarray, low_ids: np.ndarray) -> np.ndarray:
+    return (high_ids.astype(np.int64) << 32) | low_ids.astype(np.int64)
+
+
+def _unpack(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    return keys >> 32, keys & _LOW_BITS
+
+
+def _columns(items: List[Tuple[int, int]]) -> Tuple[List[int], List[int]]:
+    """Keys and counts of a state()'s [key, count] list"""
+    return [key for key, _ in items], [count for _, count in items]
+
+
+def _counter_arrays(counter: Counter) -> Tuple[np.ndarray, np.ndarray]:
+    keys = np.fromiter(counter.keys(), dtype=np.int64, count=len(counter))
+    counts = np.fromiter(counter.values(), dtype=np.int64, count=len(counter))
+    return keys, counts
+
+
+class SparseCounts:
+    """Counts per int64 key, held as sorted numpy arrays of keys and counts.
+
+    Keys added one at a time are buffered in a compact array and folded in
+    once the buffer is as long as the arrays (and at least COMPACT_AT), so
+    the amortised cost per key stays low.
+    """
+
+    COMPACT_AT = 1 << 16
+
+    def __init__(self, keys=(), counts=()):
+        self.keys = np.asarray(keys, dtype=np.int64)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self._pending = array('q')
+
+    def add(self, key: int) -> None:
+        """Count key once"""
+        self._pending.append(key)
+        if len(self._pending) >= max(self.COMPACT_AT, len(self.keys)):
+            self._compact()
+
+    def update(self, keys: np.ndarray, counts: np.ndarray) -> None:
+        """Add counts for keys (keys may repeat)"""
+        self._compact(keys, counts)
+
+    def _compact(self, keys: Optional[np.ndarray] = None, counts: Optional[np.ndarray] = None) -> None:
+        pending = np.frombuffer(self._pending, dtype=np.int64) if self._pending else np.zeros(0, np.int64)
+        keys = np.concatenate([self.keys, pending] + ([] if keys is None else [np.asarray(keys, dtype=np.int64)]))
+        counts = np.concatenate([self.counts, np.ones(len(pending), dtype=np.int64)]
+                                + ([] if counts is None else [np.asarray(counts, dtype=np.int64)]))
+        self._pending = array('q')
+        order = np.argsort(keys, kind='stable')
+        keys, counts = keys[order], counts[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.zeros(0, np.int64)
+        self.keys = keys[starts]
+        self.counts = np.add.reduceat(counts, starts) if len(keys) else counts
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Distinct keys (ascending) and their counts"""
+        if self._pending:
+            self._compact()
+        return self.keys, self.counts
+
+    def items(self) -> List[Tuple[int, int]]:
+        keys, counts = self.arrays()
+        return list(zip(keys.tolist(), counts.tolist()))
+
+    def __len__(self):
+        return len(self.arrays()[0])
+
+    def __bool__(self):
+        return bool(self._pending) or len(self.keys) > 0
+
+
+class IcdCooccurrence:
+    """Mergeable ICD code dictionary with sparse co-occurrence counts"""
+
+    DIMENSIONS = ('modality', 'area')
+
+    def __init__(self):
+        self.codes = Dictionary()
+        self.reports_with_codes = 0
+        self.code_counts = Counter()
+        # (smaller id << 32 | larger id) -> reports containing both codes
+        self.pairs = SparseCounts()
+        self.dimension_values = {dimension: Dictionary() for dimension in self.DIMENSIONS}
+        # (code id << 32 | dimension value id) -> reports
+        self.by_dimension = {dimension: SparseCounts() for dimension in self.DIMENSIONS}
+        self._matrix = None
+
+    def add(self, codes: List[str], report: Dict[str, Any]) -> None:
+        """Count one report's normalised codes"""
+        if not codes:
+            return
+        self.reports_with_codes += 1
+        ids = sorted(self.codes.code(code) for code in codes)
+        for position, code_id in enumerate(ids):
+            self.code_counts[code_id] += 1
+            for other_id in ids[position + 1:]:
+                self.pairs.add(code_id << 32 | other_id)
+        for dimension in self.DIMENSIONS:
+            value = report.get(dimension)
+            if value is not None:
+                value_id = self.dimension_values[dimension].code(value)
+                for code_id in ids:
+                    self.by_dimension[dimension].add(code_id << 32 | value_id)
+        self._matrix = None
+
+    def merge(self, other: 'IcdCooccurrence') -> 'IcdCooccurrence':
+        """Fold another instance (e.g. from another shard) in, translating its ids"""
+        code_map = np.array([self.codes.code(code) for code in other.codes.values], dtype=np.int64)
+        self.reports_with_codes += other.reports_with_codes
+        for code_id, count in other.code_counts.items():
+            self.code_counts[int(code_map[code_id])] += count
+
+        if other.pairs:
+            keys, counts = other.pairs.arrays()
+            first, second = _unpack(keys)
+            first, second = code_map[first], code_map[second]
+            self.pairs.update(_pack(np.minimum(first, second), np.maximum(first, second)), counts)
+
+        for dimension in self.DIMENSIONS:
+            if not other.by_dimension[dimension]:
+                continue
+            value_map = np.array([self.dimension_values[dimension].code(value)
+                                  for value in other.dimension_values[dimension].values], dtype=np.int64)
+            keys, counts = other.by_dimension[dimension].arrays()
+            code_ids, value_ids = _unpack(keys)
+            self.by_dimension[dimension].update(_pack(code_map[code_ids], value_map[value_ids]), counts)
+
+        self._matrix = None
+        return self
+
+    # Persistence ----------------------------------------------------------
+
+    def state(self) -> Dict[str, Any]:
+        """JSON-serialisable snapshot"""
+        return {
+            'codes': self.codes.values,
+            'reports_with_codes': self.reports_with_codes,
+            'code_counts': list(self.code_counts.items()),
+            'pairs': list(self.pairs.items()),
+            'dimension_values': {dimension: values.values for dimension, values in self.dimension_values.items()},
+            'by_dimension': {dimension: list(counts.items()) for dimension, counts in self.by_dimension.items()}
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'IcdCooccurrence':
+        """Rebuild an instance from state()"""
+        icd = cls()
+        icd.codes = Dictionary(state['codes'])
+        icd.reports_with_codes = state['reports_with_codes']
+        icd.code_counts.update(dict(state['code_counts']))
+        icd.pairs = SparseCounts(*_columns(state['pairs']))
+        for dimension in cls.DIMENSIONS:
+            icd.dimension_values[dimension] = Dictionary(state['dimension_values'][dimension])
+            icd.by_dimension[dimension] = SparseCounts(*_columns(state['by_dimension'][dimension]))
+        return icd
+
+    # Queries --------------------------------------------------------------
+
+    def matrix(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Symmetric code x code co-occurrence matrix as CSR (indptr, indices, data)"""
+        if self._matrix is None:
+            size = len(self.codes)
+            keys, counts = self.pairs.arrays()
+            first, second = _unpack(keys)
+            rows = np.concatenate([first, second])
+            columns = np.concatenate([second, first])
+            data = np.concatenate([counts, counts])
+            order = np.lexsort((columns, rows))
+            indptr = np.zeros(size + 1, dtype=np.int64)
+            np.cumsum(np.bincount(rows, minlength=size), out=indptr[1:])
+            self._matrix = (indptr, columns[order], data[order])
+        return self._matrix
+
+    def _ranked(self, ids: np.ndarray, counts: np.ndarray, k: int) -> List[Tuple[str, int]]:
+        """Top k (code, count) by count, ties broken by code for stable output"""
+        if len(counts) > k:
+            # Keep everything tied with the k-th count so tie-breaking stays exact
+            threshold = np.partition(counts, len(counts) - k)[len(counts) - k]
+            keep = counts >= threshold
+            ids, counts = ids[keep], counts[keep]
+        ranked = sorted(zip(counts.tolist(), ids.tolist()),
+                        key=lambda item: (-item[0], self.codes.values[item[1]]))
+        return [(self.codes.values[code_id], count) for count, code_id in ranked[:k]]
+
+    def top_codes(self, k: int = 10) -> List[Tuple[str, int]]:
+        """Most frequent codes, by number of reports"""
+        ids, counts = _counter_arrays(self.code_counts)
+        return self._ranked(ids, counts, k)
+
+    def top_cooccurring(self, code: str, k: int = 10) -> List[Tuple[str, int]]:
+        """Codes most often found in the same report as code"""
+        normalised = normalise_icd_codes(code)
+        code_id = self.codes.lookup(normalised[0]) if normalised else None
+        if code_id is None:
+            return []
+        indptr, indices, data = self.matrix()
+        start, end = indptr[code_id], indptr[code_id + 1]
+        return self._ranked(indices[start:end], data[start:end], k)
+
+    def top_pairs(self, k: int = 10) -> List[Tuple[Tuple[str, str], int]]:
+        """Most frequent pairs of codes reported together"""
+        keys, counts = self.pairs.arrays()
+        if len(counts) > k:
+            keep = counts >= np.partition(counts, len(counts) - k)[len(counts) - k]
+            keys, counts = keys[keep], counts[keep]
+        first, second = _unpack(keys)
+        values = self.codes.values
+        ranked = sorted(
+            ((tuple(sorted((values[a], values[b]))), count)
+             for a, b, count in zip(first.tolist(), second.tolist(), counts.tolist())),
+            key=lambda item: (-item[1], item[0])
+        )
+        return ranked[:k]
+
+    def top_for(self, dimension: str, value, k: int = 10) -> List[Tuple[str, int]]:
+        """Most frequent codes among reports with the given modality/area value"""
+        value_id = self.dimension_values[dimension].lookup(value)
+        if value_id is None:
+            return []
+        keys, counts = self.by_dimension[dimension].arrays()
+        code_ids, value_ids = _unpack(keys)
+        selected = value_ids == value_id
+        return self._ranked(code_ids[selected], counts[selected], k)
+
+    def summary(self, k: int = 10) -> Dict[str, Any]:
+        """Results section: dictionary size and top-k tables"""
+        return {
+            'distinct_codes': len(self.codes),
+            'reports_with_codes': self.reports_with_codes,
+            'distinct_pairs': len(self.pairs),
+            'top_codes': [{'code': code, 'reports': count} for code, count in self.top_codes(k)],
+            'top_pairs': [{'codes': list(codes), 'reports': count} for codes, count in self.top_pairs(k)],
+            **{
+                f'top_codes_by_{dimension}': {
+                    value: [{'code': code, 'reports': count} for code, count in self.top_for(dimension, value, 5)]
+                    for value in self.dimension_values[dimension].values
+                }
+                for dimension in self.DIMENSIONS
+            }
+        }
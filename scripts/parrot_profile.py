@@ -0,0 +1,148 @@
+"""
+Per-stage wall time, throughput and memory peaks for analyzer runs
+
+StageProfiler times named stages of a run:
+
+    with profiler.stage('load_data') as stage:
+        ...
+        stage.records = len(reports)
+
+or, for a whole method of an object with a ``profiler`` attribute, with
+the @profiled('stage name') decorator. Steps that cannot be wrapped in a
+block of their own, such as the parts of each iteration of a fused loop,
+are timed by the caller and added with record().
+
+When enabled it also traces Python allocations with tracemalloc and records
+the peak traced memory reached during each stage (nested stages count
+towards their parent too). A disabled profiler costs next to nothing, so
+analysis code can be instrumented unconditionally. Only the current
+process is traced: memory used inside worker processes is not included,
+and tracing itself slows allocation-heavy stages down.
+
+A stage that raises ImportError (an optional output whose package is not
+installed, e.g. Parquet tables without pyarrow) is recorded as skipped,
+with the error's first line as the reason, instead of as work done.
+"""
+
+import sys
+import time
+import platform
+import functools
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+class Stage:
+    """Measurements of one stage"""
+
+    __slots__ = ('name', 'seconds', 'records', 'peak_bytes', 'skipped')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds = 0.0
+        self.records = None
+        self.peak_bytes = 0
+        self.skipped = None
+
+    def result(self) -> Dict[str, Any]:
+        stage = {'stage': self.name, 'seconds': round(self.seconds, 4)}
+        if self.skipped is not None:
+            stage['skipped'] = self.skipped
+        if self.records is not None:
+            stage['records'] = self.records
+            stage['records_per_second'] = round(self.records / self.seconds, 1) if self.seconds else None
+        if self.peak_bytes:
+            stage['peak_memory_mb'] = round(self.peak_bytes / 2 ** 20, 2)
+        return stage
+
+
+class StageProfiler:
+    """Collects Stage measurements; a no-op unless enabled"""
+
+    def __init__(self, enabled: bool = False, trace_memory: bool = True):
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.stages: List[Stage] = []
+        self._stack: List[Stage] = []
+        self._started_tracing = False
+        self._started = time.perf_counter()
+
+    def start(self) -> 'StageProfiler':
+        """Begin timing the run (and tracing memory, if enabled)"""
+        self._started = time.perf_counter()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def stop(self) -> None:
+        """Stop memory tracing started by start()"""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _traced_peak(self) -> int:
+        return tracemalloc.get_traced_memory()[1] if self.trace_memory and tracemalloc.is_tracing() else 0
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Stage]:
+        """Measure the enclosed block as one stage; set ``records`` on the yielded Stage"""
+        stage = Stage(name)
+        if not self.enabled:
+            yield stage
+            return
+        parent = self._stack[-1] if self._stack else None
+        if parent is not None:
+            # Resetting the peak below would lose the parent's peak so far
+            parent.peak_bytes = max(parent.peak_bytes, self._traced_peak())
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self._stack.append(stage)
+        self.stages.append(stage)  # in start order, so a stage precedes those nested in it
+        started = time.perf_counter()
+        try:
+            yield stage
+        except ImportError as e:
+            stage.skipped = str(e).splitlines()[0] if str(e) else type(e).__name__
+            raise
+        finally:
+            stage.seconds = time.perf_counter() - started
+            stage.peak_bytes = max(stage.peak_bytes, self._traced_peak())
+            self._stack.pop()
+            if parent is not None:
+                parent.peak_bytes = max(parent.peak_bytes, stage.peak_bytes)
+
+    def record(self, name: str, seconds: float, records: Optional[int] = None) -> Stage:
+        """Add a stage timed by the caller, e.g. steps interleaved within one
+        loop or summed over worker processes (no memory peak is recorded)"""
+        stage = Stage(name)
+        stage.seconds = seconds
+        stage.records = records
+        if self.enabled:
+            self.stages.append(stage)
+        return stage
+
+    def result(self, **context) -> Optional[Dict[str, Any]]:
+        """Profile section for the results (None when disabled); context is recorded as given"""
+        if not self.enabled:
+            return None
+        return {
+            'total_seconds': round(time.perf_counter() - self._started, 4),
+            'memory_traced': self.trace_memory,
+            'python': platform.python_version(),
+            'platform': sys.platform,
+            **context,
+            'stages': [stage.result() for stage in self.stages]
+        }
+
+
+def profiled(name: str) -> Callable:
+    """Method decorator timing each call as a stage of ``self.profiler``"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.profiler.stage(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,174 @@
+"""
+Typed, memory-mapped decoding of PARROT JSONL files
+
+Each line is decoded into a ParrotReport: a slotted dataclass holding the
+known PARROT fields, which takes a fraction of the memory of a generic
+dict while still behaving as a read-only mapping, so code written against
+decoded dicts keeps working. Files are memory-mapped and split into lines
+without copying them through a text buffer.
+
+orjson is used for decoding when it is installed and the standard library
+json module otherwise.
+"""
+
+import gc
+import os
+import mmap
+import json
+from contextlib import contextmanager
+from operator import attrgetter
+from collections.abc import Mapping
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+# Decoded pages are dropped from the mapping every this many bytes, so a
+# streaming pass does not keep the whole file resident (where supported)
+RELEASE_INTERVAL = 8 << 20
+_MADV_DONTNEED = getattr(mmap, 'MADV_DONTNEED', None)
+
+
+class _Missing:
+    """Marks a known field that was absent from the JSON record"""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return '<missing>'
+
+
+MISSING = _Missing()
+
+
+@dataclass(slots=True, eq=False)
+class ParrotReport(Mapping):
+    """One PARROT report. Absent fields hold MISSING; unknown keys go to ``extra``"""
+
+    no: Any = MISSING
+    language: Any = MISSING
+    modality: Any = MISSING
+    area: Any = MISSING
+    report: Any = MISSING
+    translation: Any = MISSING
+    icd: Any = MISSING
+    contributor_code: Any = MISSING
+    country: Any = MISSING
+    subspecialty: Any = MISSING
+    extra: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ParrotReport':
+        """Build a report from a decoded JSON object (which is consumed)"""
+        if tuple(data) == REPORT_FIELDS:
+            # Fast path for the usual complete record in file order
+            return cls(*data.values())
+        report = cls(*[data.pop(name, MISSING) for name in REPORT_FIELDS])
+        if data:
+            report.extra = data
+        return report
+
+    # Mapping interface, in the order the fields are declared ------------
+
+    def __getitem__(self, key):
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, MISSING) is not MISSING
+
+    def get(self, key, default=None):
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+        elif self.extra is not None:
+            value = self.extra.get(key, MISSING)
+        else:
+            return default
+        return default if value is MISSING else value
+
+    def __iter__(self):
+        return (key for key, _ in self.items())
+
+    def __len__(self):
+        return len(self.items())
+
+    def items(self):
+        items = [(name, value) for name, value in zip(REPORT_FIELDS, _field_values(self))
+                 if value is not MISSING]
+        if self.extra is not None:
+            items.extend(self.extra.items())
+        return items
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the report as a plain dict"""
+        return dict(self.items())
+
+
+REPORT_FIELDS = tuple(field.name for field in fields(ParrotReport) if field.name != 'extra')
+_FIELD_SET = frozenset(REPORT_FIELDS)
+_field_values = attrgetter(*REPORT_FIELDS)
+
+
+def decode_report(line: bytes) -> ParrotReport:
+    """Decode one JSONL line, raising ValueError if it is not a JSON object"""
+    data = _loads(line)
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected a JSON object, got {type(data).__name__}")
+    return ParrotReport.from_dict(data)
+
+
+def iter_records(data_path, start: int = 0,
+                 end: Optional[int] = None) -> Iterator[Tuple[int, Optional[ParrotReport], Optional[str]]]:
+    """Yield (line number, report, error) for each line of a JSONL file.
+
+    ``start``/``end`` restrict decoding to a byte range whose start lies on
+    a line boundary; line numbers count from 1 within that range. Lines
+    that fail to decode are yielded with ``report`` None and the error
+    message, so callers can report them and carry on.
+    """
+    with open(data_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        end = size if end is None else min(end, size)
+        if start >= end:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            mapped.seek(start)
+            position = start
+            released = start - start % mmap.PAGESIZE
+            for line_num, line in enumerate(iter(mapped.readline, b''), 1):
+                try:
+                    yield line_num, decode_report(line), None
+                except ValueError as e:
+                    yield line_num, None, str(e)
+                position += len(line)
+                if position >= end:
+                    break
+                if _MADV_DONTNEED is not None and position - released >= RELEASE_INTERVAL:
+                    # Read-only pages are simply re-read from the page cache if touched again
+                    boundary = position - position % mmap.PAGESIZE
+                    mapped.madvise(_MADV_DONTNEED, released, boundary - released)
+                    released = boundary
+
+
+@contextmanager
+def gc_paused():
+    """Suspend the cyclic garbage collector while bulk-loading reports.
+
+    Reports never form reference cycles, but every slotted instance is
+    tracked by the collector, so keeping hundreds of thousands of them in
+    a list would otherwise trigger ever-longer full collections.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
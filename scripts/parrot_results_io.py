@@ -0,0 +1,276 @@
+"""
+Writing analysis results in several formats, and reading them back lazily
+
+write_results() stores the result tree as
+
+- ``json``: indented JSON, as before (the default)
+- ``compact``: JSON without whitespace
+- ``msgpack``: a msgpack map, when the msgpack package is installed
+
+Each top-level section (dataset_info, structure_analysis, ...) is encoded
+on its own and its byte range recorded in a small sidecar index
+(``parrot_analysis.json`` -> ``parrot_analysis.index.json``), while the
+file itself stays one ordinary JSON document or msgpack map. ResultsReader
+uses the index to memory-map the file and decode only the sections asked
+for, instead of parsing the whole tree to read one number.
+
+write_tables() additionally flattens the per-dimension counts and the
+cross-tabs into long-format Parquet tables (needs pyarrow or fastparquet).
+"""
+
+import json
+import mmap
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+RESULT_FORMATS = ('json', 'compact', 'msgpack')
+
+
+def format_available(fmt: str) -> bool:
+    """Whether the packages needed to write fmt are installed"""
+    return fmt != 'msgpack' or msgpack is not None
+
+# structure_analysis counters flattened into the dimension_counts table
+DIMENSION_SECTIONS = {
+    'languages': 'language',
+    'modalities': 'modality',
+    'anatomical_areas': 'area',
+    'countries': 'country',
+    'subspecialties': 'subspecialty',
+    'icd_codes': 'icd_code',
+    'fields_present': 'field'
+}
+
+
+def index_path(results_path) -> Path:
+    """Sidecar index of a results file (e.g. parrot_analysis.index.json)"""
+    results_path = Path(results_path)
+    return results_path.with_name(f"{results_path.stem}.index.json")
+
+
+def _json_key(key) -> str:
+    # The string json.dump would use for a non-string dict key
+    return key if isinstance(key, str) else json.dumps(key)
+
+
+def json_compatible(value):
+    """Copy of value with the key and container types JSON would produce,
+    so every format decodes to the same tree"""
+    if isinstance(value, dict):
+        return {_json_key(key): json_compatible(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_compatible(item) for item in value]
+    return value
+
+
+def _encoded_sections(results: Dict[str, Any], fmt: str) -> Iterator[Tuple[Optional[str], bytes]]:
+    """Yield (section name or None for framing, bytes) making up the file"""
+    if fmt == 'msgpack':
+        if msgpack is None:
+            raise ImportError("The msgpack format needs the msgpack package (pip install msgpack)")
+        packer = msgpack.Packer()
+        yield None, packer.pack_map_header(len(results))
+        for name, section in results.items():
+            yield None, packer.pack(name)
+            yield name, packer.pack(json_compatible(section))
+        return
+
+    indent = 2 if fmt == 'json' else None
+    separators = (',', ': ') if indent else (',', ':')
+    opening, between, closing = ('{\n  ', ',\n  ', '\n}') if indent else ('{', ',', '}')
+    if not results:
+        yield None, b'{}'
+        return
+    for position, (name, section) in enumerate(results.items()):
+        prefix = opening if position == 0 else between
+        yield None, f"{prefix}{json.dumps(name, ensure_ascii=False)}{separators[1]}".encode('utf-8')
+        text = json.dumps(section, indent=indent, separators=separators, ensure_ascii=False)
+        if indent:
+            # Nest the section one level deeper, exactly as json.dump(results, indent=2) would
+            text = text.replace('\n', '\n  ')
+        yield name, text.encode('utf-8')
+    yield None, closing.encode('utf-8')
+
+
+def write_results(results: Dict[str, Any], output_path, fmt: str = 'json') -> Path:
+    """Write results in the given format, plus the section index used by ResultsReader"""
+    if fmt not in RESULT_FORMATS:
+        raise ValueError(f"Unknown results format: {fmt} (expected one of {', '.join(RESULT_FORMATS)})")
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    sections = {}
+    offset = 0
+    tmp_path = output_path.with_name(output_path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        for name, chunk in _encoded_sections(results, fmt):
+            f.write(chunk)
+            if name is not None:
+                sections[name] = [offset, len(chunk)]
+            offset += len(chunk)
+    tmp_path.replace(output_path)
+
+    # Replaced atomically too, as readers (e.g. the web app) may be watching it
+    index = {'format': fmt, 'size': offset, 'sections': sections}
+    tmp_index = index_path(output_path).with_name(index_path(output_path).name + '.tmp')
+    with open(tmp_index, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+    tmp_index.replace(index_path(output_path))
+    return output_path
+
+
+class ResultsReader:
+    """Read-only, lazily decoded view of a results file.
+
+    With a matching index only the requested sections are decoded, from a
+    memory map of the file. Files without one, or whose index no longer
+    matches them (different size, or a section that fails to decode), are
+    decoded whole on first access instead.
+    """
+
+    def __init__(self, results_path):
+        self.path = Path(results_path)
+        self._file = open(self.path, 'rb')
+        self._stat = self.path.stat()
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self._stat.st_size else b''
+        self.index = self._load_index()
+        self.format = self.index['format'] if self.index else self._sniff_format()
+        self._sections = {}
+        self._whole = None
+
+    def _load_index(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(index_path(self.path), 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if index.get('size') != self._stat.st_size:
+            return None
+        return index
+
+    def _sniff_format(self) -> str:
+        return 'msgpack' if self._map[:1] not in (b'{', b'') else 'json'
+
+    def _decode(self, data: bytes):
+        if self.format == 'msgpack':
+            if msgpack is None:
+                raise ImportError("Reading msgpack results needs the msgpack package (pip install msgpack)")
+            return msgpack.unpackb(data, raw=False, strict_map_key=False)
+        return _json_loads(data)
+
+    def sections(self) -> List[str]:
+        """Names of the top-level sections, in file order"""
+        if self.index:
+            return list(self.index['sections'])
+        return list(self._load_whole())
+
+    def _load_whole(self) -> Dict[str, Any]:
+        if self._whole is None:
+            self._whole = self._decode(self._map[:]) if self._stat.st_size else {}
+        return self._whole
+
+    def section(self, name: str):
+        """Decode and return one top-level section (cached); KeyError if absent"""
+        if name not in self._sections:
+            if self.index:
+                if name not in self.index['sections']:
+                    raise KeyError(name)
+                offset, length = self.index['sections'][name]
+                try:
+                    self._sections[name] = self._decode(self._map[offset:offset + length])
+                except ValueError:
+                    # Stale index of a same-sized file: stop trusting it
+                    self.index = None
+                    self.format = self._sniff_format()
+                    return self.section(name)
+            else:
+                self._sections[name] = self._load_whole()[name]
+        return self._sections[name]
+
+    def section_bytes(self, name: str) -> Optional[bytes]:
+        """Encoded bytes of one section as stored, or None without an index"""
+        if not self.index or name not in self.index['sections']:
+            return None
+        offset, length = self.index['sections'][name]
+        return self._map[offset:offset + length]
+
+    def __getitem__(self, name: str):
+        return self.section(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.sections()
+
+    def close(self) -> None:
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> 'ResultsReader':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def load_section(results_path, name: str):
+    """Read one top-level section of a results file"""
+    with ResultsReader(results_path) as reader:
+        return reader.section(name)
+
+
+# Parquet tables -----------------------------------------------------------
+
+def result_tables(results: Dict[str, Any]) -> Dict[str, pd.DataFrame]:
+    """Long-format tables of the per-dimension counts and cross-tabs"""
+    results = json_compatible(results)
+    structure = results.get('structure_analysis', {})
+    dimension_rows = [
+        (dimension, value, count)
+        for section, dimension in DIMENSION_SECTIONS.items()
+        for value, count in structure.get(section, {}).items()
+    ]
+    cross_tab_rows = [
+        (table, row, column, count)
+        for table, rows in results.get('cross_tabs', {}).items()
+        for row, columns in rows.items()
+        for column, count in columns.items()
+    ]
+    presence_rows = [
+        (category, element, dimension[len('by_'):], value, counts['count'])
+        for category, elements in results.get('xt_ehr_mapping', {}).get('presence_statistics', {}).items()
+        for element, presence in elements.items()
+        for dimension, values in presence.items() if dimension.startswith('by_')
+        for value, counts in values.items()
+    ]
+    return {
+        'dimension_counts': pd.DataFrame(dimension_rows, columns=['dimension', 'value', 'reports']),
+        'cross_tabs': pd.DataFrame(cross_tab_rows, columns=['table', 'row', 'column', 'reports']),
+        'element_presence': pd.DataFrame(presence_rows,
+                                         columns=['category', 'element', 'dimension', 'value', 'reports'])
+    }
+
+
+def write_tables(results: Dict[str, Any], directory) -> List[Path]:
+    """Write result_tables() as <name>.parquet files in directory"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    written = []
+    for name, table in result_tables(results).items():
+        path = directory / f"{name}.parquet"
+        table.to_parquet(path, index=False)
+        written.append(path)
+    return written
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Synthetic PARROT-style JSONL for tests and benchmarks
+
+The real PARROT file cannot be shared, so this writes look-alike reports
+with the same field schema. Field values follow the distributions in an
+existing analysis results file (output/parrot_analysis.json by default):
+
+- language, area, country and subspecialty from their observed counts,
+  modality conditioned on language and area on modality when the results
+  include cross-tabs (independently otherwise)
+- ICD codes drawn from the observed code frequencies
+- report and translation lengths from log-normal distributions matching
+  the observed mean and median
+- each clinical pattern (normal, comparison, contrast, ...) appearing at
+  its observed rate, via short phrases containing the analyzer's terms
+
+A fraction of reports can be near-duplicates of earlier ones, as in
+templated real-world reporting. Output is deterministic for a given seed.
+"""
+
+import json
+import math
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from parrot_records import REPORT_FIELDS
+from parrot_results_io import ResultsReader
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DEFAULT_RESULTS_PATH = Path(__file__).resolve().parent.parent / 'output' / 'parrot_analysis.json'
+
+# Phrases signalling each clinical pattern, in English and Spanish
+PATTERN_PHRASES = {
+    'normal_reports': {
+        'en': ["Otherwise normal examination.", "The remaining structures are unremarkable."],
+        'es': ["Resto del estudio sin particularidades.", "Parénquima conservado."]
+    },
+    'pathological_reports': {
+        'en': ["A focal lesion is identified.", "Abnormal signal in the posterior segment."],
+        'es': ["Se identifica una lesión focal.", "Hallazgo patológico en el segmento posterior."]
+    },
+    'comparison_mentioned': {
+        'en': ["Comparison is made with the prior examination.", "Stable since the previous study."],
+        'es': ["Sin cambios respecto al estudio previo.", "Se realiza comparación con el estudio anterior."]
+    },
+    'contrast_mentioned': {
+        'en': ["Images were acquired after intravenous contrast.", "Gadolinium was administered."],
+        'es': ["Tras la administración de contraste intravenoso.", "Se administra gadolinio."]
+    },
+    'measurements_present': {
+        'en': ["It measures 12 mm in diameter.", "The nodule is 2 cm in size."],
+        'es': ["Tamaño de 2 cm.", "Mide 12 mm de diámetro."]
+    },
+    'recommendations_present': {
+        'en': ["Follow up imaging in six months.", "We recommend correlation with clinical findings."],
+        'es': ["Se recomienda seguimiento.", "Se sugiere correlación clínica."]
+    }
+}
+
+# Neutral sentences (no clinical terms) used to reach the target length
+FILLER_SENTENCES = {
+    'en': [
+        "The study was performed on a standard scanner.",
+        "Soft tissues appear symmetric.",
+        "Bony structures are intact.",
+        "The visualised organs show homogeneous attenuation.",
+        "No free fluid is seen.",
+        "The airways are patent.",
+        "Vascular structures opacify as expected."
+    ],
+    'es': [
+        "El estudio se realizó en un equipo estándar.",
+        "Las partes blandas son simétricas.",
+        "Las estructuras óseas están intactas.",
+        "La densidad de los órganos visualizados es homogénea.",
+        "No se observa líquido libre.",
+        "La vía aérea es permeable."
+    ]
+}
+
+# Report texts kept for near-duplicates
+_RECENT_REPORTS = 64
+
+
+def _distribution(counts: Dict[str, int]):
+    """(values, probabilities) for a {value: count} table"""
+    values = [value for value, count in counts.items() if count > 0 and value not in (None, 'null')]
+    weights = np.array([counts[value] for value in values], dtype=float)
+    return values, weights / weights.sum()
+
+
+def _lognormal_parameters(stats: Optional[Dict[str, Any]], default_median: float):
+    """(mu, sigma) of a log-normal with the given stats' mean and median"""
+    if not stats:
+        return math.log(default_median), 0.6
+    median = max(stats.get('p50', stats.get('median')) or default_median, 1)
+    mean = max(stats.get('mean') or median, median)
+    return math.log(median), math.sqrt(2 * math.log(mean / median)) if mean > median else 0.1
+
+
+class SyntheticProfile:
+    """Distributions that synthetic reports are drawn from"""
+
+    def __init__(self, structure: Dict[str, Any], content: Dict[str, Any],
+                 cross_tabs: Optional[Dict[str, Any]] = None):
+        total = max(structure.get('total_reports', 0), 1)
+        self.languages = _distribution(structure['languages'])
+        self.modalities = _distribution(structure['modalities'])
+        self.areas = _distribution(structure['anatomical_areas'])
+        self.countries = _distribution(structure['countries'])
+        self.subspecialties = _distribution(structure['subspecialties'])
+        self.icd_codes = _distribution(structure['icd_codes'])
+        # Codes per report beyond the first, as a Poisson mean
+        self.extra_codes = max(sum(structure['icd_codes'].values()) / total - 1, 0)
+
+        cross_tabs = cross_tabs or {}
+        self.modality_by_language = {
+            language: _distribution(modalities)
+            for language, modalities in cross_tabs.get('modality_by_language', {}).items()
+        }
+        self.area_by_modality = {
+            modality: _distribution(areas) for modality, areas in cross_tabs.get('area_by_modality', {}).items()
+        }
+
+        patterns = content.get('clinical_patterns', {})
+        self.pattern_rates = {pattern: min(patterns.get(pattern, 0) / total, 1.0) for pattern in PATTERN_PHRASES}
+        self.report_length = _lognormal_parameters(content.get('report_length_stats'), 700)
+        self.translation_length = _lognormal_parameters(content.get('translation_length_stats'), 800)
+
+    @classmethod
+    def from_results(cls, results_path=DEFAULT_RESULTS_PATH) -> 'SyntheticProfile':
+        """Build a profile from an analysis results file"""
+        with ResultsReader(results_path) as results:
+            cross_tabs = results['cross_tabs'] if 'cross_tabs' in results else None
+            return cls(results['structure_analysis'], results['content_analysis'], cross_tabs)
+
+
+class SyntheticReportGenerator:
+    """Draws synthetic reports from a SyntheticProfile"""
+
+    def __init__(self, profile: SyntheticProfile, seed: int = 0, duplicate_rate: float = 0.05):
+        self.profile = profile
+        self.rng = np.random.default_rng(seed)
+        self.duplicate_rate = duplicate_rate
+        self._recent: List[str] = []
+
+    def _choice(self, distribution, size: int) -> List[Any]:
+        values, probabilities = distribution
+        return [values[index] for index in self.rng.choice(len(values), size=size, p=probabilities)]
+
+    def _conditional(self, given: List[Any], conditionals: Dict[Any, Any], fallback) -> List[Any]:
+        """Draw one value per entry of given, from conditionals[given value] when known"""
+        drawn = self._choice(fallback, len(given))
+        given_array = np.array(given, dtype=object)
+        for value, distribution in conditionals.items():
+            rows = np.flatnonzero(given_array == value)
+            if len(rows) and distribution[0]:
+                for row, choice in zip(rows, self._choice(distribution, len(rows))):
+                    drawn[row] = choice
+        return drawn
+
+    def _text(self, language: str, patterns: List[str], target_length: int) -> str:
+        phrases = PATTERN_PHRASES
+        sentences = [phrases[pattern][language][self.rng.integers(len(phrases[pattern][language]))]
+                     for pattern in patterns]
+        fillers = FILLER_SENTENCES[language]
+        length = sum(len(sentence) + 1 for sentence in sentences)
+        for index in self.rng.integers(len(fillers), size=max(target_length // 35, 1)):
+            if length >= target_length:
+                break
+            sentences.append(fillers[index])
+            length += len(fillers[index]) + 1
+        self.rng.shuffle(sentences)
+        return ' '.join(sentences)
+
+    def reports(self, count: int, start: int = 0) -> List[Dict[str, Any]]:
+        """Generate count reports numbered from start"""
+        profile = self.profile
+        rng = self.rng
+        languages = self._choice(profile.languages, count)
+        modalities = self._conditional(languages, profile.modality_by_language, profile.modalities)
+        areas = self._conditional(modalities, profile.area_by_modality, profile.areas)
+        countries = self._choice(profile.countries, count)
+        subspecialties = self._choice(profile.subspecialties, count)
+        report_lengths = rng.lognormal(*profile.report_length, size=count).astype(int)
+        translation_lengths = rng.lognormal(*profile.translation_length, size=count).astype(int)
+        pattern_draws = {pattern: rng.random(count) < rate for pattern, rate in profile.pattern_rates.items()}
+        code_counts = 1 + rng.poisson(profile.extra_codes, size=count)
+        codes = iter(self._choice(profile.icd_codes, int(code_counts.sum())))
+        duplicates = rng.random(count) < self.duplicate_rate
+
+        reports = []
+        for row in range(count):
+            language = 'es' if languages[row] == 'Spanish' else 'en'
+            patterns = [pattern for pattern, drawn in pattern_draws.items() if drawn[row]]
+            if duplicates[row] and self._recent:
+                # Near-duplicate: an earlier report with one sentence added
+                text = self._recent[rng.integers(len(self._recent))]
+                text = f"{text} {FILLER_SENTENCES['en'][rng.integers(len(FILLER_SENTENCES['en']))]}"
+            else:
+                text = self._text(language, patterns, int(report_lengths[row]))
+                if len(self._recent) < _RECENT_REPORTS:
+                    self._recent.append(text)
+                else:
+                    self._recent[rng.integers(_RECENT_REPORTS)] = text
+            country = countries[row]
+            values = (
+                start + row,
+                languages[row],
+                modalities[row],
+                areas[row],
+                text,
+                self._text('en', patterns, int(translation_lengths[row])),
+                ', '.join(next(codes) for _ in range(code_counts[row])),
+                f"{str(country)[:2].upper()}{rng.integers(1, 4)}",
+                country,
+                subspecialties[row]
+            )
+            reports.append(dict(zip(REPORT_FIELDS, values)))
+        return reports
+
+
+def write_synthetic_dataset(output_path, count: int, seed: int = 0, profile: Optional[SyntheticProfile] = None,
+                            duplicate_rate: float = 0.05, chunk_size: int = 50000) -> Path:
+    """Write count synthetic reports as JSONL"""
+    profile = profile or SyntheticProfile.from_results()
+    generator = SyntheticReportGenerator(profile, seed, duplicate_rate)
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(output_path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        for start in range(0, count, chunk_size):
+            lines = [
+                orjson.dumps(report) if orjson is not None
+                else json.dumps(report, ensure_ascii=False).encode('utf-8')
+                for report in generator.reports(min(chunk_size, count - start), start)
+            ]
+            f.write(b'\n'.join(lines) + b'\n')
+    tmp_path.replace(output_path)
+    return output_path
+
+
+def main():
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Generate a synthetic PARROT-style JSONL dataset")
+    parser.add_argument('output', help="JSONL file to write")
+    parser.add_argument('--reports', type=int, default=3000, help="number of reports (default: 3000)")
+    parser.add_argument('--seed', type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument('--results', default=str(DEFAULT_RESULTS_PATH),
+                        help="analysis results to take distributions from (default: output/parrot_analysis.json)")
+    parser.add_argument('--duplicate-rate', type=float, default=0.05,
+                        help="fraction of near-duplicate reports (default: 0.05)")
+    args = parser.parse_args()
+
+    profile = SyntheticProfile.from_results(args.results)
+    path = write_synthetic_dataset(args.output, args.reports, args.seed, profile, args.duplicate_rate)
+    print(f"Wrote {args.reports} synthetic reports to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Shared fixtures: the analysis scripts and the Flask app import their
+sibling modules by name, so both directories go on sys.path
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = Path(__file__).resolve().parent / 'data'
+for directory in ('scripts', 'flask_app'):
+    if str(ROOT / directory) not in sys.path:
+        sys.path.insert(0, str(ROOT / directory))
+
+from analyze_parrot import ParrotAnalyzer  # noqa: E402
+from parrot_synthetic import SyntheticProfile, write_synthetic_dataset  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def synthetic_profile():
+    """Distributions of the committed analysis results (output/parrot_analysis.json)"""
+    return SyntheticProfile.from_results()
+
+
+@pytest.fixture(scope='session')
+def synthetic_dataset(tmp_path_factory, synthetic_profile):
+    """A 3,000-report generated PARROT file, with 5% near-duplicates"""
+    path = tmp_path_factory.mktemp('synthetic') / 'parrot.jsonl'
+    return write_synthetic_dataset(path, 3000, seed=11, profile=synthetic_profile)
+
+
+@pytest.fixture
+def edge_case_dataset():
+    """Reports with explicit nulls, missing and extra keys and empty values"""
+    return DATA_DIR / 'edge_cases.jsonl'
+
+
+# ParrotAnalyzer arguments switching on opt-in analyses
+ANALYZER_OPTIONS = ('cube', 'near_duplicates')
+
+
+@pytest.fixture
+def analyse():
+    """Run the analysis of a file and return its results, minus the source path.
+
+    Options named in ANALYZER_OPTIONS go to ParrotAnalyzer, the rest to
+    run_complete_analysis.
+    """
+    def run(data_path, **options):
+        analyzer_options = {name: options.pop(name) for name in ANALYZER_OPTIONS if name in options}
+        results = ParrotAnalyzer(str(data_path), **analyzer_options).run_complete_analysis(**options)
+        results['dataset_info'].pop('source_file')
+        return results
+    return run
+
+
+@pytest.fixture(scope='session')
+def web_app(tmp_path_factory):
+    """The web app module (flask_app/app.py), imported with a null render cache"""
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv('CACHE_BACKEND', 'null')
+        patch.setenv('JINJA_CACHE_DIR', str(tmp_path_factory.mktemp('jinja')))
+        import app
+    return app
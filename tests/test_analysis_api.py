@@ -0,0 +1,102 @@
+"""Analysis results API (/api/analysis) and its store (flask_app/analysis_store.py)"""
+
+import json
+
+import pytest
+
+from analysis_store import AnalysisStore, ResultsSnapshot
+from parrot_results_io import index_path, write_results
+
+RESULTS = {
+    'dataset_info': {'total_reports': 3},
+    'cross_tabs': {'modality_by_language': {'French': {'CT': 2, 'MR': 1}}},
+    'tags': ['a', 'b']
+}
+
+
+@pytest.fixture
+def api(web_app, tmp_path, monkeypatch):
+    """Test client serving the results file at the returned path, re-checked on every request"""
+    results_path = tmp_path / 'parrot_analysis.json'
+    monkeypatch.setattr(web_app, 'analysis_store', AnalysisStore(results_path, check_interval=0))
+    return web_app.app.test_client(), results_path
+
+
+@pytest.mark.parametrize('indexed', [True, False])
+def test_sections_and_key_paths(api, indexed):
+    client, results_path = api
+    write_results(RESULTS, results_path)
+    if not indexed:
+        index_path(results_path).unlink()
+
+    assert client.get('/api/analysis').get_json()['sections'] == list(RESULTS)
+    response = client.get('/api/analysis/cross_tabs')
+    assert response.status_code == 200
+    assert response.get_json() == RESULTS['cross_tabs']
+    assert client.get('/api/analysis/cross_tabs/modality_by_language/French').get_json() == {'CT': 2, 'MR': 1}
+    assert client.get('/api/analysis/tags/1').get_json() == 'b'
+
+
+def test_unchanged_section_is_not_modified(api):
+    client, results_path = api
+    write_results(RESULTS, results_path)
+    etag = client.get('/api/analysis/cross_tabs').headers['ETag']
+
+    response = client.get('/api/analysis/cross_tabs', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+
+@pytest.mark.parametrize('url', ['/api/analysis/missing', '/api/analysis/cross_tabs/missing',
+                                 '/api/analysis/tags/5'])
+def test_unknown_section_or_key_is_not_found(api, url):
+    client, results_path = api
+    write_results(RESULTS, results_path)
+    assert client.get(url).status_code == 404
+
+
+def test_no_results_file_is_not_found(api):
+    client, _ = api
+    assert client.get('/api/analysis/cross_tabs').status_code == 404
+
+
+def test_replaced_results_are_reloaded(api):
+    client, results_path = api
+    write_results(RESULTS, results_path)
+    tags_etag = client.get('/api/analysis/tags').headers['ETag']
+    info_etag = client.get('/api/analysis/dataset_info').headers['ETag']
+
+    write_results({**RESULTS, 'dataset_info': {'total_reports': 4}}, results_path)
+    response = client.get('/api/analysis/dataset_info', headers={'If-None-Match': info_etag})
+    assert response.status_code == 200
+    assert response.get_json() == {'total_reports': 4}
+    # Sections that did not change keep their ETag across the reload
+    assert client.get('/api/analysis/tags', headers={'If-None-Match': tags_etag}).status_code == 304
+
+
+def test_stale_index_of_same_sized_file_is_ignored(api):
+    client, results_path = api
+    write_results({'a': 'xy', 'b': 'z'}, results_path, 'compact')
+    stale_index = index_path(results_path).read_bytes()
+    write_results({'a': 'x', 'b': 'yz'}, results_path, 'compact')
+    index_path(results_path).write_bytes(stale_index)
+
+    response = client.get('/api/analysis/b')
+    assert response.status_code == 200
+    assert response.get_json() == 'yz'
+
+
+def test_section_failing_to_decode_falls_back_to_whole_file(tmp_path):
+    results_path = tmp_path / 'parrot_analysis.json'
+    write_results({'a': [1, 2], 'b': 3}, results_path, 'compact')
+    # Framed like a section ('"a":' before, ',' after) but not valid JSON
+    index = json.loads(index_path(results_path).read_text())
+    index['sections']['a'] = [index['sections']['a'][0], 2]
+    index_path(results_path).write_text(json.dumps(index))
+
+    snapshot = ResultsSnapshot(results_path, index_path(results_path))
+    assert snapshot.index is not None
+    assert snapshot.section('a') == [1, 2]
+    assert snapshot.index is None
+    assert snapshot.raw_section('b') is None
+    assert snapshot.section('b') == 3
@@ -0,0 +1,65 @@
+"""Distribution charts rendered only when their counts change (scripts/parrot_charts.py)"""
+
+import subprocess
+import sys
+
+import pytest
+
+import parrot_charts
+from parrot_charts import DISTRIBUTION_CHARTS, chart_inputs, render_charts
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+@pytest.fixture
+def results(analyse, edge_case_dataset):
+    """Analysis results with missing (None) modalities and languages among the counts"""
+    return analyse(edge_case_dataset)
+
+
+def test_chart_inputs(results):
+    inputs = chart_inputs(results)
+    assert list(inputs) == list(DISTRIBUTION_CHARTS)
+
+    modalities = inputs['modalities']['bars']
+    assert modalities == sorted(modalities, key=lambda bar: (-bar[1], bar[0]))
+    assert dict(modalities) == {str(key): count for key, count in
+                                results['structure_analysis']['modalities'].items()}
+    total = results['dataset_info']['total_reports']
+    patterns = results['content_analysis']['clinical_patterns']
+    assert inputs['clinical_patterns']['bars'] == [
+        (pattern.replace('_', ' '), round(count / total * 100, 2)) for pattern, count in patterns.items()
+    ]
+    assert list(chart_inputs({**results, 'content_analysis': {}})) == ['modalities', 'languages',
+                                                                       'anatomical_areas']
+
+
+def test_only_changed_charts_are_redrawn(tmp_path, results):
+    first = render_charts(results, tmp_path, workers=2)
+    assert sorted(path.name for path in first['rendered']) == sorted(f"{name}.png" for name in DISTRIBUTION_CHARTS)
+    assert all(path.read_bytes().startswith(PNG_SIGNATURE) for path in first['rendered'])
+
+    again = render_charts(results, tmp_path, workers=1)
+    assert again['rendered'] == [] and len(again['unchanged']) == len(DISTRIBUTION_CHARTS)
+
+    structure = {**results['structure_analysis'], 'modalities': {'CT': 10, 'MR': 1}}
+    (tmp_path / 'languages.png').unlink()
+    changed = render_charts({**results, 'structure_analysis': structure}, tmp_path, workers=1)
+    # New counts, and a missing image, are drawn again
+    assert sorted(path.name for path in changed['rendered']) == ['languages.png', 'modalities.png']
+
+
+def test_missing_matplotlib_only_matters_when_drawing(tmp_path, results, monkeypatch):
+    render_charts(results, tmp_path, workers=1)
+    monkeypatch.setattr(parrot_charts.importlib.util, 'find_spec', lambda name: None)
+
+    assert render_charts(results, tmp_path)['rendered'] == []
+    with pytest.raises(ImportError, match='matplotlib'):
+        render_charts(results, tmp_path / 'new')
+
+
+def test_analyzer_does_not_import_plotting_libraries():
+    code = "import sys, analyze_parrot; print(sorted({'matplotlib', 'seaborn'} & set(sys.modules)))"
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            env={'PYTHONPATH': ':'.join(sys.path)}).stdout
+    assert output.strip() == '[]'
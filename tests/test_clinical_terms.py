@@ -0,0 +1,37 @@
+"""Clinical term matching (ClinicalTermMatcher and the columnar engine's pattern)"""
+
+import pandas as pd
+import pytest
+
+from analyze_parrot import CLINICAL_TERM_MATCHER, ColumnarEngine
+
+CASES = [
+    # Stems match their inflections, in English and Spanish
+    ("Multiple lesions in the liver.", {'pathological_reports'}),
+    ("Recommendation: MRI in 6 months.", {'recommendations_present'}),
+    ("No abnormality detected.", {'pathological_reports'}),
+    ("Findings followed over time.", {'recommendations_present'}),
+    ("Suggested correlation; compared to the earlier study.",
+     {'recommendations_present', 'comparison_mentioned'}),
+    ("Lesiones hepáticas múltiples.", {'pathological_reports'}),
+    ("Hallazgos patológicos. Se recomienda control.", {'pathological_reports', 'recommendations_present'}),
+    ("Sin cambios respecto a estudios previos.", {'comparison_mentioned'}),
+    ("Tras administrar contraste.", {'contrast_mentioned'}),
+    # Terms must start a word
+    ("Subnormally located.", set()),
+    # Units are whole words, but may follow a number
+    ("Nodule of 12mm and 3 cm.", {'measurements_present'}),
+    ("Pressure 120 mmHg; see comment.", set()),
+]
+
+
+@pytest.mark.parametrize('text, expected', CASES)
+def test_matcher_finds_inflected_terms(text, expected):
+    assert CLINICAL_TERM_MATCHER.categories_in(text) == expected
+
+
+def test_columnar_pattern_agrees_with_matcher():
+    engine = ColumnarEngine()
+    masks = engine.term_masks(pd.Series([text for text, _ in CASES]))
+    for (text, _), mask in zip(CASES, masks):
+        assert int(mask) == CLINICAL_TERM_MATCHER.flags_in(text), text
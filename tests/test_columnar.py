@@ -0,0 +1,23 @@
+"""The vectorised pandas engine gives the same results as the per-report path"""
+
+import pytest
+
+
+@pytest.mark.parametrize('near_duplicates', [False, True])
+@pytest.mark.parametrize('dataset', ['edge_case_dataset', 'synthetic_dataset'])
+def test_columnar_matches_per_report_engines(request, analyse, dataset, near_duplicates):
+    data_path = request.getfixturevalue(dataset)
+    columnar = analyse(data_path, streaming=True, columnar=True, near_duplicates=near_duplicates)
+
+    assert columnar == analyse(data_path, near_duplicates=near_duplicates)
+    assert columnar == analyse(data_path, streaming=True, near_duplicates=near_duplicates)
+
+
+def test_columnar_counts_explicit_nulls(analyse, edge_case_dataset):
+    structure = analyse(edge_case_dataset, streaming=True, columnar=True)['structure_analysis']
+
+    # Keys set to null are present; missing keys are not
+    assert structure['fields_present']['language'] == 6
+    assert structure['fields_present']['contributor_code'] == 3
+    assert structure['languages'] == {None: 2, 'Spanish': 2, 'English': 2}
+    assert structure['anatomical_areas'] == {None: 2, 'chest': 2, '': 1, 'brain': 2}
@@ -0,0 +1,177 @@
+"""Metadata cube (scripts/parrot_cube.py) and the opt-in cube of an analysis"""
+
+import json
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from analyze_parrot import CUBE_FLAGS, CrossTabAccumulator, ParrotAnalyzer, ReportAccumulator
+from parrot_cube import ReportCube
+
+FLAGS = ('contrast', 'urgent', 'follow_up')
+
+
+@pytest.fixture
+def reports():
+    """Random (metadata, flags) pairs, with missing values in every dimension"""
+    rng = random.Random(5)
+    choices = {
+        'language': ['English', 'French', 'Spanish', None],
+        'modality': ['CT', 'MR', 'US', None],
+        'area': ['chest', 'head', None]
+    }
+    return [({dimension: rng.choice(values) for dimension, values in choices.items()}, rng.randrange(8))
+            for _ in range(500)]
+
+
+def _cube(reports):
+    cube = ReportCube(('language', 'modality', 'area'), FLAGS)
+    for report, flags in reports:
+        cube.add(report, flags)
+    return cube
+
+
+def _has(flags, name):
+    return bool(flags & (1 << FLAGS.index(name)))
+
+
+def test_count_matches_brute_force(reports):
+    cube = _cube(reports)
+    assert len(cube) == cube.count() == len(reports)
+
+    ct_chest = [flags for report, flags in reports if report['modality'] == 'CT' and report['area'] == 'chest']
+    assert cube.count(where={'modality': 'CT', 'area': 'chest'}) == len(ct_chest)
+    assert cube.count(where={'modality': 'CT', 'area': 'chest'}, flags=['contrast'], exclude_flags=['urgent']) \
+        == sum(_has(flags, 'contrast') and not _has(flags, 'urgent') for flags in ct_chest)
+    assert cube.count(where={'language': [None, 'French']}) \
+        == sum(report['language'] in (None, 'French') for report, _ in reports)
+    assert cube.count(where={'modality': 'PET'}) == 0
+
+    by_language = cube.count('language')
+    assert by_language == Counter(report['language'] for report, _ in reports)
+    assert list(by_language.values()) == sorted(by_language.values(), reverse=True)
+    assert cube.count(('modality', 'urgent')) \
+        == Counter((report['modality'], _has(flags, 'urgent')) for report, flags in reports)
+
+    with pytest.raises(KeyError):
+        cube.count(where={'country': 'FR'})
+    with pytest.raises(KeyError):
+        cube.count(flags=['unknown'])
+
+
+def test_crosstab(reports):
+    table = _cube(reports).crosstab('language', 'modality', flags=['follow_up'])
+    expected = {}
+    for report, flags in reports:
+        if _has(flags, 'follow_up'):
+            row = expected.setdefault(report['language'], {})
+            row[report['modality']] = row.get(report['modality'], 0) + 1
+    assert table == expected
+
+
+def test_merge_and_columns_match_one_cube(reports):
+    whole = _cube(reports)
+    # Each shard codes values in its own first-seen order
+    merged = _cube(reports[:200]).merge(_cube(reports[200:]))
+    assert merged.count(('language', 'modality', 'area', 'contrast')) \
+        == whole.count(('language', 'modality', 'area', 'contrast'))
+    assert (merged.flags == whole.flags).all()
+
+    columns = ReportCube(('language', 'modality', 'area'), FLAGS)
+    languages = ['Spanish', 'French', 'English']
+    codes = np.array([languages.index(report['language']) if report['language'] else -1
+                      for report, _ in reports])
+    columns.add_columns({'language': (codes, languages)}, np.array([flags for _, flags in reports]))
+    assert columns.count('language') == whole.count('language')
+    assert columns.count('modality') == {None: len(reports)}
+
+    with pytest.raises(ValueError):
+        whole.merge(ReportCube(('language',), FLAGS))
+
+    whole.truncate(200)
+    assert whole.count('area') == _cube(reports[:200]).count('area')
+
+
+def test_save_and_load_round_trip(tmp_path, reports):
+    cube = _cube(reports)
+    path = tmp_path / 'cube.npz'
+    cube.save(path)
+    loaded = ReportCube.load(path)
+
+    assert (loaded.dimensions, loaded.flag_names) == (cube.dimensions, cube.flag_names)
+    assert len(loaded) == len(cube)
+    for dimension in cube.dimensions:
+        assert loaded.dictionaries[dimension].values == cube.dictionaries[dimension].values
+        assert (loaded.codes(dimension) == cube.codes(dimension)).all()
+    assert loaded.crosstab('modality', 'area', exclude_flags=['urgent']) \
+        == cube.crosstab('modality', 'area', exclude_flags=['urgent'])
+    # A loaded cube keeps growing like a new one
+    loaded.add({'language': 'German'}, 1)
+    assert loaded.count(where={'language': 'German'}, flags=['contrast']) == 1
+
+
+def _cube_and_cross_tabs(data_path):
+    analyzer = ParrotAnalyzer(str(data_path), cube=True)
+    results = analyzer.run_complete_analysis(streaming=True)
+    return analyzer.cube, results['cross_tabs']
+
+
+def test_cube_is_opt_in(synthetic_dataset):
+    assert ReportAccumulator().cube is None
+    assert ReportAccumulator(near_duplicates=True).cube is not None
+
+    analyzer = ParrotAnalyzer(str(synthetic_dataset))
+    analyzer.run_complete_analysis(streaming=True)
+    assert analyzer.cube is None
+
+
+@pytest.mark.parametrize('dataset', ['edge_case_dataset', 'synthetic_dataset'])
+def test_cross_tabs_match_cube_in_order(request, dataset):
+    cube, cross_tabs = _cube_and_cross_tabs(request.getfixturevalue(dataset))
+
+    expected = {
+        'modality_by_language': cube.crosstab('language', 'modality'),
+        'area_by_modality': cube.crosstab('modality', 'area'),
+        'patterns_by_modality': {
+            modality: {flag: cube.count(where={'modality': modality}, flags=[flag]) for flag in CUBE_FLAGS}
+            for modality in cube.dictionaries['modality'].values
+        }
+    }
+    # Compared as JSON so key order counts too
+    assert json.dumps(cross_tabs) == json.dumps(expected)
+
+
+def test_cross_tabs_survive_merge_and_state(synthetic_dataset):
+    reports = [json.loads(line) for line in synthetic_dataset.read_text(encoding='utf-8').splitlines()]
+    whole, first, second = CrossTabAccumulator(), CrossTabAccumulator(), CrossTabAccumulator()
+    for index, report in enumerate(reports):
+        whole.add(report, index % 7)
+        (first if index < 1000 else second).add(report, index % 7)
+
+    merged = CrossTabAccumulator.from_state(json.loads(json.dumps(first.state()))).merge(second)
+    assert json.dumps(merged.result()) == json.dumps(whole.result())
+
+
+def test_incremental_cube_matches_full_run(tmp_path, capsys, synthetic_dataset):
+    data = synthetic_dataset.read_bytes()
+    data_path, state_path = tmp_path / 'parrot.jsonl', str(tmp_path / 'parrot.state.json')
+    data_path.write_bytes(data[:len(data) // 2])
+    ParrotAnalyzer(str(data_path), cube=True).run_complete_analysis(state_path=state_path)
+    assert ParrotAnalyzer.state_cube_path(state_path).exists()
+
+    data_path.write_bytes(data)
+    analyzer = ParrotAnalyzer(str(data_path), cube=True)
+    analyzer.run_complete_analysis(state_path=state_path)
+    assert "Resuming from saved state" in capsys.readouterr().out
+
+    full, _ = _cube_and_cross_tabs(synthetic_dataset)
+    assert len(analyzer.cube) == len(full)
+    assert (analyzer.cube.flags == full.flags).all()
+    assert analyzer.cube.count('modality') == full.count('modality')
+
+    # A run without the cube resumes too, and drops the cube from the state
+    ParrotAnalyzer(str(data_path)).run_complete_analysis(state_path=state_path)
+    assert "Resuming from saved state" in capsys.readouterr().out
+    assert not ParrotAnalyzer.state_cube_path(state_path).exists()
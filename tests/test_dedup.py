@@ -0,0 +1,54 @@
+"""Near-duplicate clustering (scripts/parrot_dedup.py)"""
+
+import numpy as np
+import pytest
+
+from parrot_dedup import MinHashLSH
+from parrot_synthetic import SyntheticReportGenerator
+
+
+def _cluster(texts):
+    index = MinHashLSH()
+    index.add_many(texts)
+    labels = index.cluster_labels()
+    return labels, index.summary(labels)
+
+
+@pytest.mark.parametrize('duplicate_rate', [0.0, 0.05, 0.2])
+def test_flagged_fraction_matches_generator_duplicate_rate(synthetic_profile, duplicate_rate):
+    reports = SyntheticReportGenerator(synthetic_profile, seed=7, duplicate_rate=duplicate_rate).reports(5000)
+    labels, summary = _cluster([report['report'] for report in reports])
+
+    assert summary['duplicate_reports'] / len(reports) == pytest.approx(duplicate_rate, abs=0.015)
+    # No chaining: no cluster comes close to swallowing the dataset
+    assert np.bincount(labels).max() < 100
+
+
+def test_members_point_to_their_cluster_representative():
+    base = ' '.join(f"finding number {i} of the abdomen is stable" for i in range(20))
+    texts = [base, base + " No change since the prior study.", "completely unrelated text about the chest",
+             base + " Contrast was administered."]
+    labels, summary = _cluster(texts)
+
+    assert labels.tolist() == [0, 0, 2, 0]
+    assert summary['duplicate_reports'] == 2
+
+
+def test_dissimilar_reports_are_not_chained():
+    # Each text shares most shingles with its neighbour but little with texts further along
+    words = [f"w{i}" for i in range(400)]
+    texts = [' '.join(words[start:start + 100]) for start in range(0, 300, 8)]
+    labels, _ = _cluster(texts)
+
+    for row, label in enumerate(labels):
+        # Members are at most one step (8 words of 100) away from their representative
+        assert row - label <= 1
+
+
+def test_near_duplicates_only_when_requested(analyse, edge_case_dataset):
+    assert 'near_duplicates' not in analyse(edge_case_dataset, streaming=True)
+
+    section = analyse(edge_case_dataset, streaming=True, near_duplicates=True)['near_duplicates']
+    # Reports 1 and 7 have the same text
+    assert section['duplicate_reports'] == 1
+    assert section['deduplicated']['total_reports'] == 6
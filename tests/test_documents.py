@@ -0,0 +1,106 @@
+"""Documents served section by section, and section PDF exports (flask_app/app.py)"""
+
+import re
+
+import pytest
+
+DOCUMENT = """Preamble text.
+
+# Title
+
+Intro.
+
+## Methods
+
+Some methods.
+
+```python
+# not a heading
+```
+
+### Details
+
+Detail text.
+
+## Results
+
+First results.
+
+## Results
+
+Repeated heading.
+"""
+
+
+@pytest.fixture
+def client(web_app, tmp_path, monkeypatch):
+    """Test client serving documents from tmp_path, which holds docs/report.md"""
+    (tmp_path / 'docs').mkdir()
+    (tmp_path / 'docs' / 'report.md').write_text(DOCUMENT, encoding='utf-8')
+    monkeypatch.setattr(web_app, 'BASE_DIR', tmp_path)
+    return web_app.app.test_client()
+
+
+def test_split_sections(web_app):
+    _, sections = web_app.renderer.split_sections(DOCUMENT)
+    assert [(section['id'], section['title']) for section in sections] == [
+        ('top', ''), ('title', 'Title'), ('methods', 'Methods'), ('results', 'Results'), ('results_1', 'Results')
+    ]
+    # Level 3 headings and '#' lines in code blocks stay inside their section
+    assert '### Details' in sections[2]['markdown'] and '# not a heading' in sections[2]['markdown']
+    assert ''.join(section['markdown'] for section in sections).replace('\n', '') == DOCUMENT.replace('\n', '')
+
+
+def test_section_anchors_match_full_render(web_app):
+    _, sections = web_app.renderer.split_sections(DOCUMENT)
+    full_ids = re.findall(r'<h\d id="([^"]+)"', web_app.renderer.render_markdown(DOCUMENT))
+    section_ids = [heading_id for section in sections
+                   for heading_id in re.findall(r'<h\d id="([^"]+)"',
+                                                web_app.renderer.render_markdown(section['anchored_markdown']))]
+    assert section_ids == full_ids == ['title', 'methods', 'details', 'results', 'results_1']
+
+
+def test_select_sections(web_app):
+    selected = web_app.renderer.select_sections(DOCUMENT, ['details', 'methods'])
+    assert selected.startswith('## Methods') and selected.rstrip().endswith('Detail text.')
+    assert 'First results' not in selected
+    assert web_app.renderer.select_sections(DOCUMENT, ['results_1']).split('\n')[:3] \
+        == ['## Results', '', 'Repeated heading.']
+    with pytest.raises(KeyError, match='missing'):
+        web_app.renderer.select_sections(DOCUMENT, ['results', 'missing'])
+
+
+def test_sections_api(client):
+    first = client.get('/api/sections/docs/report.md').get_json()
+    assert [section['id'] for section in first['sections']] == ['top', 'title', 'methods', 'results', 'results_1']
+    assert (first['id'], first['next']) == ('top', 'title')
+    assert 'Preamble text.' in first['html']
+
+    last = client.get('/api/sections/docs/report.md?anchor=results_1').get_json()
+    assert 'id="results_1"' in last['html'] and last['next'] is None
+    assert client.get('/api/sections/docs/report.md?anchor=details').status_code == 404
+    assert client.get('/api/sections/docs/missing.md').status_code == 404
+
+
+def test_export_selected_sections(client, web_app, monkeypatch):
+    exported = []
+    build = web_app.renderer.build_document_pdf
+    monkeypatch.setattr(web_app.renderer, 'build_document_pdf',
+                        lambda file_path, content, orientation: exported.append(content)
+                        or build(file_path, content, orientation))
+
+    response = client.get('/export-pdf/docs/report.md?section=results&section=methods')
+    assert response.status_code == 200
+    assert response.data.startswith(b'%PDF')
+    assert 'report_Landscape_results_and_1_more.pdf' in response.headers['Content-Disposition']
+    # Document order, whatever the order of the parameters
+    assert exported[-1] == web_app.renderer.select_sections(DOCUMENT, ['methods', 'results'])
+
+    response = client.post('/export-pdf/docs/report.md', data={'pdf_orientation': 'portrait',
+                                                               'section': 'details'})
+    assert 'report_Portrait_details.pdf' in response.headers['Content-Disposition']
+    assert exported[-1].startswith('### Details') and 'Some methods' not in exported[-1]
+
+    response = client.get('/export-pdf/docs/report.md?section=missing')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Section not found'
@@ -0,0 +1,49 @@
+"""Presence of content-derived and rarely present Xt-EHR elements"""
+
+import json
+
+import pytest
+
+from analyze_parrot import XT_EHR_CONTENT_FLAGS, ParrotAnalyzer
+
+ENGINES = [{}, {'streaming': True}, {'streaming': True, 'columnar': True}]
+
+
+@pytest.mark.parametrize('dataset', ['edge_case_dataset', 'synthetic_dataset'])
+def test_content_derived_elements_match_cube_flags(request, dataset):
+    analyzer = ParrotAnalyzer(str(request.getfixturevalue(dataset)), cube=True)
+    presence = analyzer.run_complete_analysis(streaming=True)['xt_ehr_mapping']['presence_statistics']
+    cube = analyzer.cube
+
+    for element, flags in XT_EHR_CONTENT_FLAGS.items():
+        statistics = presence['content_derived'][element]
+        # Reports with any of the element's flags
+        assert statistics['count'] == len(cube) - cube.count(exclude_flags=flags)
+        for modality, counts in statistics['by_modality'].items():
+            where = {'modality': modality}
+            assert counts['count'] == cube.count(where=where) - cube.count(where=where, exclude_flags=flags)
+
+
+@pytest.mark.parametrize('options', ENGINES)
+def test_rarely_present_elements_count_non_empty_source_fields(analyse, tmp_path, options):
+    reports = [
+        {'no': 1, 'language': 'English', 'modality': 'CT', 'report': 'Normal.', 'status': 'final', 'dose': ''},
+        {'no': 2, 'language': 'English', 'modality': 'MR', 'report': 'Normal.', 'accession': 'A1'},
+        {'no': 3, 'language': 'French', 'modality': 'CT', 'report': 'Normal.', 'status': 'draft',
+         'accession_number': 'A2', 'accession': 'A2'},
+        {'no': 4, 'language': 'French', 'modality': 'CT', 'report': 'Normal.'}
+    ]
+    data_path = tmp_path / 'extended.jsonl'
+    data_path.write_text(''.join(json.dumps(report) + '\n' for report in reports), encoding='utf-8')
+
+    rarely_present = analyse(data_path, **options)['xt_ehr_mapping']['presence_statistics']['rarely_present']
+    assert rarely_present['header.status']['count'] == 2
+    assert rarely_present['header.status']['by_language'] == {
+        'English': {'count': 1, 'percentage': 50.0}, 'French': {'count': 1, 'percentage': 50.0}
+    }
+    # Several source fields of one element count a report once
+    assert rarely_present['header.accessionNumber']['count'] == 2
+    assert rarely_present['header.accessionNumber']['by_modality']['MR'] == {'count': 1, 'percentage': 100.0}
+    # Empty values do not count
+    assert rarely_present['body.exposureInformation']['count'] == 0
+    assert rarely_present['attachments']['percentage'] == 0.0
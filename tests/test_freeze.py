@@ -0,0 +1,106 @@
+"""Static-site freeze command and its manifest (flask_app/app.py)"""
+
+import gzip
+import json
+import re
+
+import pytest
+
+
+@pytest.fixture
+def site(web_app, tmp_path, monkeypatch):
+    """Documents under tmp_path/source, frozen into tmp_path/site"""
+    source = tmp_path / 'source'
+    for name in ('docs', 'analysis'):
+        (source / name).mkdir(parents=True)
+    (source / 'docs' / 'guide.md').write_text("# Guide\n\nFirst version.\n", encoding='utf-8')
+    (source / 'docs' / 'terms.md').write_text("# Terms\n\nGlossary.\n", encoding='utf-8')
+    (source / 'analysis' / 'results.md').write_text("# Results\n\nCounts.\n", encoding='utf-8')
+    monkeypatch.setattr(web_app, 'BASE_DIR', source)
+    monkeypatch.setattr(web_app, 'DOCS_DIR', source / 'docs')
+    monkeypatch.setattr(web_app, 'ANALYSIS_DIR', source / 'analysis')
+    monkeypatch.setattr(web_app.renderer, '_files_cache', (None, []))
+    return source, tmp_path / 'site'
+
+
+@pytest.fixture
+def freeze(web_app, site):
+    """Run `flask freeze` into the site directory and return how many pages it rendered"""
+    runner = web_app.app.test_cli_runner()
+
+    def run(*args):
+        result = runner.invoke(args=['freeze', '--output', str(site[1]), *args])
+        assert result.exit_code == 0, result.output
+        return int(re.search(r'Froze (\d+) page', result.output).group(1))
+    return run
+
+
+def _manifest(output):
+    return json.loads((output / '.freeze-manifest.json').read_text(encoding='utf-8'))
+
+
+def test_first_freeze_writes_every_page_and_manifest(site, freeze):
+    source, output = site
+    assert freeze() == 6
+
+    page = output / 'document' / 'docs' / 'guide.md' / 'index.html'
+    assert b'First version.' in page.read_bytes()
+    assert gzip.decompress((output / 'document' / 'docs' / 'guide.md' / 'index.html.gz').read_bytes()) \
+        == page.read_bytes()
+    for listing in ('index.html', 'collection/index.html'):
+        assert b'docs/guide.md' in (output / listing).read_bytes()
+    listed = json.loads((output / 'api' / 'documents' / 'index.json').read_bytes())
+    assert sorted(document['path'] for document in listed) == ['analysis/results.md', 'docs/guide.md',
+                                                                'docs/terms.md']
+    assert (output / 'static').is_dir()
+
+    manifest = _manifest(output)
+    assert sorted(manifest['documents']) == ['analysis/results.md', 'docs/guide.md', 'docs/terms.md']
+    assert all(len(digest) == 64 for digest in manifest['documents'].values())
+
+
+def test_unchanged_documents_are_not_rendered_again(site, freeze):
+    source, output = site
+    freeze()
+    page = output / 'document' / 'docs' / 'terms.md' / 'index.html'
+    written = page.stat().st_mtime_ns
+    assert freeze() == 0
+    assert page.stat().st_mtime_ns == written
+
+    (source / 'docs' / 'guide.md').write_text("# Guide\n\nSecond version.\n", encoding='utf-8')
+    before = _manifest(output)['documents']
+    assert freeze() == 1
+    assert b'Second version.' in (output / 'document' / 'docs' / 'guide.md' / 'index.html').read_bytes()
+    after = _manifest(output)['documents']
+    assert after['docs/guide.md'] != before['docs/guide.md']
+    assert after['docs/terms.md'] == before['docs/terms.md']
+    assert page.stat().st_mtime_ns == written
+
+
+def test_removed_document_drops_its_page_and_rebuilds_listings(site, freeze):
+    source, output = site
+    freeze()
+    (source / 'docs' / 'terms.md').unlink()
+
+    # The three listing pages, and no document pages
+    assert freeze() == 3
+    assert not (output / 'document' / 'docs' / 'terms.md' / 'index.html').exists()
+    assert not (output / 'document' / 'docs' / 'terms.md' / 'index.html.gz').exists()
+    assert b'docs/terms.md' not in (output / 'index.html').read_bytes()
+    assert 'docs/terms.md' not in _manifest(output)['documents']
+
+
+@pytest.mark.parametrize('invalidate', ['force', 'site_hash', 'corrupt'])
+def test_full_rebuild(site, freeze, invalidate):
+    _, output = site
+    freeze()
+    manifest_path = output / '.freeze-manifest.json'
+    if invalidate == 'force':
+        assert freeze('--force') == 6
+        return
+    if invalidate == 'site_hash':
+        # As after a template or app.py change
+        manifest_path.write_text(json.dumps({**_manifest(output), 'site_hash': 'old'}), encoding='utf-8')
+    else:
+        manifest_path.write_text('{', encoding='utf-8')
+    assert freeze() == 6
@@ -0,0 +1,93 @@
+"""ICD code normalisation and co-occurrence counts (scripts/parrot_icd.py)"""
+
+import json
+import random
+from collections import Counter
+from itertools import combinations
+
+import pytest
+
+from parrot_icd import IcdCooccurrence, SparseCounts, normalise_icd_codes
+
+
+@pytest.fixture
+def reports():
+    """(codes, report) pairs drawn from a small, skewed code list"""
+    rng = random.Random(13)
+    codes = [f"C{number:02d}.{digit}" for number in range(12) for digit in range(3)]
+    weights = [1 / (rank + 1) for rank in range(len(codes))]
+    return [
+        (sorted(set(rng.choices(codes, weights, k=rng.randrange(5)))),
+         {'modality': rng.choice(['CT', 'MR', None]), 'area': rng.choice(['chest', 'head'])})
+        for _ in range(1500)
+    ]
+
+
+def _counted(reports):
+    icd = IcdCooccurrence()
+    for codes, report in reports:
+        icd.add(codes, report)
+    return icd
+
+
+def _decoded(icd):
+    """Counts keyed by codes and values instead of the instance's own ids"""
+    codes = icd.codes.values
+    return {
+        'reports_with_codes': icd.reports_with_codes,
+        'codes': {codes[code_id]: count for code_id, count in icd.code_counts.items()},
+        'pairs': {(codes[key >> 32], codes[key & 0xFFFFFFFF]): count for key, count in icd.pairs.items()},
+        **{
+            dimension: {(codes[key >> 32], icd.dimension_values[dimension].values[key & 0xFFFFFFFF]): count
+                        for key, count in icd.by_dimension[dimension].items()}
+            for dimension in icd.DIMENSIONS
+        }
+    }
+
+
+@pytest.mark.parametrize('raw, expected', [
+    ("J18.9, R91,  c34.1", ['J18.9', 'R91', 'C34.1']),
+    ("J18.9;J18.9 | 8140/3.", ['J18.9', '8140/3']),
+    (['R91', 'r91', ' I10 '], ['R91', 'I10']),
+    ('', []),
+    (None, [])
+])
+def test_normalise_icd_codes(raw, expected):
+    assert normalise_icd_codes(raw) == expected
+
+
+def test_merged_shards_equal_one_pass(monkeypatch, reports):
+    # Small buffers so merges also cover compacted SparseCounts
+    monkeypatch.setattr(SparseCounts, 'COMPACT_AT', 32)
+    whole = _counted(reports)
+
+    merged = IcdCooccurrence()
+    for start in range(0, len(reports), 400):
+        shard = _counted(reports[start:start + 400])
+        merged.merge(IcdCooccurrence.from_state(json.loads(json.dumps(shard.state()))))
+
+    assert _decoded(merged) == _decoded(whole)
+    # Shards merged in order see codes in the same first-seen order as one pass
+    assert json.dumps(merged.summary()) == json.dumps(whole.summary())
+
+
+def test_queries_match_brute_force(reports):
+    icd = _counted(reports)
+    code_counts = Counter(code for codes, _ in reports for code in codes)
+    pair_counts = Counter(pair for codes, _ in reports for pair in combinations(codes, 2))
+
+    ranked_codes = sorted(code_counts.items(), key=lambda item: (-item[1], item[0]))
+    assert icd.top_codes(5) == ranked_codes[:5]
+    assert icd.top_pairs(5) == sorted(pair_counts.items(), key=lambda item: (-item[1], item[0]))[:5]
+
+    code = ranked_codes[0][0]
+    with_code = Counter({other: count for (first, second), count in pair_counts.items()
+                         for other in (first, second) if code in (first, second) and other != code})
+    assert icd.top_cooccurring(code.lower(), 4) \
+        == sorted(with_code.items(), key=lambda item: (-item[1], item[0]))[:4]
+    assert icd.top_cooccurring('Z99.9') == []
+
+    ct_codes = Counter(code for codes, report in reports if report['modality'] == 'CT' for code in codes)
+    assert icd.top_for('modality', 'CT', 3) == sorted(ct_codes.items(), key=lambda item: (-item[1], item[0]))[:3]
+    assert icd.top_for('modality', 'PET') == []
+    assert icd.summary()['reports_with_codes'] == sum(bool(codes) for codes, _ in reports)
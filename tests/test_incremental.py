@@ -0,0 +1,52 @@
+"""Incremental runs over a growing file give the same results as full runs"""
+
+import pytest
+
+
+def _append(path, data: bytes) -> None:
+    with open(path, 'ab') as f:
+        f.write(data)
+
+
+@pytest.mark.parametrize('workers, near_duplicates', [(1, False), (3, False), (1, True)])
+def test_appended_chunks_match_full_analysis(tmp_path, capsys, analyse, synthetic_dataset, workers,
+                                             near_duplicates):
+    data = synthetic_dataset.read_bytes()
+    data_path, state_path = tmp_path / 'parrot.jsonl', str(tmp_path / 'parrot.state.json')
+    # Chunk ends fall mid-line, so each run but the last sees a partial trailing line
+    ends = [len(data) // 3 + 7, len(data) // 2 + 1, 2 * len(data) // 3 + 13, len(data)]
+    assert all(data[end - 1:end] != b'\n' for end in ends[:-1])
+
+    start = 0
+    for run, end in enumerate(ends):
+        _append(data_path, data[start:end])
+        start = end
+        incremental = analyse(data_path, workers=workers, state_path=state_path, near_duplicates=near_duplicates)
+        assert ("Resuming from saved state" in capsys.readouterr().out) == (run > 0)
+        assert incremental == analyse(data_path, streaming=True, near_duplicates=near_duplicates)
+
+
+def test_changed_prefix_reanalyses_everything(tmp_path, analyse, edge_case_dataset):
+    data_path, state_path = tmp_path / 'parrot.jsonl', str(tmp_path / 'parrot.state.json')
+    lines = edge_case_dataset.read_bytes().splitlines(keepends=True)
+    data_path.write_bytes(b''.join(lines[:4]))
+    analyse(data_path, state_path=state_path)
+
+    data_path.write_bytes(b''.join(lines[1:]))
+    assert analyse(data_path, state_path=state_path) == analyse(data_path, streaming=True)
+
+
+def test_state_without_near_duplicates_is_not_resumed_with_them(tmp_path, capsys, analyse, edge_case_dataset):
+    data_path, state_path = tmp_path / 'parrot.jsonl', str(tmp_path / 'parrot.state.json')
+    data_path.write_bytes(edge_case_dataset.read_bytes())
+    analyse(data_path, state_path=state_path)
+    capsys.readouterr()
+
+    results = analyse(data_path, state_path=state_path, near_duplicates=True)
+    assert "Resuming from saved state" not in capsys.readouterr().out
+    assert results == analyse(data_path, streaming=True, near_duplicates=True)
+
+    # A state with the MinHash index also serves runs without near-duplicate detection
+    results = analyse(data_path, state_path=state_path)
+    assert "Resuming from saved state" in capsys.readouterr().out
+    assert results == analyse(data_path, streaming=True)
@@ -0,0 +1,72 @@
+"""Cached document listings: fragments, the document scan and Jinja bytecode (flask_app/app.py)"""
+
+import os
+
+import pytest
+
+
+@pytest.fixture
+def docs_dir(web_app, tmp_path, monkeypatch):
+    """A docs directory with one document, served as the app's only source"""
+    (tmp_path / 'docs').mkdir()
+    (tmp_path / 'docs' / 'guide.md').write_text("# Guide\n", encoding='utf-8')
+    monkeypatch.setattr(web_app, 'BASE_DIR', tmp_path)
+    monkeypatch.setattr(web_app, 'DOCS_DIR', tmp_path / 'docs')
+    monkeypatch.setattr(web_app, 'ANALYSIS_DIR', tmp_path / 'analysis')
+    monkeypatch.setattr(web_app.renderer, '_files_cache', (None, []))
+    return tmp_path / 'docs'
+
+
+def _bump_mtime(directory):
+    """Move a directory's mtime on by a second, as filesystem timestamps can be coarse"""
+    stat = directory.stat()
+    os.utime(directory, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_fragment_rendered_once_per_version(web_app):
+    calls = []
+    template = web_app.app.jinja_env.from_string(
+        "{% cache 'test-fragment', version %}{{ render() }}{% endcache %}"
+    )
+
+    def render(version):
+        return template.render(version=version, render=lambda: calls.append(version) or len(calls))
+
+    assert render(1) == '1'
+    assert render(1) == '1'
+    assert render(2) == '2'
+    # Only the latest version is kept
+    assert render(1) == '3'
+    assert calls == [1, 2, 1]
+
+
+def test_document_scan_reused_until_the_list_changes(web_app, docs_dir, monkeypatch):
+    scans = []
+    scan = web_app.renderer._scan_document_files
+    monkeypatch.setattr(web_app.renderer, '_scan_document_files', lambda: scans.append(1) or scan())
+
+    assert [file['name'] for file in web_app.renderer.get_document_files()] == ['guide']
+    web_app.renderer.get_document_files()
+    assert len(scans) == 1
+
+    (docs_dir / 'terms.md').write_text("# Terms\n", encoding='utf-8')
+    _bump_mtime(docs_dir)
+    assert [file['name'] for file in web_app.renderer.get_document_files()] == ['guide', 'terms']
+    assert len(scans) == 2
+
+
+def test_listing_pages_follow_the_document_list(web_app, docs_dir):
+    client = web_app.app.test_client()
+    for url in ('/', '/collection'):
+        assert b'docs/guide.md' in client.get(url).data
+
+    (docs_dir / 'guide.md').rename(docs_dir / 'handbook.md')
+    _bump_mtime(docs_dir)
+    for url in ('/', '/collection'):
+        page = client.get(url).data
+        assert b'docs/handbook.md' in page and b'docs/guide.md' not in page
+
+
+def test_compiled_templates_cached_on_disk(web_app, docs_dir):
+    web_app.app.test_client().get('/')
+    assert any(path.name.endswith('.cache') for path in web_app.JINJA_CACHE_DIR.iterdir())
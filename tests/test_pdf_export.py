@@ -0,0 +1,167 @@
+"""PDF export of documents (flask_app/app.py)"""
+
+import io
+import re
+import zipfile
+from pathlib import Path
+
+import pytest
+import reportlab.platypus.paragraph as rl_paragraph
+from reportlab.pdfbase import pdfmetrics
+from reportlab.platypus import NextPageTemplate, Paragraph
+
+WIDE_TABLE = """| Element | Description | Cardinality | Type |
+|---|---|---|---|
+| a | b | c | d |
+"""
+
+MIXED_DOCUMENT = f"""# Title
+
+Intro prose.
+
+## Wide
+
+{WIDE_TABLE}
+---
+
+## Narrow
+
+| Element | Note |
+|---|---|
+| a | b |
+
+Closing prose.
+"""
+
+
+def _orientations(pdf_bytes):
+    """'P'/'L' per page; reportlab writes page objects in page order"""
+    boxes = [[float(value) for value in box.split()]
+             for box in re.findall(rb'/MediaBox \[([^\]]*)\]', pdf_bytes)]
+    return ''.join('L' if width > height else 'P' for _, _, width, height in boxes)
+
+
+def test_cached_text_widths_match_reportlab(web_app):
+    for text in ['', 'imaging', 'Résumé des résultats', 'x' * 200]:
+        for font_name in ('Helvetica', 'Helvetica-Bold', 'Times-Roman', 'Courier'):
+            for font_size in (8, 10.5, 24):
+                expected = pdfmetrics.stringWidth(text, font_name, font_size)
+                assert web_app.cached_string_width(text, font_name, font_size) == expected
+                # Served from the cache the second time, still the same
+                assert web_app.cached_string_width(text, font_name, font_size) == expected
+
+
+def test_text_width_patch_only_applies_while_building(web_app, tmp_path):
+    assert rl_paragraph.stringWidth is pdfmetrics.stringWidth
+    with web_app.cached_text_widths():
+        with web_app.cached_text_widths():
+            assert rl_paragraph.stringWidth is web_app.cached_string_width
+        # Still patched while an outer (or concurrent) build is running
+        assert rl_paragraph.stringWidth is web_app.cached_string_width
+    assert rl_paragraph.stringWidth is pdfmetrics.stringWidth
+
+    document = tmp_path / 'document.md'
+    document.write_text("# Title\n\nSome **bold** text.\n", encoding='utf-8')
+    pdf_bytes = web_app.render_document_pdf(document, 'portrait')
+    assert pdf_bytes.startswith(b'%PDF')
+    assert rl_paragraph.stringWidth is pdfmetrics.stringWidth
+
+
+def test_auto_orientation_puts_wide_tables_on_landscape_pages(web_app):
+    pdf_bytes = web_app.renderer.build_document_pdf(Path('report.md'), MIXED_DOCUMENT, 'auto')
+    # The rule and the narrow table stay on the landscape page; the closing
+    # prose goes back to portrait
+    assert _orientations(pdf_bytes) == 'PLP'
+
+
+@pytest.mark.parametrize('orientation', ['portrait', 'landscape'])
+def test_fixed_orientation_applies_to_every_page(web_app, orientation):
+    pdf_bytes = web_app.renderer.build_document_pdf(Path('report.md'), MIXED_DOCUMENT, orientation)
+    assert set(_orientations(pdf_bytes)) == {orientation[0].upper()}
+
+
+def test_heading_moves_to_the_landscape_page_with_its_table(web_app):
+    story = []
+    styles = web_app.getSampleStyleSheet()
+    web_app.renderer.append_markdown_flowables(story, MIXED_DOCUMENT, styles['Heading1'], styles['Heading2'],
+                                               styles['Normal'], 'auto')
+    switches = [(index, flowable.action[1]) for index, flowable in enumerate(story)
+                if isinstance(flowable, NextPageTemplate)]
+    assert [template for _, template in switches] == ['landscape', 'portrait']
+    paragraphs = [flowable.text for flowable in story[switches[0][0]:] if isinstance(flowable, Paragraph)]
+    assert paragraphs[0] == 'Wide'
+
+
+def test_collection_documents_start_on_portrait_pages(web_app, tmp_path, monkeypatch):
+    (tmp_path / 'docs').mkdir()
+    for name in ('first', 'second'):
+        (tmp_path / 'docs' / f'{name}.md').write_text(f"# {name}\n\n{WIDE_TABLE}", encoding='utf-8')
+    monkeypatch.setattr(web_app, 'BASE_DIR', tmp_path)
+
+    pdf_bytes = web_app.renderer.build_collection_pdf(['docs/first.md', 'docs/second.md'], 'auto')
+    # Separator and table of each document, then the closing summary
+    assert _orientations(pdf_bytes) == 'PLPLP'
+
+
+@pytest.fixture
+def documents(web_app, tmp_path, monkeypatch):
+    """Paths of short documents under a temporary BASE_DIR"""
+    (tmp_path / 'docs').mkdir()
+    paths = []
+    for name in ('alpha', 'beta', 'gamma'):
+        (tmp_path / 'docs' / f'{name}.md').write_text(f"# {name}\n\nText of {name}.\n", encoding='utf-8')
+        paths.append(f'docs/{name}.md')
+    monkeypatch.setattr(web_app, 'BASE_DIR', tmp_path)
+    return paths
+
+
+def test_zip_export_holds_one_pdf_per_document(web_app, documents):
+    client = web_app.app.test_client()
+    response = client.post('/export-bulk-pdf', data={
+        'selected_documents': [documents[2], 'docs/missing.md', documents[0]],
+        'pdf_orientation': 'portrait',
+        'output_format': 'zip'
+    })
+    assert response.status_code == 200
+    assert response.mimetype == 'application/zip'
+
+    with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+        # Numbered in selection order, missing documents left out
+        assert sorted(archive.namelist()) == ['01_gamma_Portrait.pdf', '02_alpha_Portrait.pdf']
+        assert archive.testzip() is None
+        assert all(archive.read(name).startswith(b'%PDF') for name in archive.namelist())
+
+    response = client.post('/export-bulk-pdf', data={'selected_documents': ['docs/missing.md'],
+                                                     'output_format': 'zip'})
+    assert response.status_code == 404
+
+
+def test_zip_stream_bounds_documents_in_flight(web_app, documents, monkeypatch):
+    started = []
+    monkeypatch.setattr(web_app, 'render_document_pdf',
+                        lambda file_path, orientation: started.append(file_path.stem) or b'%PDF')
+    chunks = web_app.stream_pdf_zip(documents * 4, 'portrait', workers=2)
+
+    data = next(chunks)
+    # Nothing more is queued until a rendered document has been written out
+    assert len(started) <= 4
+    data += b''.join(chunks)
+    assert len(started) == 12
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert len(archive.namelist()) == 12
+
+
+def test_zip_member_for_a_failed_document(web_app, documents, monkeypatch):
+    render = web_app.render_document_pdf
+
+    def failing_render(file_path, orientation):
+        if file_path.stem == 'beta':
+            raise ValueError("broken table")
+        return render(file_path, orientation)
+    monkeypatch.setattr(web_app, 'render_document_pdf', failing_render)
+
+    data = b''.join(web_app.stream_pdf_zip(documents, 'landscape', workers=2))
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert sorted(archive.namelist()) == ['01_alpha_Landscape.pdf', '02_beta_Landscape.error.txt',
+                                              '03_gamma_Landscape.pdf']
+        assert b'broken table' in archive.read('02_beta_Landscape.error.txt')
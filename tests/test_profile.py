@@ -0,0 +1,61 @@
+"""Stage profiling (scripts/parrot_profile.py)"""
+
+import pytest
+
+from analyze_parrot import PASS_STAGES, ParrotAnalyzer
+from parrot_profile import StageProfiler
+
+
+def test_stages_recorded_in_start_order():
+    profiler = StageProfiler(enabled=True, trace_memory=False).start()
+    with profiler.stage('outer') as stage:
+        stage.records = 10
+        with profiler.stage('inner'):
+            pass
+
+    stages = profiler.result()['stages']
+    assert [stage['stage'] for stage in stages] == ['outer', 'inner']
+    assert stages[0]['records'] == 10
+    assert 'skipped' not in stages[0]
+
+
+def test_missing_optional_dependency_marks_stage_skipped():
+    profiler = StageProfiler(enabled=True, trace_memory=False).start()
+    with pytest.raises(ImportError):
+        with profiler.stage('save_tables'):
+            raise ImportError("Unable to find a usable engine\nTrying pyarrow failed")
+
+    assert profiler.result()['stages'] == [
+        {'stage': 'save_tables', 'seconds': pytest.approx(0, abs=0.1), 'skipped': "Unable to find a usable engine"}
+    ]
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = StageProfiler()
+    with profiler.stage('load_data'):
+        pass
+    assert profiler.result() is None
+
+
+def test_record_adds_caller_timed_stage():
+    profiler = StageProfiler(enabled=True, trace_memory=False).start()
+    profiler.record('analyze_report_content', 1.5, records=3)
+
+    assert profiler.result()['stages'] == [
+        {'stage': 'analyze_report_content', 'seconds': 1.5, 'records': 3, 'records_per_second': 2.0}
+    ]
+
+
+@pytest.mark.parametrize('options', [{'streaming': True}, {'workers': 2}, {}, {'columnar': True}])
+def test_fused_pass_records_its_steps_as_stages(edge_case_dataset, options):
+    profiler = StageProfiler(enabled=True, trace_memory=False).start()
+    ParrotAnalyzer(str(edge_case_dataset), profiler).run_complete_analysis(**options)
+
+    stages = {stage['stage']: stage for stage in profiler.result()['stages']}
+    for name in PASS_STAGES:
+        assert stages[name]['records'] == 7
+    analyzed = stages['analyze_basic_structure']['seconds'] + stages['analyze_report_content']['seconds']
+    if options.get('workers', 1) == 1:
+        # The steps are part of the single pass (or frame analysis) they were
+        # timed in, up to the rounding of each reported time to 0.1 ms
+        assert analyzed <= stages['analyze_reports']['seconds'] + 1e-4
@@ -0,0 +1,87 @@
+"""Typed, memory-mapped decoding of PARROT JSONL (scripts/parrot_records.py)"""
+
+import json
+import os
+
+import pytest
+
+import parrot_records
+from analyze_parrot import ParrotAnalyzer, shard_byte_ranges
+from parrot_records import MISSING, ParrotReport, iter_records
+
+LINES = [
+    b'{"no": 1, "language": "English", "modality": "CT"}\n',
+    b'{"no": 2, "modality": \n',
+    b'[1, 2]\n',
+    b'\n',
+    b'{"no": 5, "area": "chest", "site": "A"}'
+]
+
+
+@pytest.fixture
+def broken_dataset(tmp_path):
+    """Valid reports around a truncated line, a non-object and a blank line, without a final newline"""
+    path = tmp_path / 'broken.jsonl'
+    path.write_bytes(b''.join(LINES))
+    return path
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def decoder(request, monkeypatch):
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+    else:
+        monkeypatch.setattr(parrot_records, '_loads', json.loads)
+    return request.param
+
+
+def test_error_lines_are_yielded_and_skipped(broken_dataset, decoder):
+    records = list(iter_records(broken_dataset))
+    assert [line_num for line_num, _, _ in records] == [1, 2, 3, 4, 5]
+
+    errors = {line_num: error for line_num, report, error in records if report is None}
+    assert sorted(errors) == [2, 3, 4]
+    assert all(errors.values())
+    assert errors[3] == "Expected a JSON object, got list"
+
+    reports = [report for _, report, error in records if error is None]
+    assert [report['no'] for report in reports] == [1, 5]
+    assert reports[1].to_dict() == {'no': 5, 'area': 'chest', 'site': 'A'}
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_analysis_reports_error_lines(capsys, broken_dataset, streaming):
+    results = ParrotAnalyzer(str(broken_dataset)).run_complete_analysis(streaming=streaming)
+    output = capsys.readouterr().out
+    assert [line.split(':')[0] for line in output.splitlines() if line.startswith('Error parsing')] \
+        == ['Error parsing line 2', 'Error parsing line 3', 'Error parsing line 4']
+    assert results['dataset_info']['total_reports'] == 2
+
+
+def test_byte_ranges_cover_the_file_once(synthetic_dataset):
+    whole = [report.to_dict() for _, report, _ in iter_records(synthetic_dataset)]
+    sharded = []
+    for start, end in shard_byte_ranges(synthetic_dataset, 5):
+        records = list(iter_records(synthetic_dataset, start, end))
+        # Line numbers count from 1 within each range
+        assert records[0][0] == 1
+        sharded.extend(report.to_dict() for _, report, _ in records)
+    assert sharded == whole
+
+    size = os.path.getsize(synthetic_dataset)
+    assert list(iter_records(synthetic_dataset, size)) == []
+
+
+def test_report_is_a_read_only_mapping():
+    data = {'modality': 'CT', 'no': 3, 'report': None, 'site': 'A'}
+    report = ParrotReport.from_dict(dict(data))
+
+    assert report.language is MISSING and report.report is None
+    assert report['modality'] == 'CT' and report['site'] == 'A'
+    assert 'report' in report and 'language' not in report
+    assert report.get('language', 'unknown') == 'unknown'
+    with pytest.raises(KeyError):
+        report['language']
+    # Known fields first, in declaration order, then unknown keys
+    assert list(report) == ['no', 'modality', 'report', 'site']
+    assert report.to_dict() == data and len(report) == 4
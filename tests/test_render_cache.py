@@ -0,0 +1,209 @@
+"""Render cache backends (flask_app/render_cache.py)"""
+
+import socketserver
+import threading
+import time
+
+import pytest
+
+from render_cache import FileSystemCache, RedisCache
+
+
+class RespStandIn(socketserver.ThreadingTCPServer):
+    """In-process server for the subset of the Redis protocol RedisCache uses.
+
+    EVAL runs Python equivalents of RedisCache's Lua scripts, as one
+    command, so they are atomic here just as on a real server.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), RespHandler)
+        self.lock = threading.Lock()
+        self.strings = {}  # key -> (value, expiry or None)
+        self.hashes = {}
+        self.sorted_sets = {}
+
+    def get(self, key):
+        value, expires = self.strings.get(key, (None, None))
+        if expires is not None and expires < time.time():
+            del self.strings[key]
+            return None
+        return value
+
+    def execute(self, command, *args):
+        command = command.upper()
+        if command in ('AUTH', 'SELECT'):
+            return 'OK'
+        if command == 'GET':
+            return self.get(args[0])
+        if command == 'SET':
+            expires = time.time() + int(args[3]) / 1000 if len(args) > 3 and args[2].upper() == b'PX' else None
+            self.strings[args[0]] = (args[1], expires)
+            return 'OK'
+        if command == 'DEL':
+            return int(self.strings.pop(args[0], None) is not None)
+        if command in ('INCR', 'INCRBY'):
+            value = int(self.get(args[0]) or 0) + (int(args[1]) if command == 'INCRBY' else 1)
+            self.strings[args[0]] = (str(value).encode(), None)
+            return value
+        if command == 'HGET':
+            return self.hashes.get(args[0], {}).get(args[1])
+        if command == 'HSET':
+            self.hashes.setdefault(args[0], {})[args[1]] = args[2]
+            return 1
+        if command == 'HDEL':
+            return int(self.hashes.get(args[0], {}).pop(args[1], None) is not None)
+        if command == 'ZADD':
+            self.sorted_sets.setdefault(args[0], {})[args[2]] = float(args[1])
+            return 1
+        if command == 'ZREM':
+            return int(self.sorted_sets.get(args[0], {}).pop(args[1], None) is not None)
+        if command == 'ZRANGE':
+            members = sorted(self.sorted_sets.get(args[0], {}).items(), key=lambda item: item[1])
+            return [member for member, _ in members[int(args[1]):int(args[2]) + 1]]
+        if command == 'EVAL':
+            keys, argv = args[2:2 + int(args[1])], args[2 + int(args[1]):]
+            return self.scripts[args[0].decode()](self, *keys, *argv)
+        raise ValueError(f"unsupported command {command}")
+
+    def set_script(self, entry, index, sizes, total, value, ttl, written):
+        previous = int(self.execute('HGET', sizes, entry) or 0)
+        self.execute('SET', entry, value, *((b'PX', ttl) if int(ttl) else ()))
+        self.execute('ZADD', index, written, entry)
+        self.execute('HSET', sizes, entry, str(len(value)).encode())
+        return self.execute('INCRBY', total, len(value) - previous)
+
+    def forget_script(self, entry, index, sizes, total):
+        size = int(self.execute('HGET', sizes, entry) or 0)
+        self.execute('DEL', entry)
+        self.execute('ZREM', index, entry)
+        self.execute('HDEL', sizes, entry)
+        return self.execute('INCRBY', total, -size)
+
+    scripts = {RedisCache.SET_SCRIPT: set_script, RedisCache.FORGET_SCRIPT: forget_script}
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(length + 2)[:-2])
+            with self.server.lock:
+                reply = self.server.execute(args[0].decode(), *args[1:])
+            self.wfile.write(self.encode(reply))
+
+    @classmethod
+    def encode(cls, reply):
+        if reply is None:
+            return b'$-1\r\n'
+        if isinstance(reply, int):
+            return b':%d\r\n' % reply
+        if isinstance(reply, str):
+            return f'+{reply}\r\n'.encode()
+        if isinstance(reply, list):
+            return b'*%d\r\n' % len(reply) + b''.join(cls.encode(item) for item in reply)
+        return b'$%d\r\n' % len(reply) + reply + b'\r\n'
+
+
+@pytest.fixture
+def redis_url():
+    server = RespStandIn()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"redis://127.0.0.1:{server.server_address[1]}/1"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=['filesystem', 'redis'])
+def cache(request, tmp_path):
+    if request.param == 'filesystem':
+        return FileSystemCache(tmp_path, max_bytes=10_000)
+    return RedisCache(request.getfixturevalue('redis_url'), max_bytes=10_000)
+
+
+def test_round_trip_and_hit_counts(cache):
+    key = cache.make_key('document', 'abc')
+    assert cache.get(key) is None
+    assert cache.get_or_set(key, lambda: 'rendered') == b'rendered'
+    assert cache.get(key) == b'rendered'
+
+    cache.delete(key)
+    assert cache.get(key) is None
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (1, 3)
+
+
+def test_expired_entries_are_misses(cache):
+    cache.set('short', b'x', ttl=0.05)
+    time.sleep(0.1)
+    assert cache.get('short') is None
+
+
+def test_oldest_entries_evicted_over_max_bytes(cache):
+    for index in range(30):
+        cache.set(f"entry-{index}", bytes(1000))
+
+    assert cache.get('entry-0') is None
+    assert cache.get('entry-29') == bytes(1000)
+
+
+def test_redis_counters_are_shared(redis_url):
+    first, second = RedisCache(redis_url), RedisCache(redis_url)
+    first.set('key', b'value')
+    assert second.get('key') == b'value'
+    assert second.get('other') is None
+    assert first.stats()['shared']['hits'] == 1
+    assert first.stats()['shared']['misses'] == 1
+
+
+@pytest.mark.parametrize('contents', [b'', b'12.5', b'not a timestamp\x00\x01 body'])
+def test_corrupt_file_is_a_miss_and_removed(tmp_path, contents):
+    cache = FileSystemCache(tmp_path)
+    cache.set('key', b'value')
+    path = cache._path('key')
+    path.write_bytes(contents)
+
+    assert cache.get('key') is None
+    assert not path.exists()
+
+
+def test_directory_scanned_every_interval_writes(tmp_path, monkeypatch):
+    cache = FileSystemCache(tmp_path)
+    scans = []
+    evict = cache._evict
+    monkeypatch.setattr(cache, '_evict', lambda: scans.append(1) or evict())
+
+    for index in range(2 * FileSystemCache.EVICT_INTERVAL + 1):
+        cache.set(f"entry-{index}", b'value')
+    # The first write scans to learn the directory size, then every interval
+    assert len(scans) == 3
+
+
+def test_redis_byte_total_matches_entries_under_concurrency(redis_url):
+    def churn(worker):
+        cache = RedisCache(redis_url, max_bytes=20_000)
+        for index in range(60):
+            key = f"entry-{index % 12}"
+            if index % 5 == worker % 5:
+                cache.delete(key)
+            else:
+                cache.set(key, bytes(100 * (worker + 1) + index))
+
+    threads = [threading.Thread(target=churn, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    cache = RedisCache(redis_url)
+    sizes = sum(len(cache._get(f"entry-{index}") or b'') for index in range(12))
+    assert cache.stats()['shared']['bytes'] == sizes
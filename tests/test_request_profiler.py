@@ -0,0 +1,60 @@
+"""Per-request profiling (flask_app/request_profiler.py)"""
+
+import threading
+
+import pytest
+from flask import Flask
+
+from request_profiler import RequestProfiler
+
+
+def _sampler_threads():
+    return [thread for thread in threading.enumerate() if thread.name == 'request-profiler']
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.config.update(REQUEST_PROFILING=True)
+    RequestProfiler(app)
+
+    @app.route('/ok')
+    def ok():
+        return 'ok'
+
+    @app.route('/fail')
+    def fail():
+        raise RuntimeError('view failed')
+
+    return app.test_client()
+
+
+@pytest.mark.parametrize('mode, extension', [('stacks', 'collapsed'), ('cprofile', 'prof')])
+def test_profile_replaces_response(client, mode, extension):
+    response = client.get('/ok', headers={'X-Profile': mode})
+
+    assert response.status_code == 200
+    assert response.headers['X-Profile-Status'] == '200'
+    assert response.headers['Content-Disposition'].endswith(f'.{extension}')
+    assert not _sampler_threads()
+
+
+def test_unprofiled_request_untouched(client):
+    response = client.get('/ok')
+    assert response.data == b'ok'
+    assert 'X-Profile-Status' not in response.headers
+
+
+def test_error_response_profiled(client):
+    client.application.config['PROPAGATE_EXCEPTIONS'] = False
+    response = client.get('/fail?_profile=stacks')
+
+    assert response.headers['X-Profile-Status'] == '500'
+    assert not _sampler_threads()
+
+
+def test_sampler_stopped_when_exception_propagates(client):
+    client.application.testing = True
+    with pytest.raises(RuntimeError):
+        client.get('/fail?_profile=stacks')
+    assert not _sampler_threads()
@@ -0,0 +1,75 @@
+"""Results formats and the lazy section reader (scripts/parrot_results_io.py)"""
+
+import json
+
+import pytest
+
+from parrot_results_io import (RESULT_FORMATS, ResultsReader, format_available, index_path,
+                               json_compatible, load_section, result_tables, write_results, write_tables)
+
+
+@pytest.fixture
+def results(analyse, edge_case_dataset):
+    """Analysis results with None keys (missing languages and modalities) in the cross-tabs"""
+    return analyse(edge_case_dataset)
+
+
+@pytest.mark.parametrize('fmt', RESULT_FORMATS)
+def test_round_trip(tmp_path, results, fmt):
+    if not format_available(fmt):
+        pytest.skip(f"{fmt} needs a package that is not installed")
+    path = write_results(results, tmp_path / 'parrot_analysis.json', fmt)
+    expected = json_compatible(results)
+
+    with ResultsReader(path) as reader:
+        assert reader.index['format'] == fmt
+        assert reader.sections() == list(results)
+        for name in results:
+            assert reader[name] == expected[name]
+    assert load_section(path, 'cross_tabs') == expected['cross_tabs']
+
+    # Without the index the whole file is decoded, to the same tree
+    index_path(path).unlink()
+    with ResultsReader(path) as reader:
+        assert reader.index is None
+        assert {name: reader[name] for name in reader.sections()} == expected
+
+
+@pytest.mark.parametrize('fmt, indent', [('json', 2), ('compact', None)])
+def test_json_formats_are_plain_json(tmp_path, results, fmt, indent):
+    path = write_results(results, tmp_path / 'parrot_analysis.json', fmt)
+    separators = None if indent else (',', ':')
+    assert path.read_text(encoding='utf-8') == json.dumps(results, indent=indent, separators=separators,
+                                                          ensure_ascii=False)
+
+
+def test_unknown_format_is_rejected(tmp_path, results):
+    with pytest.raises(ValueError):
+        write_results(results, tmp_path / 'parrot_analysis.json', 'yaml')
+
+
+def test_result_tables(results):
+    tables = result_tables(results)
+    structure = json_compatible(results['structure_analysis'])
+
+    modalities = tables['dimension_counts'].query("dimension == 'modality'")
+    assert dict(zip(modalities['value'], modalities['reports'])) == structure['modalities']
+
+    cross_tabs = tables['cross_tabs']
+    by_language = cross_tabs[cross_tabs['table'] == 'modality_by_language']
+    assert by_language['reports'].sum() == results['dataset_info']['total_reports']
+    assert set(by_language['row']) == {'null', 'Spanish', 'English'}
+
+    presence = tables['element_presence']
+    element = 'body.examinationReport.resultData.resultText'
+    by_modality = presence[(presence['element'] == element) & (presence['dimension'] == 'modality')]
+    # Reports with the element, per modality, sum to its overall count
+    expected = results['xt_ehr_mapping']['presence_statistics']['content_derived'][element]['count']
+    assert by_modality['reports'].sum() == expected
+
+
+def test_write_tables(tmp_path, results):
+    pytest.importorskip('pyarrow')
+    paths = write_tables(results, tmp_path / 'tables')
+    assert sorted(path.name for path in paths) == ['cross_tabs.parquet', 'dimension_counts.parquet',
+                                                   'element_presence.parquet']
@@ -0,0 +1,68 @@
+"""Quantile sketch of report lengths (scripts/parrot_sketch.py)"""
+
+import json
+
+import numpy as np
+import pytest
+
+from parrot_sketch import QuantileSketch
+
+
+@pytest.fixture
+def lengths():
+    """Skewed integer lengths like report texts, with some empty ones"""
+    rng = np.random.default_rng(7)
+    values = rng.lognormal(7, 1, 20_000).astype(np.int64)
+    values[::97] = 0
+    return values
+
+
+def test_merged_shards_equal_one_sketch(lengths):
+    whole = QuantileSketch()
+    whole.add_many(lengths)
+
+    merged = QuantileSketch()
+    for shard in np.array_split(lengths, 7):
+        sketch = QuantileSketch()
+        sketch.add_many(shard)
+        # Shards travel between processes and runs as JSON state
+        merged.merge(QuantileSketch.from_state(json.loads(json.dumps(sketch.state()))))
+    assert merged.state() == whole.state()
+    assert merged.summary() == whole.summary()
+
+
+def test_add_matches_add_many(lengths):
+    one_by_one, at_once = QuantileSketch(), QuantileSketch()
+    for value in lengths[:2000].tolist():
+        one_by_one.add(value)
+    at_once.add_many(lengths[:2000])
+    assert one_by_one.state() == at_once.state()
+
+
+def test_quantiles_within_relative_accuracy(lengths):
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    sketch.add_many(lengths)
+    ordered = np.sort(lengths)
+
+    for q in (0.01, 0.25, 0.5, 0.9, 0.99):
+        exact = ordered[int(q * (len(ordered) - 1))]
+        assert abs(sketch.quantile(q) - exact) <= 0.01 * exact
+    assert (sketch.quantile(0), sketch.quantile(1)) == (ordered[0], ordered[-1])
+
+    summary = sketch.summary()
+    assert (summary['count'], summary['min'], summary['max']) == (len(lengths), 0, ordered[-1])
+    assert summary['mean'] == pytest.approx(lengths.mean())
+
+
+def test_empty_and_invalid():
+    sketch = QuantileSketch()
+    assert sketch.quantile(0.5) is None and sketch.summary() is None
+    sketch.merge(QuantileSketch())
+    assert sketch.count == 0 and sketch.min is None
+
+    with pytest.raises(ValueError):
+        sketch.add(-1)
+    with pytest.raises(ValueError):
+        sketch.add_many([3, -1])
+    with pytest.raises(ValueError):
+        sketch.merge(QuantileSketch(relative_accuracy=0.01))
@@ -0,0 +1,61 @@
+"""The default streaming pass holds only bounded counters and sketches"""
+
+import os
+import random
+from collections import Counter
+
+import numpy as np
+
+import parrot_records
+from analyze_parrot import analyze_shard
+from parrot_icd import SparseCounts
+from parrot_records import iter_records
+
+
+def _sizes(state):
+    """Lengths of every container in a state, recursively"""
+    if isinstance(state, dict):
+        return {key: _sizes(value) for key, value in state.items()}
+    if isinstance(state, list):
+        return [len(state)] + [_sizes(item) for item in state if isinstance(item, (dict, list))]
+    return None
+
+
+def test_state_does_not_grow_with_repeated_reports(tmp_path, synthetic_dataset):
+    repeated = tmp_path / 'repeated.jsonl'
+    repeated.write_bytes(synthetic_dataset.read_bytes() * 3)
+
+    once, _, _, _ = analyze_shard(synthetic_dataset, 0, os.path.getsize(synthetic_dataset))
+    thrice, _, _, _ = analyze_shard(repeated, 0, os.path.getsize(repeated))
+    assert thrice.structure.total_reports == 3 * once.structure.total_reports
+    assert once.cube is None and once.near_duplicates is None
+
+    once_sizes, thrice_sizes = _sizes(once.state()), _sizes(thrice.state())
+    # Quantile sketches may compact differently; everything else is identical in size
+    for state in (once_sizes, thrice_sizes):
+        del state['content']['report_lengths'], state['content']['translation_lengths']
+        del state['content']['report_lengths_by']
+    assert thrice_sizes == once_sizes
+
+
+def test_records_unchanged_when_pages_are_released(monkeypatch, synthetic_dataset):
+    expected = [report for _, report, _ in iter_records(synthetic_dataset)]
+    monkeypatch.setattr(parrot_records, 'RELEASE_INTERVAL', 4096)
+    assert [report for _, report, _ in iter_records(synthetic_dataset)] == expected
+
+
+def test_sparse_counts_match_counter(monkeypatch):
+    monkeypatch.setattr(SparseCounts, 'COMPACT_AT', 64)
+    rng = random.Random(3)
+    counts, expected = SparseCounts(), Counter()
+    for _ in range(2000):
+        key = rng.randrange(300) << 32 | rng.randrange(5)
+        counts.add(key)
+        expected[key] += 1
+    extra = np.array([5, 5, 1 << 40], dtype=np.int64)
+    counts.update(extra, np.array([2, 3, 1]))
+    expected.update({5: 5, 1 << 40: 1})
+
+    assert dict(counts.items()) == expected
+    assert len(counts) == len(expected)
+    assert list(counts.arrays()[0]) == sorted(expected)
@@ -0,0 +1,70 @@
+"""Synthetic PARROT data (scripts/parrot_synthetic.py) and the benchmark driver (scripts/benchmark_parrot.py)"""
+
+import json
+
+import pytest
+
+import benchmark_parrot
+from parrot_records import REPORT_FIELDS
+from parrot_synthetic import SyntheticReportGenerator, write_synthetic_dataset
+
+
+def test_output_is_deterministic_per_seed(tmp_path, synthetic_profile):
+    first = write_synthetic_dataset(tmp_path / 'first.jsonl', 500, seed=3, profile=synthetic_profile)
+    again = write_synthetic_dataset(tmp_path / 'again.jsonl', 500, seed=3, profile=synthetic_profile)
+    other = write_synthetic_dataset(tmp_path / 'other.jsonl', 500, seed=4, profile=synthetic_profile)
+    assert first.read_bytes() == again.read_bytes()
+    assert first.read_bytes() != other.read_bytes()
+
+
+def test_reports_follow_the_schema(tmp_path, synthetic_profile):
+    path = write_synthetic_dataset(tmp_path / 'parrot.jsonl', 250, profile=synthetic_profile, chunk_size=100)
+    reports = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    # Numbered continuously across chunks, with every field in file order
+    assert [report['no'] for report in reports] == list(range(250))
+    assert all(tuple(report) == REPORT_FIELDS for report in reports)
+    assert all(report['report'] and report['icd'] for report in reports)
+
+
+def test_distributions_follow_the_profile(analyse, synthetic_dataset, synthetic_profile):
+    results = analyse(synthetic_dataset, streaming=True)
+    total = results['dataset_info']['total_reports']
+    assert total == 3000
+
+    languages, probabilities = synthetic_profile.languages
+    observed = results['structure_analysis']['languages']
+    for language, probability in zip(languages, probabilities):
+        assert observed.get(language, 0) / total == pytest.approx(probability, abs=0.03)
+
+    patterns = results['content_analysis']['clinical_patterns']
+    for pattern, rate in synthetic_profile.pattern_rates.items():
+        # Near-duplicates repeat earlier reports' patterns, so rates only match roughly
+        assert patterns[pattern] / total == pytest.approx(rate, abs=0.04)
+
+
+def _extended_reports(synthetic_profile, duplicate_rate):
+    """How many of 400 generated reports are an earlier report plus a sentence"""
+    reports = SyntheticReportGenerator(synthetic_profile, seed=1, duplicate_rate=duplicate_rate).reports(400)
+    texts = [report['report'] for report in reports]
+    return sum(any(text.startswith(earlier + ' ') for earlier in texts[:index])
+               for index, text in enumerate(texts))
+
+
+def test_near_duplicates_extend_earlier_reports(synthetic_profile):
+    assert 150 <= _extended_reports(synthetic_profile, 0.5) <= 250
+    assert _extended_reports(synthetic_profile, 0) == 0
+
+
+def test_benchmark_run(tmp_path):
+    data_path = benchmark_parrot.ensure_dataset(tmp_path, 300, 0, str(benchmark_parrot.DEFAULT_RESULTS_PATH))
+    generated = data_path.stat().st_mtime_ns
+    # Cached for the next run
+    assert benchmark_parrot.ensure_dataset(tmp_path, 300, 0, '') == data_path
+    assert data_path.stat().st_mtime_ns == generated
+
+    run = benchmark_parrot.benchmark(data_path, tmp_path, 'streaming', 1, trace_memory=False)
+    assert run['reports'] == 300 and run['seconds'] > 0
+    stages = [stage['stage'] for stage in run['stages']]
+    assert 'analyze_reports' in stages and 'save_results' in stages
+    assert all('peak_memory_mb' not in stage for stage in run['stages'])
+    assert str(300) in benchmark_parrot.format_table([run]).splitlines()[1]
@@ -0,0 +1,17 @@
+"""Sharding the analysis across worker processes gives the same results"""
+
+import pytest
+
+
+@pytest.mark.parametrize('workers', [2, 3, 8])
+def test_sharded_results_match_single_process(analyse, synthetic_dataset, workers):
+    assert analyse(synthetic_dataset, workers=workers) == analyse(synthetic_dataset, streaming=True)
+
+
+def test_sharded_near_duplicates_match_single_process(analyse, synthetic_dataset):
+    sharded = analyse(synthetic_dataset, workers=3, near_duplicates=True)
+    assert sharded == analyse(synthetic_dataset, streaming=True, near_duplicates=True)
+
+
+def test_more_workers_than_reports(analyse, edge_case_dataset):
+    assert analyse(edge_case_dataset, workers=16) == analyse(edge_case_dataset)